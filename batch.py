@@ -0,0 +1,148 @@
+import argparse
+import csv
+import datetime
+import os
+import sys
+import helper
+import routing
+from delivery_context import DeliveryContext
+from package import parse_time
+from scenarios import count_deadline_misses
+from simulation import plan_day
+from truck import Truck
+
+
+MANIFEST_SUFFIXES = ('.csv', '.csv.gz')  # Files in a manifest directory that are read as package files
+
+RESULT_COLUMNS = ['depot', 'manifest', 'packages', 'unmatched_addresses', 'total_miles', 'deadline_misses',
+                  'finish_time', 'max_rss_mib', 'error']
+
+
+def load_depot(distance_file):
+    """Import a depot's location and distance data into a new DeliveryContext object.
+
+    Args:
+        distance_file (str): The path of the depot's distance table CSV file.
+
+    Returns:
+        A DeliveryContext object with no packages registered.
+
+    """
+    depot_context = DeliveryContext()
+    previous_context = helper.use_context(depot_context)
+    try:
+        helper.import_location_distance_data(distance_file)
+    finally:
+        helper.use_context(previous_context)
+    return depot_context
+
+
+def list_manifests(directory):
+    """Return the paths of the package files in a directory, in name order."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(MANIFEST_SUFFIXES))
+
+
+def get_max_rss():
+    """Return the peak resident memory of this process in MiB, or None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(max_rss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)  # Bytes on macOS, KiB elsewhere
+
+
+def process_manifest(depot_context, package_file, num_trucks=2, capacity=16, speed=18.0, start_time='8:00 AM',
+                     route_move_budget=routing.MOVE_BUDGET):
+    """Plan and simulate one day's manifest with a depot's location and distance data.
+
+    The depot's package data from any previous day is reset first, reusing its tables. Loads are planned, and wrong
+    addresses corrected, with simulation.plan_day, as for a single day run by main.py.
+
+    Args:
+        depot_context (DeliveryContext): The depot, with locations and distances imported.
+        package_file (str): The path of the day's package CSV file.
+        num_trucks (:obj:`int`, optional): The number of trucks in the fleet. Defaults to 2.
+        capacity (:obj:`int`, optional): The number of packages each truck holds. Defaults to 16.
+        speed (:obj:`float`, optional): The speed of each truck, in mph. Defaults to 18.0.
+        start_time (:obj:`str`, optional): The time every truck is ready at the hub. Defaults to '8:00 AM'.
+        route_move_budget (:obj:`int`, optional): Candidate moves evaluated to improve each route, or None for
+            nearest-stop routing. Defaults to routing.MOVE_BUDGET.
+
+    Returns:
+        A :obj:`dict` of the day's results, keyed by the names in RESULT_COLUMNS except 'depot'.
+
+    """
+    result = {'manifest': os.path.basename(package_file), 'packages': 0, 'unmatched_addresses': 0,
+              'total_miles': None, 'deadline_misses': None, 'finish_time': None, 'max_rss_mib': None, 'error': ''}
+    previous_context = helper.use_context(depot_context)
+    try:
+        depot_context.reset_packages()
+        helper.reset_phase_timings()  # Phases are timed per day
+        helper.register_packages(package_file)
+        result['packages'] = depot_context.num_packages
+        result['unmatched_addresses'] = len(depot_context.unmatched_addresses)
+
+        time_on_clock = datetime.timedelta(seconds=parse_time(start_time))
+        trucks = [Truck(f'Truck {i}', time_on_clock, capacity, speed) for i in range(1, num_trucks + 1)]
+        try:
+            simulation = plan_day(trucks, route_move_budget)
+        except ValueError as error:
+            result['error'] = str(error)
+            return result
+        simulation.run()
+        result['total_miles'] = round(simulation.get_total_distance(), 1)
+        result['deadline_misses'] = count_deadline_misses()
+        result['finish_time'] = str(max(truck.get_time_on_clock() for truck in trucks))
+        return result
+    finally:
+        result['max_rss_mib'] = get_max_rss()
+        helper.use_context(previous_context)
+
+
+def run_batch(depots, file=sys.stdout, **parameters):
+    """Process every manifest of every depot, writing one CSV row of results per manifest as it finishes.
+
+    Each depot's distance data is imported once, into its own DeliveryContext object, and its manifests are streamed
+    through that context one day at a time, so memory stays steady however many days are processed.
+
+    Args:
+        depots (:obj:`list` of :obj:`tuple`): (distance file, manifest directory) pairs.
+        file (:obj:`file`, optional): The file to write results to. Defaults to standard output.
+        **parameters: Fleet parameters passed to process_manifest, such as num_trucks and capacity.
+
+    Returns:
+        The number of manifests processed.
+
+    """
+    writer = csv.DictWriter(file, fieldnames=RESULT_COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    depot_contexts = [(distance_file, load_depot(distance_file), directory) for distance_file, directory in depots]
+    num_manifests = 0
+    for distance_file, depot_context, directory in depot_contexts:
+        for package_file in list_manifests(directory):
+            writer.writerow(dict(process_manifest(depot_context, package_file, **parameters), depot=distance_file))
+            file.flush()
+            num_manifests += 1
+    return num_manifests
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plan and simulate a directory of daily manifests for each depot.')
+    parser.add_argument('--depot', nargs=2, action='append', metavar=('DISTANCE_FILE', 'MANIFEST_DIRECTORY'),
+                        required=True,
+                        help='a depot distance table and its directory of package files; may be repeated')
+    parser.add_argument('--trucks', type=int, default=2, help='number of trucks in each fleet')
+    parser.add_argument('--capacity', type=int, default=16, help='number of packages each truck holds')
+    parser.add_argument('--speed', type=float, default=18.0, help='speed of each truck, in mph')
+    parser.add_argument('--start-time', default='8:00 AM', help='time every truck is ready at the hub')
+    parser.add_argument('--output', help='path of the results CSV file (default: standard output)')
+    args = parser.parse_args()
+
+    parameters = {'num_trucks': args.trucks, 'capacity': args.capacity, 'speed': args.speed,
+                  'start_time': args.start_time}
+    if args.output:
+        with open(args.output, mode='w', newline='') as output_file:
+            run_batch(args.depot, output_file, **parameters)
+    else:
+        run_batch(args.depot, **parameters)
@@ -0,0 +1,237 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy
+import helper
+import synthetic_data
+from distance_matrix import DistanceMatrix
+from load_planner import LoadPlanner
+from package import Package
+from pending_stops import PendingStops
+from simulation import Simulation
+from truck import Truck
+
+
+class PhaseRecorder:
+    """A class used to record the time and peak traced memory of each phase of a benchmark.
+
+    Attributes:
+        phases (:obj:`dict` of :obj:`str` to :obj:`dict`): Seconds and peak bytes allocated, keyed by phase name.
+
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Record the time spent, and the peak memory allocated, within a with block."""
+        tracemalloc.reset_peak()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            self.phases[name] = {'seconds': seconds, 'peak_bytes': peak_memory - start_memory,
+                                 'retained_bytes': current_memory - start_memory}
+            print(f'{name}: {seconds:.3f} s, peak {(peak_memory - start_memory) / 2 ** 20:.1f} MiB')
+
+
+def get_version():
+    """Return the current git commit of the repository, or an empty string if it cannot be found."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def chunk_trips(simulation, trucks):
+    """Queue trips of packages in address order, filling each truck in turn, without checking any constraints.
+
+    This is used in place of LoadPlanner for manifests too large to plan quickly, so that routing is still measured.
+    """
+    package_ids = sorted(helper.package_hash_table,
+                         key=lambda package_id: helper.get_package(package_id).get_address_index())
+    capacity = trucks[0].get_capacity()
+    for trip_number, start in enumerate(range(0, len(package_ids), capacity)):
+        simulation.add_trip(trucks[trip_number % len(trucks)], package_ids[start:start + capacity])
+
+
+def run_benchmark(distance_file, package_file, num_trucks, plan_limit=2000, num_queries=100):
+    """Time each phase of a full run on a pair of WGUPS-format files.
+
+    Args:
+        distance_file (str): The path of the distance table.
+        package_file (str): The path of the package file.
+        num_trucks (int): The number of trucks in the fleet.
+        plan_limit (:obj:`int`, optional): The largest number of packages to plan with LoadPlanner. Larger manifests
+            are split into trips in address order. Defaults to 2000.
+        num_queries (:obj:`int`, optional): The number of status queries to time. Defaults to 100.
+
+    Returns:
+        A :obj:`dict` of phase results, keyed by phase name.
+
+    """
+    recorder = PhaseRecorder()
+    tracemalloc.start()
+    try:
+        helper.reset_tables()
+        with recorder.phase('import_location_distance_data'):
+            helper.import_location_distance_data(distance_file)
+        with recorder.phase('register_packages'):
+            helper.register_packages(package_file)
+
+        trucks = [Truck(f'Truck {i}') for i in range(1, num_trucks + 1)]
+        simulation = Simulation(trucks)
+        with recorder.phase('plan_loads'):
+            if helper.num_packages <= plan_limit:
+                LoadPlanner(trucks).schedule(simulation)
+            else:
+                chunk_trips(simulation, trucks)
+        with recorder.phase('simulate'):
+            simulation.run()
+
+        with recorder.phase('build_status_timeline'):
+            helper.build_status_timeline()
+        with open(os.devnull, mode='w') as devnull, recorder.phase('print_status_all_packages'):
+            with contextlib.redirect_stdout(devnull):
+                helper.print_status_all_packages(datetime.timedelta(hours=10))
+        with recorder.phase('counts_at'):
+            for i in range(num_queries):
+                helper.status_timeline.counts_at(8 * 3600 + i * 8 * 3600 // num_queries)
+    finally:
+        tracemalloc.stop()
+    return recorder.phases
+
+
+def benchmark_nearest_stops(num_locations=5000, num_stops=1000, seed=0):
+    """Compare the time to route a truck through its stops with candidate lists against full scans alone.
+
+    Args:
+        num_locations (:obj:`int`, optional): The number of locations, scattered at random. Defaults to 5000.
+        num_stops (:obj:`int`, optional): The number of stops on the route. Defaults to 1000.
+        seed (:obj:`int`, optional): The seed for random numbers. Defaults to 0.
+
+    Returns:
+        A :obj:`dict` of seconds per route, keyed by search name. Both searches visit stops in the same order.
+
+    """
+    random = numpy.random.default_rng(seed)
+    points = random.uniform(0.0, 20.0, size=(num_locations, 2))
+    table = DistanceMatrix(numpy.round(numpy.hypot(*(points[:, None, :] - points[None, :, :]).T), 1))
+    stop_indexes = random.choice(numpy.arange(1, num_locations), size=num_stops, replace=False).tolist()
+    table.list_candidates()
+
+    def full_scan(stops, current_index):
+        address_indexes = stops.get_address_indexes()
+        distances = table.get_distances(current_index, address_indexes)
+        nearest_distance = distances.min()
+        return float(nearest_distance), [address_indexes[i] for i in (distances == nearest_distance).nonzero()[0]]
+
+    results = {}
+    routes = []
+    for name, search in (('full scan', full_scan), ('candidates', lambda s, i: s.find_nearest(table, i))):
+        stops = PendingStops()
+        for address_index in stop_indexes:
+            stops.add(Package(str(address_index), address_index, 'EOD', '1', ''))
+        location = 0
+        route = []
+        start = time.perf_counter()
+        while len(stops):
+            distance, nearest_indexes = search(stops, location)
+            for address_index in nearest_indexes:
+                stops.remove(stops.get_packages(address_index)[0])
+            location = nearest_indexes[0]
+            route.append(location)
+        results[name] = time.perf_counter() - start
+        routes.append(route)
+    assert routes[0] == routes[1]
+    return results
+
+
+def benchmark_startup(repeats=20, cache_file=None, distance_file=helper.DISTANCE_FILE,
+                      package_file=helper.PACKAGE_FILE):
+    """Compare the time to import tables from the CSV files against loading them from a cache file.
+
+    Args:
+        repeats (:obj:`int`, optional): The number of times to load the tables each way. Defaults to 20.
+        cache_file (:obj:`str`, optional): The path of the cache file to write and read. Defaults to None, to use a
+            temporary file.
+        distance_file (:obj:`str`, optional): The path of the distance table CSV file. Defaults to
+            helper.DISTANCE_FILE.
+        package_file (:obj:`str`, optional): The path of the package CSV file. Defaults to helper.PACKAGE_FILE.
+
+    Returns:
+        A :obj:`dict` of the mean seconds per load, keyed by 'csv' and 'cache'.
+
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = cache_file or os.path.join(directory, 'wgups_tables.cache')
+        helper.reset_tables()
+        helper.load_tables(distance_file, package_file, cache_file)  # Write the cache
+        results = {}
+        for name, file_name in (('csv', ''), ('cache', cache_file)):
+            start = time.perf_counter()
+            for i in range(repeats):
+                helper.reset_tables()
+                helper.load_tables(distance_file, package_file, file_name)
+            results[name] = (time.perf_counter() - start) / repeats
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark each phase of a run on synthetic WGUPS-format data.')
+    parser.add_argument('--locations', type=int, default=1000, help='number of locations, including the hub')
+    parser.add_argument('--packages', type=int, default=10000, help='number of packages')
+    parser.add_argument('--trucks', type=int, default=None, help='number of trucks (default: one per 100 packages)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for random numbers')
+    parser.add_argument('--plan-limit', type=int, default=2000, help='largest manifest to plan with LoadPlanner')
+    parser.add_argument('--output', default='benchmark_results.json', help='path of the JSON results file')
+    parser.add_argument('--nearest-stops', action='store_true',
+                        help='only compare nearest-stop searches with candidate lists against full scans')
+    parser.add_argument('--startup', action='store_true',
+                        help='only compare loading the WGUPS tables from the CSV files against a cache file')
+    args = parser.parse_args()
+
+    if args.startup:
+        for source_name, seconds in benchmark_startup().items():
+            print(f'{source_name}: {seconds * 1000:.2f} ms per load')
+        sys.exit()
+
+    if args.nearest_stops:
+        for search_name, seconds in benchmark_nearest_stops(args.locations, min(args.packages, args.locations - 1),
+                                                            args.seed).items():
+            print(f'{search_name}: {seconds * 1000:.2f} ms per route')
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as directory:
+        distance_file = os.path.join(directory, 'distances.csv')
+        package_file = os.path.join(directory, 'packages.csv')
+        synthetic_data.write_distance_file(distance_file, args.locations, args.seed)
+        synthetic_data.write_package_file(package_file, args.packages, args.locations, args.seed)
+        num_trucks = args.trucks or max(2, args.packages // 100)
+        phases = run_benchmark(distance_file, package_file, num_trucks, args.plan_limit)
+
+    results = {
+        'version': get_version(),
+        'python': platform.python_version(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'parameters': {'locations': args.locations, 'packages': args.packages, 'trucks': num_trucks,
+                       'seed': args.seed},
+        'phases': phases,
+    }
+    with open(args.output, mode='w') as file:
+        json.dump(results, file, indent=2)
+    print(f'Results written to {args.output}')
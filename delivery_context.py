@@ -0,0 +1,68 @@
+from package_store import PackageStore
+
+
+class DeliveryContext:
+    """A class used to hold the location, distance, and package data of one depot.
+
+    Location and distance data are loaded once, while package data is reset for each day's manifest. Resetting keeps
+    the number of slots in package_hash_table, so a process streaming many days through one context refills the same
+    table rather than growing a new one. Address rows are cut back to their location name and street, and are filled in
+    again, with new lists of intended packages, from the next day's packages.
+
+    Attributes:
+        num_packages (int): Total number of packages handled.
+        package_hash_table (PackageStore): All Package objects, keyed by package id.
+        distance_table (DistanceMatrix): All distance data. Each index refers to the same location on both axes.
+        full_address_table (:obj:`list` of :obj:`list`): All address data (index matches index of distance_table).
+            Columns store location name (0), street address (1), city (2), state (3), zip code (4), and intended
+            packages (5).
+        address_index_table (:obj:`dict` of :obj:`tuple` to :obj:`int`): Index of full_address_table rows keyed by a
+            (street, zip code) tuple, which is built once locations are imported.
+        unmatched_addresses (:obj:`list` of :obj:`list`): Package ids and addresses from package data that do not match
+            any location in full_address_table.
+        status_timeline (StatusTimeline): Statuses of all packages over time, which is built once deliveries have been
+            simulated.
+        address_history (:obj:`dict` of :obj:`str` to :obj:`list`): Previous addresses of packages whose address was
+            changed, keyed by package id. Each entry is a list of (seconds, address index) tuples, in time order: the
+            package was intended for that address until that time.
+
+    """
+
+    def __init__(self):
+        """Construct an empty DeliveryContext object."""
+        self.num_packages = 0
+        self.package_hash_table = PackageStore()
+        self.distance_table = None
+        self.full_address_table = []
+        self.address_index_table = {}
+        self.unmatched_addresses = []
+        self.status_timeline = None
+        self.address_history = {}
+
+
+    def reset_packages(self):
+        """Remove all package data, keeping location and distance data, so that a new set of packages can be registered.
+
+        The number of slots in package_hash_table is kept, so a day as large as the last does not grow the table. The
+        city, state, zip code, and package ids saved to each address row by update_address_data are removed, so every
+        address is filled in again from the next day's packages.
+        """
+        self.status_timeline = None
+        self.num_packages = 0
+        self.unmatched_addresses.clear()
+        self.address_history.clear()
+        self.package_hash_table.reset()
+        for address in self.full_address_table:
+            del address[2:]
+
+
+    def reset_tables(self):
+        """Remove all location, distance, and package data, so that new data can be imported."""
+        self.distance_table = None
+        self.status_timeline = None
+        self.num_packages = 0
+        self.full_address_table.clear()
+        self.address_index_table.clear()
+        self.unmatched_addresses.clear()
+        self.address_history.clear()
+        self.package_hash_table.clear()
@@ -0,0 +1,160 @@
+import numpy
+
+
+NUM_CANDIDATES = 16  # Nearest neighbors listed for each location
+CHUNK_ROWS = 1024    # Rows partially sorted at a time, which bounds the memory used to list candidates
+
+
+class DistanceMatrix:
+    """A class used to represent a symmetric table of distances between locations.
+
+    Distances are saved to a contiguous, square NumPy array, so that a row of distances can be read with a single
+    vectorized call rather than one pyramid lookup per location. Indexes match those of full_address_table in helper.py.
+
+    Attributes:
+        distances (:obj:`numpy.ndarray`): A square array of float64 distances, in miles.
+        candidates (:obj:`numpy.ndarray`): Indexes of the nearest locations to each location, nearest first, which
+            are listed on first use.
+        candidate_distances (:obj:`numpy.ndarray`): The distance to each location in candidates.
+
+    """
+
+    def __init__(self, distances):
+        """Construct a DistanceMatrix object.
+
+        Args:
+            distances (:obj:`numpy.ndarray`): A square array of distances, where [i, j] equals [j, i].
+
+        """
+        self.distances = distances
+        self.candidates = None
+        self.candidate_distances = None
+
+
+    @classmethod
+    def from_pyramid(cls, rows):
+        """Build a DistanceMatrix object from rows of a pyramid (lower-triangular) table.
+
+        Row 0 holds a single value, and each subsequent row holds one additional value. Rows are read one at a time,
+        so any iterable, including a generator streaming from a file, can be used.
+
+        Args:
+            rows (:obj:`iterable` of :obj:`list` of :obj:`float`): The rows of the pyramid table, in order.
+
+        Returns:
+            A DistanceMatrix object, mirrored so that both triangles hold data.
+
+        """
+        capacity = 32
+        buffer = numpy.zeros((capacity, capacity), dtype=numpy.float64)
+        size = 0
+        for row in rows:
+            if size == capacity:
+                # Double the buffer so that streaming rows costs amortized constant time per row.
+                capacity *= 2
+                grown = numpy.zeros((capacity, capacity), dtype=numpy.float64)
+                grown[:size, :size] = buffer[:size, :size]
+                buffer = grown
+            buffer[size, :size + 1] = row[:size + 1]
+            size += 1
+
+        distances = numpy.ascontiguousarray(buffer[:size, :size])
+        # Mirror the lower triangle to the upper triangle.
+        upper = numpy.triu_indices(size, 1)
+        distances[upper] = distances.T[upper]
+        return cls(distances)
+
+
+    def __len__(self):
+        return self.distances.shape[0]
+
+
+    def __getitem__(self, index):
+        """Return a row of distances, so that table[i][j] lookups written for the pyramid table still work."""
+        return self.distances[index]
+
+
+    def get_distance(self, current_index, target_index):
+        return float(self.distances[current_index, target_index])
+
+    def get_row(self, index):
+        return self.distances[index]
+
+    def get_column(self, index):
+        return self.distances[:, index]
+
+    def get_submatrix(self, indexes):
+        """Return the square array of distances between the given locations, in the order of indexes."""
+        return self.distances[numpy.ix_(indexes, indexes)]
+
+    def list_candidates(self, num_candidates=NUM_CANDIDATES):
+        """List the nearest locations to every location, with a vectorized partial sort of each chunk of rows."""
+        size = len(self)
+        k = min(num_candidates, size)
+        self.candidates = numpy.empty((size, k), dtype=numpy.intp)
+        self.candidate_distances = numpy.empty((size, k), dtype=numpy.float64)
+        for start in range(0, size, CHUNK_ROWS):
+            rows = numpy.asarray(self.distances[start:start + CHUNK_ROWS])
+            nearest = numpy.argpartition(rows, k - 1, axis=1)[:, :k] if k < size else numpy.tile(numpy.arange(size),
+                                                                                                 (len(rows), 1))
+            nearest_distances = numpy.take_along_axis(rows, nearest, axis=1)
+            order = numpy.argsort(nearest_distances, axis=1, kind='stable')
+            self.candidates[start:start + len(rows)] = numpy.take_along_axis(nearest, order, axis=1)
+            self.candidate_distances[start:start + len(rows)] = numpy.take_along_axis(nearest_distances, order, axis=1)
+
+
+    def get_candidates(self, index):
+        """Return lists of the nearest locations to a location, nearest first, and their distances.
+
+        Every location not listed is at least as far away as the last location listed.
+        """
+        if self.candidates is None:
+            self.list_candidates()
+        return self.candidates[index].tolist(), self.candidate_distances[index].tolist()
+
+
+    def get_distances(self, current_index, target_indexes):
+        """Return distances from one location to many locations with a single vectorized call.
+
+        Args:
+            current_index (int): The index of the starting location.
+            target_indexes (:obj:`list` of :obj:`int`): Indexes of candidate locations.
+
+        Returns:
+            A NumPy array of distances, in the same order as target_indexes.
+
+        """
+        return self.distances[current_index, target_indexes]
+
+
+def find_nearest_candidate(distance_table, current_index, pending):
+    """Find the nearest pending location from the candidate list of the current location, when this can be done exactly.
+
+    The result is only given when the nearest pending candidate is closer than every location left off the candidate
+    list, and no other pending location is at the same distance, so a full scan would find the same single location.
+    Candidates are not checked when too few locations are pending for any candidate to be likely to be pending.
+
+    Args:
+        distance_table (DistanceMatrix): The table of distances between locations, or any table with get_candidates.
+        current_index (int): The index of the current location.
+        pending (:obj:`set` or :obj:`dict`): Indexes of pending locations.
+
+    Returns:
+        A tuple of the distance to the nearest pending location and its index, or None if a full scan is needed.
+
+    """
+    if len(pending) * NUM_CANDIDATES < len(distance_table):
+        return None
+    indexes, distances = distance_table.get_candidates(current_index)
+    for i, index in enumerate(indexes):
+        if index in pending:
+            distance = distances[i]
+            if len(indexes) < len(distance_table) and distance >= distances[-1]:
+                return None  # A location off the list may be just as near
+            for j in range(i + 1, len(indexes)):
+                if distances[j] != distance:
+                    break
+                if indexes[j] in pending:
+                    return None  # Ties are broken by pending order, which a full scan finds
+            return distance, index
+    return None
@@ -0,0 +1,143 @@
+import math
+import os
+import sys
+import numpy
+from numpy.lib.format import open_memmap
+import helper
+from package import parse_time
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Without pyarrow, deliveries are exported to a NumPy .npy file
+    pyarrow = None
+
+
+BATCH_SIZE = 65536  # Packages converted to columns and written at a time
+
+# Columns of the delivery log. Times are in seconds after midnight. In .npy files, times of packages never loaded or
+# delivered are -1 and their truck miles are NaN; in Arrow and Parquet files they are null.
+EXPORT_COLUMNS = ['package_id', 'address_index', 'truck', 'time_loaded', 'time_delivered', 'deadline', 'on_time',
+                  'truck_miles']
+ARROW_SUFFIXES = ('.arrow', '.feather')
+PARQUET_SUFFIX = '.parquet'
+NUMPY_SUFFIX = '.npy'
+SUPPORTED_SUFFIXES = (PARQUET_SUFFIX,) + ARROW_SUFFIXES + (NUMPY_SUFFIX,)
+
+
+def get_numpy_dtype(truck_name_length):
+    """Return the structured NumPy dtype of a delivery log row, with room for truck names of a given length."""
+    return numpy.dtype([('package_id', '<i8'), ('address_index', '<i4'), ('truck', f'<U{max(truck_name_length, 1)}'),
+                        ('time_loaded', '<i4'), ('time_delivered', '<i4'), ('deadline', '<i4'), ('on_time', '?'),
+                        ('truck_miles', '<f8')])
+
+
+def get_arrow_schema():
+    return pyarrow.schema([('package_id', pyarrow.int64()), ('address_index', pyarrow.int32()),
+                           ('truck', pyarrow.string()), ('time_loaded', pyarrow.int32()),
+                           ('time_delivered', pyarrow.int32()), ('deadline', pyarrow.int32()),
+                           ('on_time', pyarrow.bool_()), ('truck_miles', pyarrow.float64())])
+
+
+def iter_batches(package_ids, batch_size=BATCH_SIZE):
+    """Yield the delivery log as columns, one batch of packages at a time.
+
+    Args:
+        package_ids (:obj:`list` of :obj:`str`): Ids of the packages to export, in order.
+        batch_size (:obj:`int`, optional): The number of packages in each batch. Defaults to BATCH_SIZE.
+
+    Yields:
+        A :obj:`dict` of :obj:`list` columns keyed by the names in EXPORT_COLUMNS. Times and truck miles that never
+        happened are None.
+
+    """
+    deadlines = {}  # Deadlines in seconds keyed by deadline text, as most packages share a few deadlines
+    get_package = helper.package_hash_table.get
+    for start in range(0, len(package_ids), batch_size):
+        packages = [get_package(package_id) for package_id in package_ids[start:start + batch_size]]
+        columns = {
+            'package_id': [int(p.get_package_id()) for p in packages],
+            'address_index': [p.get_address_index() for p in packages],
+            'truck': [p.get_assigned_truck() for p in packages],
+            'time_loaded': [p.get_time_loaded_seconds() for p in packages],
+            'time_delivered': [p.get_time_delivered_seconds() for p in packages],
+            'truck_miles': [p.get_truck_miles_delivered() for p in packages],
+        }
+        deadline_column = []
+        for p in packages:
+            deadline = deadlines.get(p.get_deadline())
+            if deadline is None:
+                deadline = deadlines[p.get_deadline()] = parse_time(p.get_deadline())
+            deadline_column.append(deadline)
+        columns['deadline'] = deadline_column
+        columns['on_time'] = [delivered is not None and delivered <= deadline
+                              for delivered, deadline in zip(columns['time_delivered'], deadline_column)]
+        yield columns
+
+
+def write_numpy(file_name, package_ids, batch_size=BATCH_SIZE):
+    """Write the delivery log to a .npy file of structured rows, filling a memory map one batch at a time."""
+    truck_name_length = max((len(p.get_assigned_truck()) for key, p in helper.package_hash_table.items()), default=1)
+    rows = open_memmap(file_name, mode='w+', dtype=get_numpy_dtype(truck_name_length), shape=(len(package_ids),))
+    start = 0
+    for columns in iter_batches(package_ids, batch_size):
+        end = start + len(columns['package_id'])
+        batch = rows[start:end]
+        for name in ('package_id', 'address_index', 'truck', 'deadline', 'on_time'):
+            batch[name] = columns[name]
+        for name in ('time_loaded', 'time_delivered'):
+            batch[name] = [-1 if t is None else t for t in columns[name]]
+        batch['truck_miles'] = [math.nan if m is None else m for m in columns['truck_miles']]
+        start = end
+    rows.flush()
+    del rows
+
+
+def write_arrow(file_name, package_ids, batch_size=BATCH_SIZE):
+    """Write the delivery log to a Parquet file, or an Arrow IPC file, one record batch at a time."""
+    schema = get_arrow_schema()
+    if file_name.endswith(PARQUET_SUFFIX):
+        writer = pyarrow.parquet.ParquetWriter(file_name, schema)
+    else:
+        writer = pyarrow.ipc.new_file(file_name, schema)
+    try:
+        for columns in iter_batches(package_ids, batch_size):
+            writer.write_batch(pyarrow.record_batch([columns[name] for name in EXPORT_COLUMNS], schema=schema))
+    finally:
+        writer.close()
+
+
+def export_deliveries(file_name, batch_size=BATCH_SIZE):
+    """Export the delivery log of every package, once deliveries have been simulated, as columnar data.
+
+    The format is chosen by the file name: '.parquet' for Parquet, '.arrow' or '.feather' for an Arrow IPC file, or
+    '.npy' for a NumPy array of structured rows. Parquet and Arrow need pyarrow; without it, the log is written to a
+    .npy file with the same name instead. Rows are in package id order.
+
+    Args:
+        file_name (str): The path of the file.
+        batch_size (:obj:`int`, optional): The number of packages converted and written at a time. Defaults to
+            BATCH_SIZE.
+
+    Returns:
+        The path of the file written.
+
+    Raises:
+        ValueError: If the file name does not end with a supported suffix.
+
+    """
+    if not file_name.endswith(SUPPORTED_SUFFIXES):
+        raise ValueError(f'Cannot export deliveries to {file_name}; the supported formats are '
+                         f'{", ".join(SUPPORTED_SUFFIXES)}.')
+    package_ids = sorted(helper.package_hash_table, key=int)
+    if file_name.endswith(ARROW_SUFFIXES + (PARQUET_SUFFIX,)):
+        if pyarrow is not None:
+            with helper.timed_phase('export deliveries'):
+                write_arrow(file_name, package_ids, batch_size)
+            return file_name
+        file_name = os.path.splitext(file_name)[0] + NUMPY_SUFFIX
+        print(f'pyarrow is not installed, so deliveries are exported to {file_name}', file=sys.stderr)
+    with helper.timed_phase('export deliveries'):
+        write_numpy(file_name, package_ids, batch_size)
+    return file_name
@@ -1,281 +1,442 @@
+import contextlib
+import csv
 import datetime
-import sympy
-from package import Package
+import gzip
+import sys
+import table_cache
+import time
+from delivery_context import DeliveryContext
+from distance_matrix import DistanceMatrix
+from package import Package, time_to_seconds
+from status_timeline import StatusTimeline
+
+
+# Location, distance, and package data are held by a DeliveryContext object. Functions in this file use the current
+# context, which use_context switches, so that one process can hold the data of several depots and stream many days of
+# packages through each. The data can also be read as module attributes, such as helper.package_hash_table.
+context = DeliveryContext()
+CONTEXT_ATTRIBUTES = ('num_packages', 'package_hash_table', 'distance_table', 'full_address_table',
+                      'address_index_table', 'unmatched_addresses', 'status_timeline', 'address_history')
 
-
-# Global variables are used throughout this file.
-num_packages = 0         # Total number of packages handled
-package_hash_table = []  # All Package objects
 HUB_INDEX = 0            # Index of hub is [0][0] in distance and address tables
 
-# All distance data in a 2D array. Each index refers to the same location on both axes.
-# The table is a pyramid, row 0 only saves index 0, and each subsequent row saves an additional value (or column).
-distance_table = []
+# Default locations of the CSV files. Files ending in '.gz' are read as gzip-compressed data.
+DISTANCE_FILE = 'WGUPS Distance Table.csv'
+PACKAGE_FILE = 'WGUPS Package File.csv'
 
-# All address data in a 2D array (index matches index of distance_table).
-# Columns store location name (0), street address (1), city (2), state (3), zip code (4), and intended packages (5).
-full_address_table = []
+# Seconds spent in each phase of loading data, keyed by phase name.
+phase_timings = {}
 
-# Copy of package 9's bad address so that the incorrect address can be recalled. Data will be added later.
-package_9_bad_address = [(datetime.timedelta(hours=10, minutes=20))]
+# Time that wrong addresses, such as package 9's, are corrected. Packages with a wrong address are held until then.
+ADDRESS_FIX_TIME = datetime.timedelta(hours=10, minutes=20)
+# Corrected addresses of packages listed with a wrong address, keyed by package id, which are applied at
+# ADDRESS_FIX_TIME to packages whose special note says the address is wrong.
+ADDRESS_CORRECTIONS = {'9': ('410 S State St', 'Salt Lake City', '84111')}
 
 
 def get_package(package_id):
     """Return a Package object for a given package id, by accessing package_hash_table."""
-    index_data = package_hash_table[hash_key(package_id)]
-    # Find the object, knowing that multiple objects may be saved at the same index.
-    for d in index_data:
-        if d[0] == package_id:
-            return d[1]
+    return context.package_hash_table.get(package_id)
 
 
 def hash_key(key):
     """Return a hash key for storing and retrieving data in package_hash_table."""
-    return hash(key) % len(package_hash_table)
+    return context.package_hash_table.hash_key(key)
 
 
-def import_location_distance_data():
-    """Read, clean, format, and save distance and location data from a CSV file."""
-    with open('WGUPS Distance Table.csv', mode='r') as file:
-        raw_distance_data = file.readlines()
-    first_row = None
-    for row in range(len(raw_distance_data)):
-        row_data = raw_distance_data[row].split(',')
-        # Data rows have at least three columns to indicate a location name, location address, and distance value.
-        # A street address must have three or more characters, or at least contain 'HUB'.
-        if len(row_data) < 3 or len(row_data[1]) < 3:
-            continue
-        elif row_data[1][-3:] == 'HUB' and row_data[2] == '0':
-            # HUB must be in the first data row.
-            first_row = row
-            break
-
-    if not first_row:
-        print('The specified file cannot be used. Please review the user guide to correct its format.')
-    else:
-        table_row = 0
-        for row in range(first_row, len(raw_distance_data)):
-            row_data = raw_distance_data[row].split(',')
-            loc_name = row_data.pop(0)
-            address = row_data.pop(0)
-            full_address_table.append([loc_name, address])
+@contextlib.contextmanager
+def timed_phase(name):
+    """Record the seconds spent within a with block to phase_timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_timings[name] = phase_timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def reset_phase_timings():
+    """Remove recorded phase times, so that the times of one run or one day are reported on their own."""
+    phase_timings.clear()
+
+
+def print_phase_timings(file=None):
+    """Print the time spent in each recorded phase, to standard error by default."""
+    file = file or sys.stderr
+    for name, seconds in phase_timings.items():
+        print(f'{name}: {seconds * 1000:.2f} ms', file=file)
+
+
+def open_data_file(file_name):
+    """Open a CSV file for reading as text, decompressing it if the file name ends in '.gz'."""
+    if file_name.endswith('.gz'):
+        return gzip.open(file_name, mode='rt', encoding='utf-8-sig', newline='')
+    return open(file_name, mode='r', encoding='utf-8-sig', newline='')
+
+
+def read_distance_rows(file_name=DISTANCE_FILE):
+    """Yield location names, addresses, and pyramid rows of distances from a CSV file.
+
+    Rows are read one at a time with the csv module, so quoted fields may contain commas or line breaks.
+
+    Args:
+        file_name (str): The path of the distance table CSV file.
+
+    Yields:
+        A tuple of the location name, the location address, and a :obj:`list` of :obj:`float` distances.
+
+    """
+    with open_data_file(file_name) as file:
+        rows = csv.reader(file)
+        table_row = None
+        for row_data in rows:
+            # Data rows have at least three columns to indicate a location name, location address, and distance value.
+            # A street address must have three or more characters, or at least contain 'HUB'.
+            if len(row_data) < 3 or len(row_data[1]) < 3:
+                continue
+            if table_row is None:
+                if row_data[1][-3:] != 'HUB' or row_data[2] != '0':
+                    continue
+                table_row = 0  # HUB must be in the first data row.
             # Table has the same number of columns and rows, and each subsequent row has one additional data column.
-            distance_table.append([])
-            # Save all distance data to the table; indexes serve as ids.
-            for col in range(table_row + 1):
-                distance_table[table_row].append(float(row_data[col]))
+            yield row_data[0], row_data[1], [float(row_data[col]) for col in range(2, table_row + 3)]
             table_row += 1
 
+    if table_row is None:
+        print('The specified file cannot be used. Please review the user guide to correct its format.',
+              file=sys.stderr)
 
-def count_packages():
-    """Return package data rows from CSV file."""
-    global num_packages
-    with open('WGUPS Package File.csv', mode='r') as file:
-        # Read package data from file and retrieve them as a list of lines.
-        raw_data = file.readlines()
-    # Ignore lines without package data, which are simply for spacing and column labels.
-    first_row = 0
-    while raw_data[first_row][0] != '1':
-        first_row += 1
-    num_packages = len(raw_data) - first_row
 
-    return raw_data, first_row
+def read_package_rows(file_name=PACKAGE_FILE):
+    """Yield rows of package data from a CSV file.
 
+    Rows for spacing and column labels are skipped; package data rows start with a numeric package id.
 
-def prepare_hash_table():
-    """Assign least 1.3 times the expected number of objects as buckets to hash table (the closest prime number)."""
-    num_buckets = int(num_packages * 1.3)
-    while not sympy.isprime(num_buckets):
-        num_buckets += 1
-    # Manage collisions when working with the hash table by appending, rather than assigning, objects to indexes.
-    for i in range(num_buckets):
-        package_hash_table.append([])
+    Args:
+        file_name (str): The path of the package CSV file.
+
+    Yields:
+        A :obj:`list` of :obj:`str` holding the package id, street address, city, state, zip code, deadline, mass,
+        and special note.
+
+    """
+    with open_data_file(file_name) as file:
+        for row_data in csv.reader(file):
+            if row_data and row_data[0].isdigit():
+                # Pad rows missing an empty special note column.
+                yield row_data + [''] * (8 - len(row_data))
+
+
+def import_location_distance_data(file_name=DISTANCE_FILE):
+    """Read, clean, format, and save distance and location data from a CSV file."""
+
+    def save_locations(rows):
+        # Save each address as its distance row streams past; indexes serve as ids for both tables.
+        for loc_name, address, distances in rows:
+            context.full_address_table.append([loc_name, address])
+            yield distances
+
+    with timed_phase('import locations'):
+        context.distance_table = DistanceMatrix.from_pyramid(save_locations(read_distance_rows(file_name)))
+    with timed_phase('index addresses'):
+        build_address_index()
+
+
+def build_address_index():
+    """Index full_address_table rows by street address and zip code for constant time matching of package data.
+
+    Location addresses are saved as 'street (zip code)', so the street and zip code are sliced once per location here
+    rather than once per comparison. The first location with a given street and zip code is kept.
+    """
+    context.address_index_table.clear()
+    for a in range(len(context.full_address_table)):
+        a_street = context.full_address_table[a][1][:-8]
+        a_zip_code = context.full_address_table[a][1][-6:-1]
+        context.address_index_table.setdefault((a_street, a_zip_code), a)
+
+
+def prepare_hash_table(expected_size=0):
+    """Remove all packages from package_hash_table, making room for the expected number of packages."""
+    context.package_hash_table.clear(expected_size)
 
 
 def update_address_data(address_data):
     """Format address data and update full_address_table.
 
-    Match addresses from address_data and full_address_table with a unique zip code and street address combination. On
-    first access, or match, of this address, full_address_table is updated with provided data. Ids for packages
-    intended for this address are saved as a list to full_address_table.
+    Match addresses from address_data and full_address_table with a unique zip code and street address combination,
+    using address_index_table. On first access, or match, of this address, full_address_table is updated with provided
+    data. Ids for packages intended for this address are saved as a list to full_address_table. Addresses without a
+    match are reported and saved to unmatched_addresses.
 
     Args:
         address_data (:obj:`list` of :obj:`str`): The full address of a relevant location, with an id at index 0.
 
     Returns:
-        The index of the address for data retrieval from full_address_table and distance_table.
+        The index of the address for data retrieval from full_address_table and distance_table, or -1 if no location
+        matches the address.
 
     """
     package_id = address_data[0]
     street = address_data[1]
     zip_code = address_data[4]
-    for a in range(len(full_address_table)):
-        if len(full_address_table[a]) == 2:  # Not yet updated
-            a_street = full_address_table[a][1][:-8]
-            a_zip_code = full_address_table[a][1][-6:-1]
-            if zip_code == a_zip_code and street == a_street:
-                full_address_table[a][1] = street
-                full_address_table[a].extend(address_data[2:5])
-                full_address_table[a].append([package_id])
-                return a
-        else:                                # Format already updated
-            if zip_code == full_address_table[a][4] and street == full_address_table[a][1]:
-                # Track packages (by package_id) for this same address.
-                full_address_table[a][5].append(package_id)
-                return a
-    return -1
-
-
-def register_packages():
-    """Create Package objects from read data and add them to package_hash_table."""
-    raw_data, first_row = count_packages()  # Unpack tuple
-    prepare_hash_table()
-
-    # Iterate through all rows of package data and create Package objects.
-    for row in range(first_row, len(raw_data)):
-        package_data = raw_data[row].split(',')
-        address_index = update_address_data(package_data[:5])
-        package = Package(package_data[0], address_index, package_data[5], package_data[6], package_data[7])
-
-        # Append a list of the key and package to the list at its assigned index, to manage collisions.
-        key = package.get_package_id()
-        package_hash_table[hash_key(key)].append([key, package])
-
-
-def load_truck_two(truck):
-    """Add a first load of packages to truck two, based on deadlines and which packages must be on truck two."""
-    truck.load_package(get_package('3'))   # Must be on truck 2
-    truck.load_package(get_package('5'))   # Shares destination with packages 37 and 38
-    truck.load_package(get_package('13'))  # Must be delivered with specific others - Deadline 10:30
-    truck.load_package(get_package('14'))  # Must be delivered with specific others - Deadline 10:30
-    truck.load_package(get_package('15'))  # Must be delivered with specific others - Deadline 9:00
-    truck.load_package(get_package('16'))  # Must be delivered with specific others - Deadline 10:30
-    truck.load_package(get_package('18'))  # Must be on truck 2
-    truck.load_package(get_package('19'))  # Must be delivered with specific others
-    truck.load_package(get_package('20'))  # Must be delivered with specific others - Deadline 10:30
-    truck.load_package(get_package('21'))  # Shares address with package 20
-    truck.load_package(get_package('34'))  # Deadline 10:30 - Shares destination with packages 15 and 16
-    truck.load_package(get_package('36'))  # Must be on truck 2
-    truck.load_package(get_package('37'))  # Deadline 10:30 - Shares destination with package 38
-    truck.load_package(get_package('38'))  # Must be on truck 2 - Shares destination with package 37
-    truck.load_package(get_package('39'))  # Shares destination with package 13
-
-
-def load_truck_one(truck):
-    """Adds a first load of packages to truck one, departing at 9:05 a.m. so that all packages are ready."""
-    truck.load_package(get_package('1'))   # Deadline 10:30
-    truck.load_package(get_package('4'))   # Shares destination with package 40
-    truck.load_package(get_package('6'))   # Deadline 10:30 - Delayed - Arrives at hub 9:05
-    truck.load_package(get_package('7'))   # Shares destination with package 29
-    truck.load_package(get_package('8'))   # Shares destination with package 30
-    truck.load_package(get_package('25'))  # Deadline 10:30 - Delayed - Arrives at hub 9:05
-    truck.load_package(get_package('26'))  # Shares destination with package 25
-    truck.load_package(get_package('28'))  # Delayed - Arrives at hub 9:05
-    truck.load_package(get_package('29'))  # Deadline 10:30
-    truck.load_package(get_package('30'))  # Deadline 10:30
-    truck.load_package(get_package('31'))  # Deadline 10:30
-    truck.load_package(get_package('32'))  # Delayed - Arrives at hub 9:05 - Shares destination with package 31
-    truck.load_package(get_package('40'))  # Deadline 10:30
-
-
-def load_truck_two_again(truck):
-    truck.load_package(get_package('2'))
-    truck.load_package(get_package('10'))
-    truck.load_package(get_package('11'))
-    truck.load_package(get_package('12'))
-    truck.load_package(get_package('17'))
-    truck.load_package(get_package('22'))
-    truck.load_package(get_package('23'))
-    truck.load_package(get_package('33'))  # Shares destination with package 2
-
-
-# Package 9 is included, which had an incorrect address saved, so it is updated at time of loading.
-def load_truck_one_again(truck):
-    package_9 = get_package('9')
-    # package_9_bad_address.append(package_9.get_address())
-    # package_9_bad_address.append(package_9.get_city())
-    # package_9_bad_address.append(package_9.get_zip_code())
-    # package_9.set_address('410 S State St')
-    # package_9.set_city('Salt Lake City')1
-    # package_9.set_zip_code('84111')
-    truck.load_package(package_9)          # Delivery address can be updated at 10:20 a.m.
-    truck.load_package(get_package('24'))
-    truck.load_package(get_package('27'))
-    truck.load_package(get_package('35'))  # Shares destination with package 27
-
-
-"""Find cell data where the table appears like a pyramid, and rows and columns mirror each other."""
-def access_pyramid_table(table, current_cell_id, target_cell_id):
-    if target_cell_id < current_cell_id:
-        target_data = table[current_cell_id][target_cell_id]  # Locate cell by current row
-    else:
-        target_data = table[target_cell_id][current_cell_id]  # Locate cell by current column
-
-    return target_data
+    a = context.address_index_table.get((street, zip_code))
+    if a is None:
+        # Report the address rather than silently saving a package that cannot be routed.
+        context.unmatched_addresses.append(address_data)
+        print(f'Package {package_id} has an address that does not match any location: {street}, {zip_code}',
+              file=sys.stderr)
+        return -1
+
+    if len(context.full_address_table[a]) == 2:  # Not yet updated
+        context.full_address_table[a][1] = street
+        context.full_address_table[a].extend(address_data[2:5])
+        context.full_address_table[a].append([package_id])
+    else:                                # Format already updated
+        # Track packages (by package_id) for this same address.
+        context.full_address_table[a][5].append(package_id)
+    return a
+
+
+def register_packages(file_name=PACKAGE_FILE):
+    """Create Package objects from read data and add them to package_hash_table.
+
+    Package data is streamed from the file in a single pass, and package_hash_table grows as packages arrive.
+    """
+    register_package_rows(read_package_rows(file_name))
+
+
+def register_package_rows(rows):
+    """Create Package objects from rows of package data and add them to package_hash_table."""
+    context.num_packages = 0
+    context.package_hash_table.reset()  # Keep the slots of a previous day, so a day as large does not grow the table
+
+    with timed_phase('register packages'):
+        # Iterate through all rows of package data and create Package objects.
+        for package_data in rows:
+            register_package(package_data)
+
+
+def register_package(package_data):
+    """Create a Package object from a row of package data, add it to package_hash_table, and return it."""
+    address_index = update_address_data(package_data[:5])
+    package = Package(package_data[0], address_index, package_data[5], package_data[6], package_data[7])
+
+    context.num_packages += 1
+    context.package_hash_table.insert(package.get_package_id(), package)
+    return package
+
+
+def change_package_address(package_id, street, city, zip_code, time, state='UT'):
+    """Change the address of a package from a given time, keeping its previous address in address_history.
+
+    Args:
+        package_id (str): The id of the package.
+        street (str): The new street address.
+        city (str): The new city.
+        zip_code (str): The new zip code.
+        time (time): The time of the change.
+        state (:obj:`str`, optional): The new state. Defaults to 'UT'.
+
+    Returns:
+        The index of the new address.
+
+    Raises:
+        ValueError: If there is no such package, or no location matches the new address.
+
+    """
+    package = get_package(package_id)
+    if package is None:
+        raise ValueError(f'There is no package {package_id} to change the address of.')
+    if (street, zip_code) not in context.address_index_table:
+        raise ValueError(f'The new address of package {package_id} does not match any location: {street}, {zip_code}')
+
+    previous_index = package.get_address_index()
+    if previous_index >= 0 and package_id in context.full_address_table[previous_index][5]:
+        context.full_address_table[previous_index][5].remove(package_id)
+    context.address_history.setdefault(package_id, []).append((time_to_seconds(time), previous_index))
+    address_index = update_address_data([package_id, street, city, state, zip_code])
+    package.set_address_index(address_index)
+    return address_index
+
+
+def get_address_index(package, time):
+    """Return the index of the address a package was intended for at a time, in seconds after midnight."""
+    for change_time, previous_index in context.address_history.get(package.get_package_id(), ()):
+        if time < change_time:
+            return previous_index
+    return package.get_address_index()
+
+
+def load_tables(distance_file=DISTANCE_FILE, package_file=PACKAGE_FILE, cache_file=None):
+    """Import location, distance, and package data, using a binary cache of the parsed tables when one is given.
+
+    The cache is used when it matches the size, modification time, and content hash of both CSV files. Otherwise the
+    CSV files are parsed and, if cache_file is given, the parsed tables are saved to it for the next run. A cache that
+    cannot be read or written is reported to standard error and skipped, as the CSV files hold the same data.
+
+    Args:
+        distance_file (:obj:`str`, optional): The path of the distance table CSV file.
+        package_file (:obj:`str`, optional): The path of the package CSV file.
+        cache_file (:obj:`str`, optional): The path of the cache file. Defaults to None, to always parse the files.
+
+    Returns:
+        True if the tables were loaded from the cache, otherwise False.
+
+    """
+    if not cache_file:
+        import_location_distance_data(distance_file)
+        register_packages(package_file)
+        return False
+
+    with timed_phase('load cache'):
+        cached_tables = table_cache.load_cache(cache_file, [distance_file, package_file])
+    if cached_tables:
+        try:
+            locations, package_rows, context.distance_table = cached_tables
+            context.full_address_table.extend(list(location) for location in locations)
+            build_address_index()
+            register_package_rows(package_rows)
+            return True
+        except (KeyError, IndexError, TypeError, ValueError) as error:
+            print(f'Ignoring damaged table cache {cache_file}: {error!r}', file=sys.stderr)
+            reset_tables()
+
+    import_location_distance_data(distance_file)
+    locations = [row[:2] for row in context.full_address_table]
+    package_rows = list(read_package_rows(package_file))
+    register_package_rows(package_rows)
+    try:
+        with timed_phase('save cache'):
+            table_cache.save_cache(cache_file, [distance_file, package_file], locations, package_rows,
+                                   context.distance_table)
+    except (OSError, ValueError) as error:
+        print(f'Could not save table cache {cache_file}: {error}', file=sys.stderr)
+    return False
+
+
+def reset_packages():
+    """Remove all package data, keeping location and distance data, so that a new set of packages can be registered."""
+    context.reset_packages()
+
+
+def reset_tables():
+    """Remove all location, distance, and package data, so that new data can be imported."""
+    context.reset_tables()
+
+
+def use_context(new_context):
+    """Make a DeliveryContext object the one used by functions in this file, and return the previous context."""
+    global context
+    previous_context = context
+    context = new_context
+    return previous_context
+
+
+def __getattr__(name):
+    """Read data of the current context as module attributes, such as helper.package_hash_table."""
+    if name in CONTEXT_ATTRIBUTES:
+        return getattr(context, name)
+    raise AttributeError(f"module 'helper' has no attribute '{name}'")
+
+
+def load_packages(truck, package_ids):
+    """Load the Package objects for a list of package ids onto a truck."""
+    for package_id in package_ids:
+        truck.load_package(get_package(package_id))
+
+
+def find_nearest_stop(truck):
+    """Find the pending stops closest to a truck's current location.
+
+    Returns:
+        A tuple of the distance to the nearest stops and a :obj:`list` of their address indexes.
+
+    """
+    return truck.get_pending_stops().find_nearest(context.distance_table, truck.get_location_index())
+
+
+def find_deadline_stop(truck):
+    """Find a truck's next stop, going to a stop with a deadline first if visiting the nearest stop would make it late.
+
+    Returns:
+        A tuple of the distance to the next stops and a :obj:`list` of their address indexes.
+
+    Raises:
+        InfeasiblePlanError: If a stop held by the truck can no longer be reached by its deadline.
+
+    """
+    return truck.get_pending_stops().find_urgent(context.distance_table, truck.get_location_index(),
+                                                 truck.get_time_on_clock().total_seconds() / 60, 60 / truck.get_speed())
+
+
+def check_deadlines(truck, route):
+    """Check whether a truck's planned route still meets the deadline of every stop it holds.
+
+    Returns:
+        A tuple of the address index, deadline, and arrival time of the first stop the route reaches late, or None.
+
+    Raises:
+        InfeasiblePlanError: If a stop held by the truck cannot be reached by its deadline, even by going straight
+            to it.
+
+    """
+    return truck.get_pending_stops().check_deadlines(context.distance_table, truck.get_location_index(),
+                                                     truck.get_time_on_clock().total_seconds() / 60,
+                                                     60 / truck.get_speed(), route)
+
+
+def travel_to_stop(truck, distance, location_indexes):
+    """Travel to a stop and deliver all packages for it, and for any other stops listed at the same distance.
+
+    The first stop listed becomes the truck's new location.
+    """
+    pending_stops = truck.get_pending_stops()
+    truck.set_location_index(location_indexes[0])
+    truck.update_distance_traveled(distance)
+    for location_index in location_indexes:
+        # A stop may have no packages left if the address of its only package was changed while the truck drove there.
+        for package in list(pending_stops.stops.get(location_index, ())):
+            truck.deliver_package(package)
 
 
 """
 Travel to the closest address related to a package on the truck and deliver all packages for that stop.
 """
 def travel_nearest_stop(truck):
-    current_location_index = truck.get_location_index()
-    # List to reference the best next stop location, current location, and  package numbers intended for that address.
-    closest_stop_data = None
+    # Search stops rather than packages; all stops at the minimum distance are delivered, and the first one picks the
+    # truck's new location.
+    closest_distance, closest_location_indexes = find_nearest_stop(truck)
+    travel_to_stop(truck, closest_distance, closest_location_indexes)
 
-    for package in truck.get_packages_held():
-        potential_location_index = package.get_address_index()
-        potential_location_distance = access_pyramid_table(distance_table,
-                                                            current_location_index, potential_location_index)
-        if not closest_stop_data or potential_location_distance < closest_stop_data[1]:
-            closest_stop_data = [potential_location_index, potential_location_distance, [package.get_package_id()]]
-        elif potential_location_distance == closest_stop_data[1]:
-            closest_stop_data[2].append(package.get_package_id())
 
-    truck.set_location_index(closest_stop_data[0])
-    truck.update_distance_traveled(closest_stop_data[1])
-    for p in closest_stop_data[2]:
-        truck.deliver_package(get_package(p))
+def get_distance_to_hub(truck):
+    return context.distance_table.get_distance(truck.get_location_index(), HUB_INDEX)
 
 
 def travel_to_hub(truck):
     """Travel to hub and update distance traveled and time."""
-    distance_to_hub = distance_table[truck.get_location_index()][HUB_INDEX]
+    distance_to_hub = get_distance_to_hub(truck)
     truck.set_location_index(HUB_INDEX)
     truck.update_distance_traveled(distance_to_hub)
 
 
+def build_status_timeline():
+    """Build status_timeline from all packages, once deliveries have been simulated."""
+    with timed_phase('build status timeline'):
+        context.status_timeline = StatusTimeline((package for key, package in context.package_hash_table.items()),
+                                                 context.full_address_table, context.address_history)
+    return context.status_timeline
+
+
 def print_status_all_packages(time):
-    """Print status of all packages at a given time."""
-    package_id = 0
+    """Print status of all packages at a given time.
+
+    Rows are written in batches, using status_timeline, which is built on first use.
+    """
+    if context.status_timeline is None:
+        build_status_timeline()
     print('\nDisplaying data...')
     print('Package ID, Address, City, Zip Code, Delivery Deadline, Mass in Kilograms, Status, Delivery Time')
 
-    while package_id < num_packages:
-        package_id += 1
-        package = get_package(str(package_id))
-        delivery_time = package.get_time_delivered()
-
-        #FIXME if package_id == 9 and time < package_9_bad_address[0]:
-        #    address = package_9_bad_address[1]
-        #    city = package_9_bad_address[2]
-        #    zip_code = package_9_bad_address[3]
-        #else:
-
-        address = full_address_table[package.get_address_index()][1:5]
-        print(address)
-        street = address[0]
-        city = address[1]
-        zip_code = address[3]
-
-        if delivery_time > time:                  # Package not delivered
-            if package.get_time_loaded() > time:  # Package not loaded
-                delivery_status = 'at the hub'
-                delivery_time = ''
-            else:                                 # Package loaded
-                delivery_status = f'en route - on {package.get_assigned_truck()}'
-                delivery_time = ''
-        else:                                     # Package delivered
-            delivery_status = f'{package.get_status()} by {package.get_assigned_truck()}'
-            delivery_time = ', ' + str(delivery_time)
-        print(f'{package.get_package_id()}, {street}, {city}, {zip_code},'
-              f' {package.get_deadline()}, {package.get_mass()}, {delivery_status}{delivery_time}')
+    # Packages whose address was changed, such as package 9, are shown with the address they had at the given time.
+    for batch in context.status_timeline.iter_batches(time_to_seconds(time)):
+        sys.stdout.write(batch)
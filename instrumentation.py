@@ -0,0 +1,181 @@
+import atexit
+import cProfile
+import functools
+import os
+import sys
+import time
+import helper
+import routing
+from truck import Truck
+
+
+# Functions counted and timed once instrumentation is enabled, by name. Nothing is wrapped
+# while instrumentation is disabled, so the hot paths run at full speed.
+HELPER_FUNCTIONS = ['get_package', 'travel_nearest_stop', 'find_nearest_stop', 'find_deadline_stop', 'travel_to_stop',
+                    'travel_to_hub', 'update_address_data', 'import_location_distance_data', 'register_package_rows',
+                    'load_tables', 'build_status_timeline']
+ROUTING_FUNCTIONS = ['plan_route', 'improve_route']
+TRUCK_METHODS = ['load_package', 'deliver_package', 'update_distance_traveled', 'set_location_index',
+                 'set_time_on_clock']
+
+# Environment variables read by enable_from_environment.
+ENABLE_VARIABLE = 'WGUPS_INSTRUMENT'  # Set to any value other than '' or '0' to print a summary at exit
+PROFILE_VARIABLE = 'WGUPS_PROFILE'    # Set to a path to also save cProfile statistics there at exit
+
+# Calls and total seconds, keyed by function name.
+call_counts = {}
+call_seconds = {}
+
+# Hops, nearest-stop searches, searches that fell back to a full scan, stops scanned by those searches, miles, and
+# simulated minutes of each truck's routes, keyed by truck name.
+route_metrics = {}
+
+enabled = False
+profiler = None
+originals = []  # (owner, name, original function) for each wrapped function, used by disable
+
+
+def count_calls(name, function):
+    """Return a wrapper of a function that counts and times its calls."""
+    call_counts[name] = 0
+    call_seconds[name] = 0.0
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            call_seconds[name] += time.perf_counter() - start
+            call_counts[name] += 1
+    return wrapper
+
+
+def get_route_metrics(truck):
+    metrics = route_metrics.get(truck.get_name())
+    if metrics is None:
+        metrics = route_metrics[truck.get_name()] = {'hops': 0, 'searches': 0, 'full_scans': 0, 'stops_scanned': 0,
+                                                     'miles': 0.0, 'minutes': 0.0}
+    return metrics
+
+
+def record_search(function):
+    """Return a wrapper of a nearest-stop search that records whether it fell back to scanning every pending stop.
+
+    Searches answered from the candidate list of the truck's location scan no stops.
+    """
+    @functools.wraps(function)
+    def wrapper(truck):
+        result = function(truck)
+        metrics = get_route_metrics(truck)
+        stops_scanned = truck.get_pending_stops().stops_scanned
+        metrics['searches'] += 1
+        metrics['full_scans'] += stops_scanned > 0
+        metrics['stops_scanned'] += stops_scanned
+        return result
+    return wrapper
+
+
+def record_travel(function):
+    """Return a wrapper of travel_to_stop that records hops, miles, and simulated minutes."""
+    @functools.wraps(function)
+    def wrapper(truck, distance, location_indexes):
+        metrics = get_route_metrics(truck)
+        metrics['hops'] += 1
+        metrics['miles'] += distance
+        metrics['minutes'] += truck.get_travel_time(distance).total_seconds() / 60
+        return function(truck, distance, location_indexes)
+    return wrapper
+
+
+def record_return(function):
+    """Return a wrapper of travel_to_hub that records the miles and simulated minutes of returning to the hub."""
+    @functools.wraps(function)
+    def wrapper(truck):
+        metrics = get_route_metrics(truck)
+        miles = truck.get_distance_traveled()
+        minutes = truck.get_time_on_clock()
+        result = function(truck)
+        metrics['miles'] += truck.get_distance_traveled() - miles
+        metrics['minutes'] += (truck.get_time_on_clock() - minutes).total_seconds() / 60
+        return result
+    return wrapper
+
+
+def wrap(owner, name, wrapper):
+    original = getattr(owner, name)
+    originals.append((owner, name, original))
+    setattr(owner, name, wrapper(original))
+
+
+def enable(profile_file=None, summary=True):
+    """Wrap hot-path functions with counters and timers, and optionally start cProfile.
+
+    Args:
+        profile_file (:obj:`str`, optional): A path to save cProfile statistics to at exit. Defaults to None.
+        summary (:obj:`bool`, optional): Whether to print a summary to stderr at exit. Defaults to True.
+
+    """
+    global enabled, profiler
+    if enabled:
+        return
+    enabled = True
+    for name in HELPER_FUNCTIONS:
+        wrap(helper, name, functools.partial(count_calls, name))
+    for name in ROUTING_FUNCTIONS:
+        wrap(routing, name, functools.partial(count_calls, f'routing.{name}'))
+    for name in TRUCK_METHODS:
+        wrap(Truck, name, functools.partial(count_calls, f'Truck.{name}'))
+    # Route metrics wrap the counted functions, so simulation code picks up both through the module attributes.
+    wrap(helper, 'find_nearest_stop', record_search)
+    wrap(helper, 'find_deadline_stop', record_search)
+    wrap(helper, 'travel_to_stop', record_travel)
+    wrap(helper, 'travel_to_hub', record_return)
+
+    if profile_file:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        atexit.register(save_profile, profile_file)
+    if summary:
+        atexit.register(print_summary)
+
+
+def disable():
+    """Restore the original functions and stop cProfile, keeping the recorded data."""
+    global enabled, profiler
+    while originals:
+        owner, name, original = originals.pop()
+        setattr(owner, name, original)
+    if profiler is not None:
+        profiler.disable()
+    enabled = False
+
+
+def enable_from_environment():
+    """Enable instrumentation if WGUPS_INSTRUMENT or WGUPS_PROFILE is set."""
+    profile_file = os.environ.get(PROFILE_VARIABLE)
+    if os.environ.get(ENABLE_VARIABLE, '') not in ('', '0') or profile_file:
+        enable(profile_file)
+
+
+def save_profile(profile_file):
+    """Save cProfile statistics, which can be read with pstats."""
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_file)
+        print(f'Profile saved to {profile_file}', file=sys.stderr)
+
+
+def print_summary(file=None):
+    """Print call counts and times of each wrapped function, and each truck's route metrics."""
+    file = file or sys.stderr
+    print('\nFunction, Calls, Total ms, Mean us', file=file)
+    for name in sorted(call_counts, key=call_seconds.get, reverse=True):
+        calls = call_counts[name]
+        if calls:
+            print(f'{name}, {calls}, {call_seconds[name] * 1000:.2f}, {call_seconds[name] / calls * 1e6:.2f}',
+                  file=file)
+    print('\nTruck, Hops, Searches, Full scans, Stops scanned, Miles, Simulated minutes', file=file)
+    for truck_name, metrics in route_metrics.items():
+        print(f'{truck_name}, {metrics["hops"]}, {metrics["searches"]}, {metrics["full_scans"]}, '
+              f'{metrics["stops_scanned"]}, {metrics["miles"]:.1f}, {metrics["minutes"]:.1f}', file=file)
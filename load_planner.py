@@ -0,0 +1,537 @@
+import datetime
+import re
+import helper
+from distance_matrix import find_nearest_candidate
+from package import END_OF_DAY, parse_time
+
+
+TRUCK_PATTERN = re.compile(r'can only be on truck (\d+)', re.IGNORECASE)
+DELAYED_PATTERN = re.compile(r'will not arrive to depot until (\d{1,2}:\d{2}\s*[ap]\.?m\.?)', re.IGNORECASE)
+GROUP_PATTERN = re.compile(r'must be delivered with ([\d,\s]+)', re.IGNORECASE)
+WRONG_ADDRESS_PATTERN = re.compile(r'wrong address', re.IGNORECASE)
+
+
+class PackageConstraints:
+    """A class used to represent the loading constraints of a package, parsed from its deadline and special note.
+
+    Attributes:
+        package_id (str): The id of the package.
+        address_index (int): The index of the package's destination.
+        deadline (int): The delivery deadline, in seconds after midnight.
+        ready_time (int): The time that the package can be loaded, in seconds after midnight.
+        required_truck (int): The number (starting at 1) of the only truck that can deliver the package, or None.
+        delivered_with (:obj:`list` of :obj:`str`): Ids of packages that must be on the same truck load.
+        address_pending (bool): Whether the listed address is wrong and will be corrected at ready_time.
+
+    """
+
+    __slots__ = ('package_id', 'address_index', 'deadline', 'ready_time', 'required_truck', 'delivered_with',
+                 'address_pending')
+
+    def __init__(self, package, start_time, address_fix_time):
+        """Construct a PackageConstraints object.
+
+        Args:
+            package (Package): The package to parse.
+            start_time (int): The time, in seconds, that packages without a delay are ready.
+            address_fix_time (int): The time, in seconds, that wrong addresses are corrected.
+
+        """
+        special = package.get_special()
+        self.package_id = package.get_package_id()
+        self.address_index = package.get_address_index()
+        self.deadline = parse_time(package.get_deadline())
+        self.ready_time = start_time
+        self.required_truck = None
+        self.delivered_with = []
+        self.address_pending = False
+
+        match = TRUCK_PATTERN.search(special)
+        if match:
+            self.required_truck = int(match.group(1))
+        match = DELAYED_PATTERN.search(special)
+        if match:
+            self.ready_time = max(start_time, parse_time(match.group(1)))
+        match = GROUP_PATTERN.search(special)
+        if match:
+            self.delivered_with = [i.strip() for i in match.group(1).split(',') if i.strip()]
+        if WRONG_ADDRESS_PATTERN.search(special):
+            self.address_pending = True
+            self.ready_time = max(self.ready_time, address_fix_time)
+
+
+class LoadGroup:
+    """A class used to represent packages that are always loaded together.
+
+    Attributes:
+        package_ids (:obj:`list` of :obj:`str`): Ids of packages in the group.
+        stops (:obj:`dict` of :obj:`int` to :obj:`int`): The earliest deadline, in seconds, keyed by address index.
+        ready_time (int): The time that all packages in the group can be loaded, in seconds.
+        deadline (int): The earliest deadline in the group, in seconds.
+        required_truck (int): The number of the only truck that can deliver the group, or None.
+
+    """
+
+    __slots__ = ('package_ids', 'stops', 'ready_time', 'deadline', 'required_truck')
+
+    def __init__(self, constraints):
+        """Construct a LoadGroup object from a list of PackageConstraints objects."""
+        self.package_ids = []
+        self.stops = {}
+        self.ready_time = 0
+        self.deadline = END_OF_DAY
+        self.required_truck = None
+        for c in constraints:
+            self.package_ids.append(c.package_id)
+            self.stops[c.address_index] = min(self.stops.get(c.address_index, END_OF_DAY), c.deadline)
+            self.ready_time = max(self.ready_time, c.ready_time)
+            self.deadline = min(self.deadline, c.deadline)
+            if c.required_truck is not None:
+                if self.required_truck not in (None, c.required_truck):
+                    raise ValueError(f'Packages {self.package_ids} must be delivered together, but are restricted to '
+                                     f'different trucks.')
+                self.required_truck = c.required_truck
+
+    def __len__(self):
+        return len(self.package_ids)
+
+
+class Trip:
+    """A class used to represent one planned load of a truck.
+
+    Attributes:
+        truck_number (int): The number (starting at 1) of the truck making the trip.
+        groups (:obj:`list` of :obj:`LoadGroup`): The groups loaded for the trip.
+        size (int): The number of packages loaded.
+        ready_time (int): The time that all packages for the trip can be loaded, in seconds.
+        stops (:obj:`dict` of :obj:`int` to :obj:`int`): The stops returned by get_stops, or None until they are next
+            needed.
+        route (tuple): The estimated route of the trip, as returned by LoadPlanner.estimate_route, or None until it is
+            next needed. It is cleared whenever a group is added or removed.
+
+    """
+
+    __slots__ = ('truck_number', 'groups', 'size', 'ready_time', 'stops', 'route')
+
+    def __init__(self, truck_number):
+        self.truck_number = truck_number
+        self.groups = []
+        self.size = 0
+        self.ready_time = 0
+        self.stops = None
+        self.route = None
+
+    def add(self, group):
+        self.groups.append(group)
+        self.size += len(group)
+        self.ready_time = max(self.ready_time, group.ready_time)
+        self.stops = self.route = None
+
+    def remove(self, group):
+        self.groups.remove(group)
+        self.size -= len(group)
+        self.ready_time = max((g.ready_time for g in self.groups), default=0)
+        self.stops = self.route = None
+
+    def get_stops(self):
+        """Return the earliest deadline for each stop of the trip, keyed by address index."""
+        if self.stops is None:
+            self.stops = {}
+            for group in self.groups:
+                for address_index, deadline in group.stops.items():
+                    self.stops[address_index] = min(self.stops.get(address_index, END_OF_DAY), deadline)
+        return self.stops
+
+    def get_package_ids(self):
+        return [package_id for group in self.groups for package_id in group.package_ids]
+
+
+class LoadPlanner:
+    """A class used to assign packages to truck loads, based on deadlines and constraints in special notes.
+
+    Packages that must be delivered together, and packages for the same address, are clustered into groups. Groups
+    with deadlines are packed first, each to the earliest trip that it makes no stop later for, then remaining
+    groups are packed to the trip with the closest stops. A group that would make a stop later on every trip with room
+    goes wherever it adds the least lateness, which may be a new trip, so that deadlines that cannot all be met do not
+    leave trips half empty. While a truck has no trips, each group is also tried on a new trip for it, so that every
+    truck of a larger fleet is put to use when that finishes the day sooner. A final repair pass moves groups between
+    trips when that shortens the estimated routes. Trip times are estimated with the same nearest-stop routing used by
+    the trucks.
+
+    Attributes:
+        trucks (:obj:`list` of :obj:`Truck`): The trucks in the fleet. Truck numbers in special notes index this list.
+        constraints (:obj:`dict` of :obj:`str` to :obj:`PackageConstraints`): Parsed constraints keyed by package id.
+        groups (:obj:`list` of :obj:`LoadGroup`): The groups of packages to load.
+        trips (:obj:`list` of :obj:`list` of :obj:`Trip`): The planned trips of each truck, in order.
+
+    """
+
+    MAX_CANDIDATES = 8  # Trips with room that are tried for each group before a new trip is started
+
+    def __init__(self, trucks, package_ids=None, address_fix_time=helper.ADDRESS_FIX_TIME):
+        """Construct a LoadPlanner object and parse constraints for each package.
+
+        Args:
+            trucks (:obj:`list` of :obj:`Truck`): The trucks in the fleet, each waiting at the hub.
+            package_ids (:obj:`list` of :obj:`str`, optional): Ids of the packages to plan. Defaults to None, to plan
+                every package in package_hash_table. Packages with an address that does not match any location, which
+                helper.update_address_data reports, are left at the hub.
+            address_fix_time (:obj:`time`, optional): The time that wrong addresses are corrected. Defaults to
+                helper.ADDRESS_FIX_TIME.
+
+        Raises:
+            ValueError: If a package can only be on a truck that is not in the fleet.
+
+        """
+        self.trucks = list(trucks)
+        if package_ids is None:
+            package_ids = sorted(helper.package_hash_table, key=int)
+        start_time = min(round(truck.get_time_on_clock().total_seconds()) for truck in self.trucks)
+        fix_time = round(address_fix_time.total_seconds())
+        self.constraints = {}
+        for package_id in package_ids:
+            package = helper.get_package(package_id)
+            if package.get_address_index() < 0:
+                continue
+            c = self.constraints[package_id] = PackageConstraints(package, start_time, fix_time)
+            if c.required_truck is not None and not 1 <= c.required_truck <= len(self.trucks):
+                raise ValueError(f'Package {package_id} can only be on truck {c.required_truck}, but the fleet has '
+                                 f'{len(self.trucks)} truck{"s" if len(self.trucks) != 1 else ""}.')
+        self.groups = []
+        self.trips = [[] for truck in self.trucks]
+
+
+    def build_groups(self):
+        """Cluster packages into groups by 'delivered with' notes and shared addresses."""
+        parent = {package_id: package_id for package_id in self.constraints}
+        size = {package_id: 1 for package_id in self.constraints}
+        capacity = min(truck.get_capacity() for truck in self.trucks)
+
+        def find(package_id):
+            while parent[package_id] != package_id:
+                parent[package_id] = parent[parent[package_id]]
+                package_id = parent[package_id]
+            return package_id
+
+        def union(package_id, other_id):
+            root, other_root = find(package_id), find(other_id)
+            if root != other_root:
+                parent[other_root] = root
+                size[root] += size[other_root]
+
+        # Packages that must be delivered together are always grouped.
+        for c in self.constraints.values():
+            for other_id in c.delivered_with:
+                if other_id in parent:
+                    union(c.package_id, other_id)
+        for package_id in self.constraints:
+            if size[find(package_id)] > capacity:
+                raise ValueError(f'Packages delivered with package {package_id} exceed the capacity of a truck.')
+
+        # Packages for the same address are grouped while they fit on a truck, unless grouping would hold a package
+        # with a deadline at the hub past its ready time, or the address is still wrong.
+        by_address = {}
+        for c in self.constraints.values():
+            if not c.address_pending:
+                by_address.setdefault(c.address_index, []).append(c)
+        for same_address in by_address.values():
+            first = same_address[0]
+            for c in same_address[1:]:
+                early, late = (first, c) if first.ready_time <= c.ready_time else (c, first)
+                if early.ready_time != late.ready_time and early.deadline != END_OF_DAY:
+                    continue
+                if find(c.package_id) != find(first.package_id) and \
+                        size[find(c.package_id)] + size[find(first.package_id)] <= capacity:
+                    union(first.package_id, c.package_id)
+
+        members = {}
+        for package_id, c in self.constraints.items():
+            members.setdefault(find(package_id), []).append(c)
+        self.groups = [LoadGroup(group_constraints) for group_constraints in members.values()]
+
+
+    def estimate_route(self, stops, speed):
+        """Estimate a trip's nearest-stop route, from the hub and back.
+
+        Args:
+            stops (:obj:`dict` of :obj:`int` to :obj:`int`): The earliest deadline, in seconds, keyed by address index.
+            speed (float): The speed of the truck, in mph.
+
+        Returns:
+            A tuple of a :obj:`list` of (seconds after departure, deadline) tuples for each stop with a deadline, the
+            distance traveled, and the seconds from departure until the truck is back at the hub.
+
+        """
+        distance_table = helper.distance_table
+        pending = list(stops)
+        pending_set = set(pending)
+        location = helper.HUB_INDEX
+        elapsed = 0.0
+        total_distance = 0.0
+        arrivals = []
+        while pending:
+            nearest = find_nearest_candidate(distance_table, location, pending_set)
+            if nearest is None:
+                distances = distance_table.get_distances(location, pending)
+                i = int(distances.argmin())
+                distance = float(distances[i])
+                location = pending.pop(i)
+            else:
+                distance, location = nearest
+                pending.remove(location)
+            pending_set.discard(location)
+            total_distance += distance
+            elapsed += distance / speed * 3600
+            if stops[location] < END_OF_DAY:
+                arrivals.append((elapsed, stops[location]))
+        to_hub = distance_table.get_distance(location, helper.HUB_INDEX)
+        return arrivals, total_distance + to_hub, elapsed + to_hub / speed * 3600
+
+
+    def estimate_truck(self, truck_number):
+        """Estimate the trips of one truck in order.
+
+        Routes are only estimated again for trips that changed since they were last estimated.
+
+        Returns:
+            A tuple of the total distance traveled, the total seconds that stops are reached past their deadlines,
+            and the time, in seconds, that the truck is back at the hub after its last trip.
+
+        """
+        truck = self.trucks[truck_number - 1]
+        clock = round(truck.get_time_on_clock().total_seconds())
+        total_distance = 0.0
+        lateness = 0.0
+        for trip in self.trips[truck_number - 1]:
+            if trip.route is None:
+                trip.route = self.estimate_route(trip.get_stops(), truck.get_speed())
+            arrivals, distance, duration = trip.route
+            departure = max(clock, trip.ready_time)
+            for elapsed, deadline in arrivals:
+                if departure + elapsed > deadline:
+                    lateness += departure + elapsed - deadline
+            total_distance += distance
+            clock = departure + duration
+        return total_distance, lateness, clock
+
+
+    def get_truck_numbers(self, group):
+        if group.required_truck is not None:
+            return [group.required_truck]
+        return range(1, len(self.trucks) + 1)
+
+
+    def has_room(self, group, trip):
+        return trip.size + len(group) <= self.trucks[trip.truck_number - 1].get_capacity()
+
+
+    def try_add(self, group, trip):
+        """Add a group to a trip if it fits and no stop of the truck is made later than its deadline by it.
+
+        Returns:
+            The estimated distance traveled by the truck with the group added, or None if the group was not added.
+
+        """
+        if not self.has_room(group, trip):
+            return None
+        lateness = self.estimate_truck(trip.truck_number)[1]
+        trip.add(group)
+        distance, new_lateness, finish = self.estimate_truck(trip.truck_number)
+        if new_lateness <= lateness:
+            return distance
+        trip.remove(group)
+        return None
+
+
+    def add_to_least_late(self, group, candidates):
+        """Add a group where it adds the least lateness, once no trip with room can take it without lateness.
+
+        Each candidate trip is tried, along with a new trip for each truck that may deliver the group. Ties are broken
+        by the number of trips of the truck, so that new trips go to the truck with the fewest, then by the distance
+        added.
+
+        Args:
+            group (LoadGroup): The group to add.
+            candidates (:obj:`list` of :obj:`Trip`): Existing trips with room for the group.
+
+        Returns:
+            The Trip object the group was added to.
+
+        """
+        best = None
+        for trip in candidates + [Trip(truck_number) for truck_number in self.get_truck_numbers(group)]:
+            truck_trips = self.trips[trip.truck_number - 1]
+            distance, lateness, finish = self.estimate_truck(trip.truck_number)
+            is_new = not trip.groups
+            if is_new:
+                truck_trips.append(trip)
+            trip.add(group)
+            new_distance, new_lateness, finish = self.estimate_truck(trip.truck_number)
+            key = (round(new_lateness - lateness), len(truck_trips), new_distance - distance)
+            if best is None or key < best[0]:
+                best = (key, trip)
+            trip.remove(group)
+            if is_new:
+                truck_trips.pop()
+        trip = best[1]
+        if not trip.groups:
+            self.trips[trip.truck_number - 1].append(trip)
+        trip.add(group)
+        return trip
+
+
+    def get_fleet_estimate(self):
+        """Return the total lateness in whole seconds, the time the last truck is back at the hub, and the total
+        distance of every truck's trips."""
+        estimates = [self.estimate_truck(n) for n in range(1, len(self.trucks) + 1)]
+        return (round(sum(estimate[1] for estimate in estimates)), max(estimate[2] for estimate in estimates),
+                sum(estimate[0] for estimate in estimates))
+
+
+    def move_to_idle_truck(self, group, trip):
+        """Move a group from the trip it was packed to, to a new trip on a truck with no trips, if that is better.
+
+        Moves are compared by the total lateness of the fleet, then by the time the last truck is back at the hub,
+        then by the total distance, so that a larger fleet shares the work rather than leaving trucks unused.
+
+        Args:
+            group (LoadGroup): The group, already added to trip.
+            trip (Trip): The trip the group was packed to.
+
+        """
+        idle = [n for n in self.get_truck_numbers(group) if not self.trips[n - 1] and n != trip.truck_number]
+        if not idle:
+            return
+        best = (self.get_fleet_estimate(), trip)
+        trip.remove(group)
+        if not trip.groups:
+            self.trips[trip.truck_number - 1].remove(trip)
+        for truck_number in idle:
+            new_trip = Trip(truck_number)
+            new_trip.add(group)
+            self.trips[truck_number - 1].append(new_trip)
+            estimate = self.get_fleet_estimate()
+            if estimate < best[0]:
+                best = (estimate, new_trip)
+            self.trips[truck_number - 1].pop()
+        if best[1] is trip and not trip.groups:
+            self.trips[trip.truck_number - 1].append(trip)
+        best[1].add(group)
+        if best[1] is not trip:
+            self.trips[best[1].truck_number - 1].append(best[1])
+
+
+    def get_proximity(self, group, trip):
+        """Return the shortest distance between a stop of a group and a stop of a trip."""
+        trip_stops = list(trip.get_stops())
+        return min(float(helper.distance_table.get_distances(address_index, trip_stops).min())
+                   for address_index in group.stops)
+
+
+    def plan(self):
+        """Assign every package to a trip.
+
+        Returns:
+            A :obj:`list` of (truck, package ids, ready time) tuples, with each truck's trips in order.
+
+        """
+        self.build_groups()
+        deadline_groups = sorted((g for g in self.groups if g.deadline < END_OF_DAY),
+                                 key=lambda g: (g.deadline, g.ready_time, -len(g)))
+        other_groups = sorted((g for g in self.groups if g.deadline == END_OF_DAY),
+                              key=lambda g: (g.ready_time, -len(g)))
+
+        # Pack groups with deadlines first, to the earliest trip that keeps all deadlines.
+        for group in deadline_groups:
+            candidates = [trip for truck_number in self.get_truck_numbers(group)
+                          for trip in self.trips[truck_number - 1] if self.has_room(group, trip)]
+            candidates.sort(key=lambda trip: (max(trip.ready_time, group.ready_time),
+                                              self.trips[trip.truck_number - 1].index(trip)))
+            candidates = candidates[:self.MAX_CANDIDATES]
+            placed = next((trip for trip in candidates if self.try_add(group, trip) is not None), None)
+            self.move_to_idle_truck(group, placed or self.add_to_least_late(group, candidates))
+
+        # Pack remaining groups to the trip with the closest stops, avoiding trips that would wait for the group.
+        for group in other_groups:
+            candidates = [trip for truck_number in self.get_truck_numbers(group)
+                          for trip in self.trips[truck_number - 1] if self.has_room(group, trip)]
+            candidates.sort(key=lambda trip: (group.ready_time > trip.ready_time, self.get_proximity(group, trip)))
+            candidates = candidates[:self.MAX_CANDIDATES]
+            placed = next((trip for trip in candidates if self.try_add(group, trip) is not None), None)
+            self.move_to_idle_truck(group, placed or self.add_to_least_late(group, candidates))
+
+        self.repair()
+        return self.get_plan()
+
+
+    def repair(self):
+        """Move groups without deadlines to other trips when that shortens estimated routes without adding lateness."""
+        distances = [self.estimate_truck(n)[0] for n in range(1, len(self.trucks) + 1)]
+        trip_of = {id(group): trip for trips in self.trips for trip in trips for group in trip.groups}
+        for group in [g for g in self.groups if g.deadline == END_OF_DAY]:
+            source = trip_of[id(group)]
+            if len(source.groups) == 1:
+                continue
+            lateness = self.estimate_truck(source.truck_number)[1]
+            source.remove(group)
+            source_distance, source_lateness, finish = self.estimate_truck(source.truck_number)
+            if source_lateness > lateness:
+                source.add(group)
+                continue
+            candidates = [trip for truck_number in self.get_truck_numbers(group)
+                          for trip in self.trips[truck_number - 1]
+                          if trip is not source and group.ready_time <= trip.ready_time and self.has_room(group, trip)]
+            candidates.sort(key=lambda trip: self.get_proximity(group, trip))
+            best = None
+            for trip in candidates[:self.MAX_CANDIDATES]:
+                new_distance = self.try_add(group, trip)
+                if new_distance is None:
+                    continue
+                if trip.truck_number == source.truck_number:
+                    saved = distances[trip.truck_number - 1] - new_distance
+                else:
+                    saved = (distances[source.truck_number - 1] - source_distance
+                             + distances[trip.truck_number - 1] - new_distance)
+                if saved > 1e-9 and (best is None or saved > best[0]):
+                    best = (saved, trip)
+                trip.remove(group)
+            if best is None:
+                source.add(group)
+                continue
+            best[1].add(group)
+            trip_of[id(group)] = best[1]
+            for truck_number in {source.truck_number, best[1].truck_number}:
+                distances[truck_number - 1] = self.estimate_truck(truck_number)[0]
+
+
+    def get_plan(self):
+        plan = []
+        for truck, trips in zip(self.trucks, self.trips):
+            for trip in trips:
+                plan.append((truck, trip.get_package_ids(), datetime.timedelta(seconds=trip.ready_time)))
+        return plan
+
+
+    def get_ready_times(self):
+        """Return ids of packages that are not ready at the start of the day, keyed by the time they are ready."""
+        start_time = min(round(truck.get_time_on_clock().total_seconds()) for truck in self.trucks)
+        ready_times = {}
+        for c in self.constraints.values():
+            if c.ready_time > start_time:
+                ready_times.setdefault(datetime.timedelta(seconds=c.ready_time), []).append(c.package_id)
+        return ready_times
+
+
+    def get_pending_addresses(self):
+        """Return ids of packages whose listed address is wrong and will be corrected at the address fix time."""
+        return [c.package_id for c in self.constraints.values() if c.address_pending]
+
+
+    def schedule(self, simulation):
+        """Plan loads, then queue the trips and package-ready events to a Simulation object."""
+        plan = self.plan()
+        for ready_time, package_ids in self.get_ready_times().items():
+            simulation.schedule_package_ready(ready_time, package_ids)
+        for truck, package_ids, ready_time in plan:
+            simulation.add_trip(truck, package_ids)
+        return plan
@@ -1,43 +1,137 @@
+import argparse
 import datetime
+import os
+import sys
 import helper
+import export
+import instrumentation
+import routing
+from package import parse_time
+from pending_stops import InfeasiblePlanError
+from simulation import plan_day
+from status_timeline import RECORD_COLUMNS, RECORD_FORMATS
 from truck import Truck
 
 
-if __name__ == '__main__':
-    # Import data from the two CSV files and create Truck objects.
-    helper.import_location_distance_data()
-    helper.register_packages()
+CACHE_FILE = 'wgups_tables.cache'  # Parsed tables, saved next to the distance file and reused while it is unchanged
+OUTPUT_BUFFER_SIZE = 1 << 20       # Bytes buffered before query results are written to the output file
+
+
+def parse_arguments(argv=None):
+    """Parse command-line arguments. With no query times or export path given, the interactive menu is run."""
+    parser = argparse.ArgumentParser(description='Simulate WGUPS deliveries and report package statuses.')
+    parser.add_argument('--distance-file', default=helper.DISTANCE_FILE, help='path of the distance table CSV file')
+    parser.add_argument('--package-file', default=helper.PACKAGE_FILE, help='path of the package CSV file')
+    parser.add_argument('--cache-file',
+                        help=f"path of the parsed table cache (default: {CACHE_FILE} in the directory of the distance "
+                             f"file), or '' to always parse the CSV files")
+    parser.add_argument('--time', action='append', default=[], dest='times', metavar='TIME',
+                        help="query time such as '10:30', '2:15 PM', or 'EOD'; may be repeated")
+    parser.add_argument('--times-file',
+                        help='file of query times, one per line; blank lines and # comments are skipped')
+    parser.add_argument('--format', choices=RECORD_FORMATS, default='csv', help='format of query results')
+    parser.add_argument('--output', help='path of the query results file (default: standard output)')
+    parser.add_argument('--deadline-routing', action='store_true',
+                        help='check deadlines at every hop, and stop as soon as one can no longer be met')
+    parser.add_argument('--export', metavar='PATH',
+                        help='write the delivery log of every package to a .parquet, .arrow, or .npy file')
+    parser.add_argument('--timings', action='store_true',
+                        help='print the time spent in each phase, and the miles saved by improving routes, to '
+                             'standard error')
+    parser.add_argument('--profile', metavar='PATH', help='count hot-path calls and save cProfile statistics to PATH')
+    return parser, parser.parse_args(argv)
+
+
+def read_query_times(times, times_file=None):
+    """Return query times from the command line and a times file as sorted seconds after midnight.
+
+    Raises:
+        ValueError: If a time cannot be parsed.
+
+    """
+    texts = list(times)
+    if times_file:
+        with open(times_file) as file:
+            texts.extend(line.split('#')[0] for line in file)
+    seconds = []
+    for text in texts:
+        if not text.strip():
+            continue
+        try:
+            seconds.append(parse_time(text))
+        except ValueError:
+            raise ValueError(f'Invalid query time: {text.strip()!r}') from None
+    return sorted(seconds)
+
+
+def get_default_cache_file(distance_file):
+    """Return the path of CACHE_FILE in the directory of the distance file, so the cache is shared by every run."""
+    return os.path.join(os.path.dirname(os.path.abspath(distance_file)), CACHE_FILE)
+
+
+def run_simulation(distance_file=helper.DISTANCE_FILE, package_file=helper.PACKAGE_FILE, cache_file=None,
+                   deadline_routing=False, route_reports=None):
+    """Import data, plan each truck's loads, and simulate the day's deliveries.
+
+    With deadline routing, InfeasiblePlanError is raised as soon as a package can no longer meet its deadline. The
+    parsed tables are cached to cache_file, which defaults to CACHE_FILE next to the distance file; '' turns the cache
+    off. If route_reports is a list, the RouteReport of each improved route is appended to it.
+
+    Returns:
+        A :obj:`list` of the Truck objects, once every delivery is simulated.
+
+    """
+    # Import data from the two CSV files, or from a cache of their parsed tables, and create Truck objects. Data of an
+    # earlier run is removed first, so that run_simulation can be called again.
+    helper.reset_phase_timings()
+    helper.reset_tables()
+    if cache_file is None:
+        cache_file = get_default_cache_file(distance_file)
+    helper.load_tables(distance_file, package_file, cache_file)
     truck_one = Truck('Truck One')
     truck_two = Truck('Truck Two')
 
-    # Load truck_two and deliver its first round of packages.
-    helper.load_truck_two(truck_two)
-    while len(truck_two.packages_held) > 0:
-        helper.travel_nearest_stop(truck_two)
-    helper.travel_to_hub(truck_two)
-
-    # Load truck_one and deliver its first round of packages.
-    # The time is set to 9:05 a.m. because packages 6 and 25 are delayed and arrive at the hub at that time.
-    truck_one.set_time_on_clock(datetime.timedelta(hours=9, minutes=5))
-    helper.load_truck_one(truck_one)
-    while len(truck_one.packages_held) > 0:
-        helper.travel_nearest_stop(truck_one)
-    helper.travel_to_hub(truck_one)
-
-    # Load truck_two and deliver its next round of packages.
-    helper.load_truck_two_again(truck_two)
-    while len(truck_two.packages_held) > 0:
-        helper.travel_nearest_stop(truck_two)
-    helper.travel_to_hub(truck_two)
-
-    # Load truck_one and deliver the remaining packages.
-    # Package 9, with an incorrect address, will be corrected and loaded, as it should be past 10:20 a.m. by this time.
-    helper.load_truck_one_again(truck_one)
-    while len(truck_one.packages_held) > 0:
-        helper.travel_nearest_stop(truck_one)
-    helper.travel_to_hub(truck_one)
-
-    # Run the user interface prompts.
+    # Plan each truck's loads from package deadlines and special notes, and simulate both trucks on a shared clock.
+    # Delayed packages, and packages with a wrong address until it is corrected, are held at the hub until ready.
+    # Each route is improved with up to routing.MOVE_BUDGET candidate moves before a truck departs.
+    simulation = plan_day([truck_one, truck_two], routing.MOVE_BUDGET, deadline_routing)
+    simulation.run()
+    if route_reports is not None:
+        route_reports.extend(simulation.route_reports)
+    helper.build_status_timeline()
+    return [truck_one, truck_two]
+
+
+def print_route_summary(route_reports, file=None):
+    """Print the miles saved by route improvement and the time it took, to standard error by default."""
+    file = file or sys.stderr
+    miles_saved = sum(report.get_miles_saved() for report in route_reports)
+    seconds = sum(report.seconds for report in route_reports)
+    print(f'improve routes: {seconds * 1000:.2f} ms, {miles_saved:.1f} miles saved over {len(route_reports)} routes',
+          file=file)
+
+
+def write_query_results(query_times, record_format='csv', file=None):
+    """Write the status of every package at each query time, in one pass over the status timeline.
+
+    Query times are answered in sorted order, so the timeline only moves forward between queries.
+
+    Args:
+        query_times (:obj:`list` of :obj:`int`): Sorted query times, in seconds after midnight.
+        record_format (:obj:`str`, optional): 'csv', which is written with a header row, or 'jsonl'.
+        file (:obj:`file`, optional): The file to write to. Defaults to standard output.
+
+    """
+    file = file or sys.stdout
+    if record_format == 'csv':
+        file.write(','.join(RECORD_COLUMNS) + '\n')
+    for query_time in query_times:
+        for batch in helper.status_timeline.iter_records(query_time, record_format):
+            file.write(batch)
+
+
+def run_menu(trucks):
+    """Run the user interface prompts until the user exits."""
     program_terminated = False
     while not program_terminated:
         selection = ''
@@ -84,4 +178,47 @@ if __name__ == '__main__':
             # After outputting the final package data, print the total distance traveled by all trucks.
             if selection == '1':
                 print(f'Total miles traveled by all trucks: '
-                      f'{truck_two.get_distance_traveled() + truck_one.get_distance_traveled()}\n')
+                      f'{sum(truck.get_distance_traveled() for truck in trucks)}\n')
+
+
+if __name__ == '__main__':
+    parser, args = parse_arguments()
+    try:
+        query_times = read_query_times(args.times, args.times_file)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.export and not args.export.endswith(export.SUPPORTED_SUFFIXES):
+        parser.error(f'--export: unsupported format for {args.export}; use {", ".join(export.SUPPORTED_SUFFIXES)}')
+
+    # Count and time hot-path calls when WGUPS_INSTRUMENT or WGUPS_PROFILE is set, or a profile path is given.
+    if args.profile:
+        instrumentation.enable(args.profile)
+    else:
+        instrumentation.enable_from_environment()
+
+    route_reports = []
+    try:
+        trucks = run_simulation(args.distance_file, args.package_file, args.cache_file, args.deadline_routing,
+                                route_reports)
+    except InfeasiblePlanError as error:
+        sys.exit(f'Infeasible plan: {error}')
+    if args.export:
+        export.export_deliveries(args.export)
+    if query_times:
+        if args.output:
+            with open(args.output, mode='w', newline='', buffering=OUTPUT_BUFFER_SIZE) as output_file:
+                write_query_results(query_times, args.format, output_file)
+        else:
+            try:
+                write_query_results(query_times, args.format)
+                sys.stdout.flush()
+            except BrokenPipeError:
+                # The reader, such as head, closed the pipe. Point standard output at devnull, so that flushing it at
+                # exit does not raise again, and stop quietly.
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                sys.exit(1)
+    elif not args.export:
+        run_menu(trucks)
+    if args.timings:
+        helper.print_phase_timings()
+        print_route_summary(route_reports)
@@ -1,6 +1,15 @@
+import datetime
+
+
+END_OF_DAY = 24 * 60 * 60  # Deadline, in seconds, saved for packages due by end of day ('EOD')
+
+
 class Package:
     """A class used to represent a package.
 
+    Attributes are saved to __slots__ rather than a per-object __dict__, and timestamps are saved as whole seconds after
+    midnight, so that millions of Package objects stay compact. Accessors for timestamps still use timedelta objects.
+
     Attributes:
         package_id (str): An id to reference the package.
         address_index (int): An index to reference address and distance information from tables in helper.py.
@@ -9,11 +18,17 @@ class Package:
         special (str): A special note or delivery requirement for the package (or an empty str).
         status (str): The delivery status of the package.
         assigned_truck (str): The name of the truck delivering the package.
-        time_loaded (time): The timestamp of when the package was loaded to its truck.
-        time_delivered (time): The timestamp of when the package was delivered to its destination.
+        time_loaded_seconds (int): The timestamp of when the package was loaded to its truck, in seconds.
+        time_delivered_seconds (int): The timestamp of when the package was delivered to its destination, in seconds.
+        truck_miles_delivered (float): The miles its truck had traveled since the start of the day when the package was
+            delivered.
+        deadline_minutes (int): The deadline in minutes after midnight, saved the first time it is parsed, or None.
 
     """
 
+    __slots__ = ('package_id', 'address_index', 'deadline', 'mass', 'special', 'status', 'assigned_truck',
+                 'time_loaded_seconds', 'time_delivered_seconds', 'truck_miles_delivered', 'deadline_minutes')
+
     def __init__(self, package_id, address_index, deadline, mass, special):
         """Construct a Package object.
 
@@ -32,8 +47,10 @@ class Package:
         self.special = special
         self.status = 'at the hub'
         self.assigned_truck = ''
-        self.time_loaded = None
-        self.time_delivered = None
+        self.time_loaded_seconds = None
+        self.time_delivered_seconds = None
+        self.truck_miles_delivered = None
+        self.deadline_minutes = None
 
 
     def get_package_id(self):
@@ -50,6 +67,13 @@ class Package:
 
     def set_deadline(self, deadline):
         self.deadline = deadline
+        self.deadline_minutes = None  # Parsed again from the new deadline when next needed
+
+    def get_deadline_minutes(self):
+        return self.deadline_minutes
+
+    def set_deadline_minutes(self, deadline_minutes):
+        self.deadline_minutes = deadline_minutes
 
     def get_mass(self):
         return self.mass
@@ -76,13 +100,65 @@ class Package:
         self.assigned_truck = assigned_truck
 
     def get_time_loaded(self):
-        return self.time_loaded
+        return seconds_to_time(self.time_loaded_seconds)
 
     def set_time_loaded(self, time_loaded):
-        self.time_loaded = time_loaded
+        self.time_loaded_seconds = time_to_seconds(time_loaded)
+
+    def get_time_loaded_seconds(self):
+        return self.time_loaded_seconds
 
     def get_time_delivered(self):
-        return self.time_delivered
+        return seconds_to_time(self.time_delivered_seconds)
 
     def set_time_delivered(self, time_delivered):
-        self.time_delivered = time_delivered
+        self.time_delivered_seconds = time_to_seconds(time_delivered)
+
+    def get_time_delivered_seconds(self):
+        return self.time_delivered_seconds
+
+    def get_truck_miles_delivered(self):
+        return self.truck_miles_delivered
+
+    def set_truck_miles_delivered(self, truck_miles_delivered):
+        self.truck_miles_delivered = truck_miles_delivered
+
+
+def time_to_seconds(time):
+    """Return a timedelta as whole seconds after midnight, or None if no time is given."""
+    if time is None:
+        return None
+    return round(time.total_seconds())
+
+
+def seconds_to_time(seconds):
+    """Return seconds after midnight as a timedelta, or None if no seconds are given."""
+    if seconds is None:
+        return None
+    return datetime.timedelta(seconds=seconds)
+
+
+def parse_time(text):
+    """Return a time such as '9:05 am' or '10:30 AM' as seconds after midnight, or END_OF_DAY for 'EOD'.
+
+    Raises:
+        ValueError: If the text is not a time of day.
+
+    """
+    original = text
+    text = text.strip().upper().replace('.', '')
+    if not text or text == 'EOD':
+        return END_OF_DAY
+    clock, meridiem = (text.split() + [''])[:2]
+    try:
+        hours, minutes = (int(part) for part in clock.split(':'))
+    except ValueError:
+        raise ValueError(f'{original!r} is not a time such as 10:30 AM, 14:15, or EOD.') from None
+    if meridiem not in ('', 'AM', 'PM') or not 0 <= minutes < 60 or \
+            not (1 <= hours <= 12 if meridiem else 0 <= hours < 24):
+        raise ValueError(f'{original!r} is not a time such as 10:30 AM, 14:15, or EOD.')
+    if meridiem == 'PM' and hours != 12:
+        hours += 12
+    elif meridiem == 'AM' and hours == 12:
+        hours = 0
+    return hours * 3600 + minutes * 60
@@ -0,0 +1,202 @@
+import random
+import time
+
+
+_EMPTY = object()    # Marks a slot that has never held a key
+_DELETED = object()  # Marks a slot whose key was deleted, so that probing continues past it
+
+
+class PackageStore:
+    """A class used to represent a hash table of Package objects, keyed by package id.
+
+    Collisions are managed with open addressing and linear probing. The number of slots is always a power of two, so a
+    hash key is found with a bit mask rather than a modulo, and the table doubles in size once its load factor passes
+    MAX_LOAD_FACTOR.
+
+    Attributes:
+        keys (:obj:`list`): The key saved to each slot, or a marker for an empty or deleted slot.
+        values (:obj:`list`): The object saved to each slot.
+        size (int): The number of saved keys.
+        used (int): The number of slots holding a key or a deleted marker.
+
+    """
+
+    MIN_SLOTS = 8
+    MAX_LOAD_FACTOR = 0.7
+
+    def __init__(self, expected_size=0):
+        """Construct an empty PackageStore object.
+
+        Args:
+            expected_size (:obj:`int`, optional): The number of keys to make room for. Defaults to 0.
+
+        """
+        self.keys = []
+        self.values = []
+        self.size = 0
+        self.used = 0
+        self.clear(expected_size)
+
+
+    def clear(self, expected_size=0):
+        """Remove all keys, and make room for expected_size keys without growing."""
+        num_slots = self.MIN_SLOTS
+        while expected_size > num_slots * self.MAX_LOAD_FACTOR:
+            num_slots *= 2
+        self.keys = [_EMPTY] * num_slots
+        self.values = [None] * num_slots
+        self.size = 0
+        self.used = 0
+
+
+    def reset(self):
+        """Remove all keys, keeping the number of slots, so that a table refilled with as many keys does not grow."""
+        self.clear(int(len(self.keys) * self.MAX_LOAD_FACTOR))
+
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return self.find_slot(key) >= 0
+
+    def __iter__(self):
+        """Iterate through saved keys, in slot order."""
+        for key in self.keys:
+            if key is not _EMPTY and key is not _DELETED:
+                yield key
+
+    def items(self):
+        for slot, key in enumerate(self.keys):
+            if key is not _EMPTY and key is not _DELETED:
+                yield key, self.values[slot]
+
+    def get_num_slots(self):
+        return len(self.keys)
+
+
+    def hash_key(self, key):
+        """Return the first slot to probe for a key."""
+        return hash(key) & (len(self.keys) - 1)
+
+
+    def find_slot(self, key):
+        """Return the slot holding a key, or -1 if the key is not saved."""
+        keys = self.keys
+        mask = len(keys) - 1
+        slot = hash(key) & mask
+        while True:
+            slot_key = keys[slot]
+            if slot_key is _EMPTY:
+                return -1
+            if slot_key is not _DELETED and slot_key == key:
+                return slot
+            slot = (slot + 1) & mask
+
+
+    def get(self, key, default=None):
+        """Return the object saved for a key, or default if the key is not saved."""
+        slot = self.find_slot(key)
+        if slot < 0:
+            return default
+        return self.values[slot]
+
+
+    def insert(self, key, value):
+        """Save an object for a key, replacing any object already saved for it."""
+        if (self.used + 1) > len(self.keys) * self.MAX_LOAD_FACTOR:
+            self.resize()
+        keys = self.keys
+        mask = len(keys) - 1
+        slot = hash(key) & mask
+        free_slot = -1  # First deleted slot found, which is reused if the key is not already saved
+        while True:
+            slot_key = keys[slot]
+            if slot_key is _EMPTY:
+                break
+            if slot_key is _DELETED:
+                if free_slot < 0:
+                    free_slot = slot
+            elif slot_key == key:
+                self.values[slot] = value
+                return
+            slot = (slot + 1) & mask
+
+        if free_slot < 0:
+            free_slot = slot
+            self.used += 1
+        keys[free_slot] = key
+        self.values[free_slot] = value
+        self.size += 1
+
+
+    def delete(self, key):
+        """Remove a key and its object.
+
+        Returns:
+            True if the key was saved, otherwise False.
+
+        """
+        slot = self.find_slot(key)
+        if slot < 0:
+            return False
+        self.keys[slot] = _DELETED
+        self.values[slot] = None
+        self.size -= 1
+        return True
+
+
+    def resize(self):
+        """Rehash all keys into a table sized for the current number of keys, which also drops deleted markers."""
+        saved_items = list(self.items())
+        self.clear(len(saved_items) * 2 + 1)
+        for key, value in saved_items:
+            self.insert(key, value)
+
+
+def benchmark_lookups(num_packages=100000, num_lookups=1000000):
+    """Compare lookup throughput of PackageStore against a fixed, prime-sized table of collision lists.
+
+    The collision list table matches the one previously used for package_hash_table in helper.py.
+
+    Args:
+        num_packages (:obj:`int`, optional): The number of keys to save. Defaults to 100000.
+        num_lookups (:obj:`int`, optional): The number of keys to look up. Defaults to 1000000.
+
+    Returns:
+        A :obj:`dict` of lookups per second, keyed by table name.
+
+    """
+    package_ids = [str(i) for i in range(1, num_packages + 1)]
+    lookup_ids = random.choices(package_ids, k=num_lookups)
+
+    # Build the collision list table, with at least 1.3 buckets per package.
+    num_buckets = int(num_packages * 1.3)
+    while any(num_buckets % d == 0 for d in range(2, int(num_buckets ** 0.5) + 1)):
+        num_buckets += 1
+    chained_table = [[] for i in range(num_buckets)]
+    for package_id in package_ids:
+        chained_table[hash(package_id) % len(chained_table)].append([package_id, package_id])
+
+    def chained_get(package_id):
+        for d in chained_table[hash(package_id) % len(chained_table)]:
+            if d[0] == package_id:
+                return d[1]
+
+    # Build the PackageStore without a size hint, so that it grows as keys are inserted.
+    store = PackageStore()
+    for package_id in package_ids:
+        store.insert(package_id, package_id)
+
+    results = {}
+    for name, lookup in (('collision lists', chained_get), ('PackageStore', store.get)):
+        start = time.perf_counter()
+        for package_id in lookup_ids:
+            lookup(package_id)
+        results[name] = num_lookups / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == '__main__':
+    for table_name, lookups_per_second in benchmark_lookups().items():
+        print(f'{table_name}: {lookups_per_second:,.0f} lookups per second')
@@ -0,0 +1,329 @@
+import numpy
+from distance_matrix import find_nearest_candidate
+from package import END_OF_DAY, parse_time
+
+
+END_OF_DAY_MINUTES = END_OF_DAY // 60
+SLACK_TOLERANCE = 0.5 / 60  # Minutes of lateness ignored, as delivery times are saved to the nearest second
+
+
+class InfeasiblePlanError(ValueError):
+    """An exception raised when a stop is not expected to be reached by the deadline of a package held for it.
+
+    Attributes:
+        address_index (int): The index of the stop.
+        deadline (int): The earliest deadline of the packages held for the stop, in minutes after midnight.
+        arrival (float): The earliest time the stop can be reached, or if proven is False, the time it is reached on
+            the first order of stops tried, in minutes after midnight.
+        proven (bool): Whether going straight to the stop is already too late, rather than every order of stops tried
+            reaching it late.
+
+    """
+
+    def __init__(self, address_index, deadline, arrival, proven=True):
+        self.address_index = address_index
+        self.deadline = deadline
+        self.arrival = arrival
+        self.proven = proven
+        if proven:
+            message = f'cannot be reached by its deadline of {format_minutes(deadline)}; the earliest arrival is ' \
+                      f'{format_minutes(arrival)}.'
+        else:
+            message = f'is reached after its deadline of {format_minutes(deadline)} on every order of stops tried, ' \
+                      f'at {format_minutes(arrival)} on the first.'
+        super().__init__(f'Stop {address_index} {message}')
+
+
+def format_minutes(minutes):
+    minutes = int(minutes)
+    return f'{minutes // 60}:{minutes % 60:02d}'
+
+
+def get_deadline_minutes(package):
+    """Return the deadline of a package in whole minutes after midnight, parsing it only the first time."""
+    deadline = package.get_deadline_minutes()
+    if deadline is None:
+        deadline = parse_time(package.get_deadline()) // 60
+        package.set_deadline_minutes(deadline)
+    return deadline
+
+
+class PendingStops:
+    """A class used to index the packages held by a truck by the stop they are intended for.
+
+    Stops are saved in the order that their first package was loaded, so that ties between stops at the same distance
+    are broken the same way as a scan of packages_held in loading order.
+
+    Deadlines are only parsed once they are first needed, by deadline routing or route improvement, so that packages
+    are loaded without reading their deadlines otherwise. From then on, the earliest deadline of each stop is kept up to
+    date as packages are added and removed, so that the slack of every stop with a deadline can be found with one
+    vectorized lookup of distances at each hop.
+
+    Attributes:
+        stops (:obj:`dict` of :obj:`int` to :obj:`list` of :obj:`Package`): Held packages keyed by address_index.
+        deadlines (:obj:`dict` of :obj:`int` to :obj:`int`): The earliest deadline, in minutes after midnight, of the
+            packages held for each stop, keyed by address_index, or None until get_deadlines is first called. Stops
+            whose packages are due by end of day are left out.
+        deadline_arrays (tuple): The address indexes and deadlines in deadlines, as a :obj:`list` and a NumPy array,
+            or None until they are next needed.
+        stops_scanned (int): The number of stops whose distance was read by the last find_nearest call, which is 0
+            when the nearest stop was found from the candidate list.
+
+    """
+
+    def __init__(self):
+        """Construct an empty PendingStops object."""
+        self.stops = {}
+        self.deadlines = None
+        self.deadline_arrays = None
+        self.stops_scanned = 0
+
+
+    def __len__(self):
+        return len(self.stops)
+
+    def get_address_indexes(self):
+        return list(self.stops)
+
+    def get_packages(self, address_index):
+        return self.stops[address_index]
+
+    def get_deadlines(self):
+        """Return the earliest deadline of each stop with one, parsing the deadlines of held packages on first use."""
+        if self.deadlines is None:
+            self.deadlines = {}
+            for address_index, packages in self.stops.items():
+                deadline = min(get_deadline_minutes(p) for p in packages)
+                if deadline < END_OF_DAY_MINUTES:
+                    self.deadlines[address_index] = deadline
+            self.deadline_arrays = None
+        return self.deadlines
+
+
+    def add(self, package):
+        """Index a loaded Package object by its address_index."""
+        address_index = package.get_address_index()
+        if address_index in self.stops:
+            self.stops[address_index].append(package)
+        else:
+            self.stops[address_index] = [package]
+        if self.deadlines is None:
+            return
+        deadline = get_deadline_minutes(package)
+        if deadline < self.deadlines.get(address_index, END_OF_DAY_MINUTES):
+            self.deadlines[address_index] = deadline
+            self.deadline_arrays = None
+
+
+    def remove(self, package):
+        """Remove a delivered Package object, and its stop once no packages remain for it."""
+        address_index = package.get_address_index()
+        packages = self.stops[address_index]
+        packages.remove(package)
+        if not packages:
+            del self.stops[address_index]
+        if self.deadlines is None:
+            return
+        if address_index in self.deadlines and get_deadline_minutes(package) == self.deadlines[address_index]:
+            deadline = min((get_deadline_minutes(p) for p in packages), default=END_OF_DAY_MINUTES)
+            if deadline < END_OF_DAY_MINUTES:
+                self.deadlines[address_index] = deadline
+            else:
+                del self.deadlines[address_index]
+            self.deadline_arrays = None
+
+
+    def find_nearest(self, distance_table, current_index):
+        """Find the pending stops closest to a location.
+
+        The nearest locations listed for the current location are checked first, which costs O(candidates). If the
+        nearest stop cannot be found exactly from them, distances to every pending stop are read with one vectorized
+        call, which costs O(stops). Either way the result is the same.
+
+        Args:
+            distance_table (DistanceMatrix): The table of distances between locations.
+            current_index (int): The index of the current location.
+
+        Returns:
+            A tuple of the minimum distance and a :obj:`list` of address indexes at that distance, in loading order.
+
+        """
+        nearest = find_nearest_candidate(distance_table, current_index, self.stops)
+        if nearest is not None:
+            self.stops_scanned = 0
+            return nearest[0], [nearest[1]]
+        address_indexes = list(self.stops)
+        self.stops_scanned = len(address_indexes)
+        distances = distance_table.get_distances(current_index, address_indexes)
+        nearest_distance = distances.min()
+        nearest_indexes = [address_indexes[i] for i in (distances == nearest_distance).nonzero()[0]]
+        return float(nearest_distance), nearest_indexes
+
+
+    def get_slack(self, distance_table, current_index, clock, minutes_per_mile):
+        """Find the slack of each stop with a deadline: the minutes to spare if the truck went straight to it.
+
+        Args:
+            distance_table (DistanceMatrix): The table of distances between locations.
+            current_index (int): The index of the current location.
+            clock (float): The truck's clock, in minutes after midnight.
+            minutes_per_mile (float): The minutes the truck takes to travel a mile.
+
+        Returns:
+            A tuple of a :obj:`list` of address indexes with deadlines, a NumPy array of the distance to each, and a
+            NumPy array of the slack of each, in minutes.
+
+        Raises:
+            InfeasiblePlanError: If a stop cannot be reached by its deadline, even by going straight to it.
+
+        """
+        if self.deadline_arrays is None:
+            deadlines = self.get_deadlines()
+            self.deadline_arrays = (list(deadlines), numpy.array(list(deadlines.values()), dtype=numpy.float64))
+        indexes, deadlines = self.deadline_arrays
+        if not indexes:
+            return indexes, numpy.empty(0), numpy.empty(0)
+        distances = distance_table.get_distances(current_index, indexes)
+        slack = deadlines - clock - distances * minutes_per_mile
+        least = int(slack.argmin())
+        if not slack[least] >= -SLACK_TOLERANCE:  # Also true for stops that cannot be reached at all
+            raise InfeasiblePlanError(indexes[least], int(deadlines[least]),
+                                      clock + distances[least] * minutes_per_mile)
+        return indexes, distances, slack
+
+
+    def get_earliest_miss(self, distance_table, start_index, clock, minutes_per_mile, visited=()):
+        """Look ahead from a location for a stop with a deadline that would be reached late.
+
+        The stops with deadlines are followed in order of deadline, with ties broken by going to the nearest stop, and
+        stops without deadlines are skipped. This is a heuristic: another order might still meet every deadline, so a
+        stop reported late is only likely to be out of reach, while a clear result shows one order that meets them all.
+
+        Args:
+            distance_table (DistanceMatrix): The table of distances between locations.
+            start_index (int): The index of the location to look ahead from.
+            clock (float): The time the truck is at start_index, in minutes after midnight.
+            minutes_per_mile (float): The minutes the truck takes to travel a mile.
+            visited (:obj:`iterable` of :obj:`int`, optional): Indexes of stops delivered on reaching start_index,
+                which are left out. Defaults to an empty tuple.
+
+        Returns:
+            A tuple of the address index, deadline, and arrival time of the first stop reached late, or None if every
+            deadline is met.
+
+        """
+        visited = set(visited)
+        visited.add(start_index)
+        pending = sorted((deadline, address_index) for address_index, deadline in self.get_deadlines().items()
+                         if address_index not in visited)
+        location = start_index
+        while pending:
+            deadline = pending[0][0]
+            tied = [address_index for d, address_index in pending if d == deadline]
+            distances = distance_table.get_distances(location, tied)
+            nearest = int(distances.argmin())
+            clock += float(distances[nearest]) * minutes_per_mile
+            location = tied[nearest]
+            if not clock <= deadline + SLACK_TOLERANCE:  # Also true for stops that cannot be reached at all
+                return location, deadline, clock
+            pending.remove((deadline, location))
+        return None
+
+
+    def get_route_miss(self, distance_table, current_index, clock, minutes_per_mile, route):
+        """Find the first stop with a deadline that a planned route reaches late.
+
+        The arrival time at each stop of the route is exact, and costs O(stops). Stops of the route with no packages
+        left are skipped. Held stops with deadlines that the route leaves out are looked ahead to from its last stop
+        with get_earliest_miss.
+
+        Args:
+            distance_table (DistanceMatrix): The table of distances between locations.
+            current_index (int): The index of the current location.
+            clock (float): The truck's clock, in minutes after midnight.
+            minutes_per_mile (float): The minutes the truck takes to travel a mile.
+            route (:obj:`iterable` of :obj:`int`): The address indexes of the remaining stops, in order.
+
+        Returns:
+            A tuple of the address index, deadline, and arrival time of the first stop reached late, or None if every
+            deadline is met.
+
+        """
+        deadlines = self.get_deadlines()
+        location = current_index
+        visited = set()
+        for address_index in route:
+            if address_index not in self.stops or address_index in visited:
+                continue
+            visited.add(address_index)
+            clock += distance_table.get_distance(location, address_index) * minutes_per_mile
+            location = address_index
+            deadline = deadlines.get(address_index)
+            if deadline is not None and not clock <= deadline + SLACK_TOLERANCE:
+                return address_index, deadline, clock
+        return self.get_earliest_miss(distance_table, location, clock, minutes_per_mile, visited)
+
+
+    def check_deadlines(self, distance_table, current_index, clock, minutes_per_mile, route):
+        """Check whether a planned route still meets the deadline of every held stop.
+
+        Each stop is first checked by going straight to it, which proves that a stop too far away for that cannot be
+        reached in time by any route. The route itself is then followed with get_route_miss.
+
+        Args:
+            distance_table (DistanceMatrix): The table of distances between locations.
+            current_index (int): The index of the current location.
+            clock (float): The truck's clock, in minutes after midnight.
+            minutes_per_mile (float): The minutes the truck takes to travel a mile.
+            route (:obj:`iterable` of :obj:`int`): The address indexes of the remaining stops, in order.
+
+        Returns:
+            A tuple of the address index, deadline, and arrival time of the first stop the route reaches late, or None
+            if the route meets every deadline.
+
+        Raises:
+            InfeasiblePlanError: If a stop cannot be reached by its deadline, even by going straight to it.
+
+        """
+        self.get_slack(distance_table, current_index, clock, minutes_per_mile)
+        return self.get_route_miss(distance_table, current_index, clock, minutes_per_mile, route)
+
+
+    def find_urgent(self, distance_table, current_index, clock, minutes_per_mile):
+        """Find the next stop of a deadline-aware route.
+
+        Before committing to a hop, the deadlines of all remaining stops are checked with get_earliest_miss, as if
+        the truck went on from the stop it hops to. The nearest stops are chosen if every deadline can still be met
+        after them. Otherwise the stops with deadlines are tried in order of least slack, and the first one after
+        which every deadline can still be met is chosen. As the check is a heuristic, a route is given up once no hop
+        passes it, even though some other order of stops might still have met every deadline.
+
+        Args:
+            distance_table (DistanceMatrix): The table of distances between locations.
+            current_index (int): The index of the current location.
+            clock (float): The truck's clock, in minutes after midnight.
+            minutes_per_mile (float): The minutes the truck takes to travel a mile.
+
+        Returns:
+            A tuple of the distance to the chosen stops and a :obj:`list` of their address indexes.
+
+        Raises:
+            InfeasiblePlanError: If a stop cannot be reached by its deadline, even by going straight to it, or is
+                reached late after every hop, as found by the check.
+
+        """
+        indexes, distances, slack = self.get_slack(distance_table, current_index, clock, minutes_per_mile)
+        nearest_distance, nearest_indexes = self.find_nearest(distance_table, current_index)
+        if not indexes:
+            return nearest_distance, nearest_indexes
+        if self.get_earliest_miss(distance_table, nearest_indexes[0], clock + nearest_distance * minutes_per_mile,
+                                  minutes_per_mile, nearest_indexes) is None:
+            return nearest_distance, nearest_indexes
+        first_miss = None
+        for i in numpy.argsort(slack, kind='stable').tolist():
+            miss = self.get_earliest_miss(distance_table, indexes[i], clock + distances[i] * minutes_per_mile,
+                                          minutes_per_mile)
+            if miss is None:
+                return float(distances[i]), [indexes[i]]
+            first_miss = first_miss or miss
+        raise InfeasiblePlanError(*first_miss, proven=False)
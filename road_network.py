@@ -0,0 +1,334 @@
+import concurrent.futures
+import csv
+import heapq
+import os
+import numpy
+import helper
+from distance_matrix import NUM_CANDIDATES
+
+
+SERIAL_ROWS = 8     # Rows computed in this process rather than in a pool of worker processes
+MAX_REPORTED = 10   # Unreachable locations named in the error raised on import
+
+# Graph and location nodes, set in each worker process by start_worker.
+worker_graph = None
+worker_location_nodes = None
+
+
+class RoadNetwork:
+    """A class used to represent a sparse road network, with nodes joined by road segments.
+
+    Segments are saved in compressed sparse row form: the neighbors and lengths of node i are saved to
+    neighbors[offsets[i]:offsets[i + 1]] and lengths[offsets[i]:offsets[i + 1]]. Memory grows with the number of
+    segments rather than the square of the number of nodes.
+
+    Attributes:
+        node_ids (:obj:`dict` of :obj:`str` to :obj:`int`): The number of each node, keyed by its id in the edge list.
+        offsets (:obj:`list` of :obj:`int`): The start of each node's segments in neighbors and lengths, with one
+            extra entry for the end of the last node's segments.
+        neighbors (:obj:`list` of :obj:`int`): The node at the other end of each segment.
+        lengths (:obj:`list` of :obj:`float`): The length of each segment, in miles.
+
+    """
+
+    def __init__(self, node_ids, offsets, neighbors, lengths):
+        self.node_ids = node_ids
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.lengths = lengths
+
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Build a RoadNetwork object from road segments, each of which can be traveled in both directions.
+
+        Args:
+            edges (:obj:`iterable` of :obj:`tuple`): (node id, node id, miles) tuples. Node ids are strings.
+
+        Returns:
+            A RoadNetwork object.
+
+        """
+        node_ids = {}
+        starts = []
+        ends = []
+        lengths = []
+        for first, second, miles in edges:
+            first = node_ids.setdefault(first, len(node_ids))
+            second = node_ids.setdefault(second, len(node_ids))
+            starts.extend((first, second))
+            ends.extend((second, first))
+            lengths.extend((miles, miles))
+
+        starts = numpy.array(starts, dtype=numpy.intp)
+        order = numpy.argsort(starts, kind='stable')
+        offsets = numpy.zeros(len(node_ids) + 1, dtype=numpy.intp)
+        numpy.cumsum(numpy.bincount(starts, minlength=len(node_ids)), out=offsets[1:])
+        return cls(node_ids, offsets.tolist(), numpy.array(ends, dtype=numpy.intp)[order].tolist(),
+                   numpy.array(lengths, dtype=numpy.float64)[order].tolist())
+
+
+    def __len__(self):
+        return len(self.node_ids)
+
+
+    def get_shortest_distances(self, source, targets):
+        """Find the shortest distances from one node to a set of target nodes with Dijkstra's algorithm.
+
+        The search stops once every target node is reached, so nearby targets are found without searching the whole
+        network.
+
+        Args:
+            source (int): The number of the starting node.
+            targets (:obj:`list` of :obj:`int`): The numbers of the target nodes.
+
+        Returns:
+            A NumPy array of distances, in miles, in the same order as targets. Unreachable targets are infinite.
+
+        """
+        offsets, neighbors, lengths = self.offsets, self.neighbors, self.lengths
+        best = [numpy.inf] * len(self.node_ids)  # Flat lists index faster than dicts in the inner loop
+        settled = bytearray(len(self.node_ids))
+        is_target = bytearray(len(self.node_ids))
+        for target in targets:
+            is_target[target] = 1
+        remaining = sum(is_target)
+        best[source] = 0.0
+        queue = [(0.0, source)]
+        heappop, heappush = heapq.heappop, heapq.heappush
+        while queue and remaining:
+            distance, node = heappop(queue)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            remaining -= is_target[node]
+            for k in range(offsets[node], offsets[node + 1]):
+                candidate = distance + lengths[k]
+                neighbor = neighbors[k]
+                if candidate < best[neighbor]:
+                    best[neighbor] = candidate
+                    heappush(queue, (candidate, neighbor))
+        return numpy.array([best[t] for t in targets], dtype=numpy.float64)
+
+
+class RoadDistances:
+    """A class used to look up shortest road distances between locations, computing only the rows that are needed.
+
+    This can be used in place of a DistanceMatrix object as helper.distance_table. The row of distances from a location
+    to every other location is computed with Dijkstra's algorithm the first time it is needed, then cached, so memory
+    grows with the number of stops visited rather than the square of the number of locations. Rows for many locations
+    can be computed at once, in a pool of worker processes, with compute_rows.
+
+    Attributes:
+        network (RoadNetwork): The road network.
+        location_nodes (:obj:`list` of :obj:`int`): The node of each location, indexed like full_address_table.
+        rows (:obj:`dict` of :obj:`int` to :obj:`numpy.ndarray`): Cached distances from a location to every location,
+            keyed by location index.
+        candidates (:obj:`dict` of :obj:`int` to :obj:`tuple`): Lists of the nearest locations to a location and
+            their distances, keyed by location index, which are listed once the location's row is computed.
+
+    """
+
+    def __init__(self, network, location_nodes):
+        """Construct a RoadDistances object.
+
+        Args:
+            network (RoadNetwork): The road network.
+            location_nodes (:obj:`list` of :obj:`int`): The node of each location, indexed like full_address_table.
+
+        """
+        self.network = network
+        self.location_nodes = list(location_nodes)
+        self.rows = {}
+        self.candidates = {}
+
+
+    def __len__(self):
+        return len(self.location_nodes)
+
+
+    def __getitem__(self, index):
+        return self.get_row(index)
+
+
+    def get_row(self, index):
+        """Return the distances from a location to every location, computing and caching them on first use."""
+        row = self.rows.get(index)
+        if row is None:
+            row = self.rows[index] = self.network.get_shortest_distances(self.location_nodes[index],
+                                                                         self.location_nodes)
+        return row
+
+    def get_column(self, index):
+        return self.get_row(index)  # Segments can be traveled in both directions, so distances are symmetric
+
+    def get_distance(self, current_index, target_index):
+        return float(self.get_row(current_index)[target_index])
+
+    def get_distances(self, current_index, target_indexes):
+        """Return distances from one location to many locations, from the cached row of the starting location."""
+        return self.get_row(current_index)[target_indexes]
+
+    def get_submatrix(self, indexes):
+        """Return the square array of distances between the given locations, in the order of indexes."""
+        return numpy.array([self.get_row(int(i))[indexes] for i in indexes], dtype=numpy.float64).reshape(
+            len(indexes), len(indexes))
+
+
+    def get_candidates(self, index):
+        """Return lists of the nearest locations to a location, nearest first, and their distances.
+
+        Every location not listed is at least as far away as the last location listed.
+        """
+        candidates = self.candidates.get(index)
+        if candidates is None:
+            row = self.get_row(index)
+            k = min(NUM_CANDIDATES, len(row))
+            nearest = numpy.argpartition(row, k - 1)[:k] if k < len(row) else numpy.arange(len(row))
+            nearest = nearest[numpy.argsort(row[nearest], kind='stable')]
+            candidates = self.candidates[index] = (nearest.tolist(), row[nearest].tolist())
+        return candidates
+
+
+    def compute_rows(self, indexes, max_workers=None):
+        """Compute and cache the rows of many locations, using a pool of worker processes.
+
+        The road network is sent once to each worker, and each worker runs Dijkstra's algorithm from one location at
+        a time. A few rows are computed in this process instead, as starting workers would take longer.
+
+        Args:
+            indexes (:obj:`iterable` of :obj:`int`): Indexes of the locations. Rows already cached are skipped.
+            max_workers (:obj:`int`, optional): The number of worker processes. Defaults to None, to use every core.
+
+        """
+        indexes = [i for i in dict.fromkeys(indexes) if i not in self.rows]
+        if len(indexes) <= SERIAL_ROWS or max_workers == 1:
+            for index in indexes:
+                self.get_row(index)
+            return
+
+        nodes = [self.location_nodes[i] for i in indexes]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=start_worker,
+                                                    initargs=(self.network, self.location_nodes)) as executor:
+            chunk_size = max(1, len(nodes) // ((max_workers or os.cpu_count() or 1) * 4))
+            for index, row in zip(indexes, executor.map(compute_row, nodes, chunksize=chunk_size)):
+                self.rows[index] = row
+
+
+def start_worker(graph, location_nodes):
+    """Save the road network and location nodes in a worker process."""
+    global worker_graph, worker_location_nodes
+    worker_graph = graph
+    worker_location_nodes = location_nodes
+
+
+def compute_row(node):
+    """Return the shortest distances from a node to every location, in a worker process."""
+    return worker_graph.get_shortest_distances(node, worker_location_nodes)
+
+
+def read_edge_rows(file_name):
+    """Yield road segments from an edge list CSV file.
+
+    Each row holds the ids of the two nodes joined by a segment and its length in miles. Rows without a numeric
+    length, such as a header row, are skipped.
+
+    Args:
+        file_name (str): The path of the edge list CSV file. Files ending in '.gz' are read as gzip-compressed data.
+
+    Yields:
+        A tuple of the two node ids and the length of the segment.
+
+    """
+    with helper.open_data_file(file_name) as file:
+        for row_data in csv.reader(file):
+            if len(row_data) < 3:
+                continue
+            try:
+                miles = float(row_data[2])
+            except ValueError:
+                continue
+            yield row_data[0].strip(), row_data[1].strip(), miles
+
+
+def read_location_rows(file_name):
+    """Yield locations from a CSV file of location names, addresses, and the road network node of each location.
+
+    Addresses are formatted as in the distance table, as 'street (zip code)'. The hub must be the first location.
+    Rows with fewer than three columns, and a header row with 'node' as its third column, are skipped.
+
+    Args:
+        file_name (str): The path of the location CSV file.
+
+    Yields:
+        A tuple of the location name, the location address, and its node id.
+
+    """
+    with helper.open_data_file(file_name) as file:
+        for row_data in csv.reader(file):
+            if len(row_data) < 3 or row_data[2].strip().lower() == 'node':
+                continue
+            yield row_data[0], row_data[1], row_data[2].strip()
+
+
+def import_road_network(edge_file, location_file):
+    """Read a road network and its locations, saving them to full_address_table and distance_table in helper.py.
+
+    No distances are computed here. Rows are computed when first used, or all at once with compute_package_rows.
+
+    Args:
+        edge_file (str): The path of the edge list CSV file.
+        location_file (str): The path of the location CSV file.
+
+    The row of distances from the hub is computed to check that every location can be reached from it.
+
+    Raises:
+        ValueError: If a location's node is not in the road network, or a location cannot be reached from the hub.
+
+    """
+    with helper.timed_phase('import road network'):
+        network = RoadNetwork.from_edges(read_edge_rows(edge_file))
+    with helper.timed_phase('import locations'):
+        locations = []
+        location_nodes = []
+        for loc_name, address, node in read_location_rows(location_file):
+            if node not in network.node_ids:
+                raise ValueError(f'Location {loc_name} is at node {node}, which is not in the road network.')
+            locations.append([loc_name, address])
+            location_nodes.append(network.node_ids[node])
+        distance_table = RoadDistances(network, location_nodes)
+    with helper.timed_phase('check reachability'):
+        unreachable = numpy.isinf(distance_table.get_row(helper.HUB_INDEX)).nonzero()[0].tolist()
+        if unreachable:
+            names = ', '.join(locations[i][0] for i in unreachable[:MAX_REPORTED])
+            more = f' and {len(unreachable) - MAX_REPORTED} more' if len(unreachable) > MAX_REPORTED else ''
+            raise ValueError(f'These locations cannot be reached from the hub by road: {names}{more}.')
+    helper.full_address_table.extend(locations)
+    helper.context.distance_table = distance_table
+    with helper.timed_phase('index addresses'):
+        helper.build_address_index()
+
+
+def compute_package_rows(max_workers=None):
+    """Compute the rows of distances from the hub and from every location that a package is intended for."""
+    indexes = [helper.HUB_INDEX]
+    for address_index, address in enumerate(helper.full_address_table):
+        if len(address) > 5 and address[5]:
+            indexes.append(address_index)
+    with helper.timed_phase('compute shortest paths'):
+        helper.distance_table.compute_rows(indexes, max_workers)
+
+
+def load_road_tables(edge_file, location_file, package_file=helper.PACKAGE_FILE, max_workers=None):
+    """Import a road network, its locations, and package data, then compute the distances from every stop.
+
+    Args:
+        edge_file (str): The path of the edge list CSV file.
+        location_file (str): The path of the location CSV file.
+        package_file (:obj:`str`, optional): The path of the package CSV file.
+        max_workers (:obj:`int`, optional): The number of worker processes. Defaults to None, to use every core.
+
+    """
+    import_road_network(edge_file, location_file)
+    helper.register_packages(package_file)
+    compute_package_rows(max_workers)
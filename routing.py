@@ -0,0 +1,189 @@
+import time
+import numpy
+import helper
+from distance_matrix import find_nearest_candidate
+from pending_stops import END_OF_DAY_MINUTES
+
+
+MOVE_BUDGET = 1000  # Candidate moves evaluated per route, by default, before improvement stops
+
+class RouteReport:
+    """A class used to report the result of improving a route.
+
+    Attributes:
+        miles_before (float): The length of the route before improvement, including the return to the hub.
+        miles_after (float): The length of the route after improvement, including the return to the hub.
+        seconds (float): The time spent improving the route.
+        iterations (int): The number of improving moves applied.
+        moves (int): The number of candidate moves evaluated.
+
+    """
+
+    __slots__ = ('miles_before', 'miles_after', 'seconds', 'iterations', 'moves')
+
+    def __init__(self, miles_before, miles_after, seconds, iterations, moves):
+        self.miles_before = miles_before
+        self.miles_after = miles_after
+        self.seconds = seconds
+        self.iterations = iterations
+        self.moves = moves
+
+    def get_miles_saved(self):
+        return self.miles_before - self.miles_after
+
+
+def plan_route(truck):
+    """Return the stops of a truck in nearest-stop order, without moving the truck.
+
+    Args:
+        truck (Truck): The truck, with packages loaded.
+
+    Returns:
+        A :obj:`list` of address indexes, in the order they would be visited.
+
+    """
+    distances = helper.distance_table
+    pending = truck.get_pending_stops().get_address_indexes()
+    pending_set = set(pending)
+    location = truck.get_location_index()
+    route = []
+    while pending:
+        nearest = find_nearest_candidate(distances, location, pending_set)
+        if nearest is None:
+            location = pending.pop(int(distances.get_distances(location, pending).argmin()))
+        else:
+            location = nearest[1]
+            pending.remove(location)
+        pending_set.discard(location)
+        route.append(location)
+    return route
+
+
+def get_stop_deadlines(truck):
+    """Return the earliest deadline, in seconds after midnight, of the packages held for each stop of a truck."""
+    pending_stops = truck.get_pending_stops()
+    deadlines = pending_stops.get_deadlines()
+    return {address_index: deadlines.get(address_index, END_OF_DAY_MINUTES) * 60
+            for address_index in pending_stops.get_address_indexes()}
+
+
+def get_lateness(path, distances, departure, speed, deadlines):
+    """Return the total seconds that stops on a path are reached after their deadlines.
+
+    Args:
+        path (:obj:`numpy.ndarray`): Address indexes, starting at the current location and ending at the hub.
+        distances (:obj:`numpy.ndarray`): The square array of distances.
+        departure (float): The time of departure from the start of the path, in seconds.
+        speed (float): The speed of the truck, in mph.
+        deadlines (:obj:`numpy.ndarray`): The deadline, in seconds, of each stop on the path, excluding the start and
+            the hub at the end.
+
+    Returns:
+        The total lateness in seconds, which is 0.0 if every deadline is met.
+
+    """
+    arrivals = departure + numpy.cumsum(distances[path[:-2], path[1:-1]]) / speed * 3600
+    return float(numpy.maximum(arrivals - deadlines, 0.0).sum())
+
+
+def get_path_length(path, distances):
+    return float(distances[path[:-1], path[1:]].sum())
+
+
+def improve_route(route, start_index, departure, speed, deadlines=None, move_budget=MOVE_BUDGET, time_budget=None):
+    """Shorten a route with 2-opt and Or-opt moves.
+
+    Each pass evaluates every move for one position of the route with vectorized distance lookups, then applies the
+    best improving move. Moves that would make a stop later than its deadline are only accepted if they do not increase
+    total lateness. Improvement stops once no move shortens the route, or when the move budget is spent, so the same
+    route is always improved the same way. An optional time budget also bounds the time spent, at the cost of results
+    that depend on the speed of the machine.
+
+    Args:
+        route (:obj:`list` of :obj:`int`): Address indexes of the stops, in order.
+        start_index (int): The address index of the truck's current location.
+        departure (float): The time of departure, in seconds after midnight.
+        speed (float): The speed of the truck, in mph.
+        deadlines (:obj:`dict` of :obj:`int` to :obj:`int`, optional): Deadlines in seconds, keyed by address index.
+            Defaults to None, to ignore deadlines.
+        move_budget (:obj:`int`, optional): The maximum number of candidate moves to evaluate. Defaults to
+            MOVE_BUDGET.
+        time_budget (:obj:`float`, optional): The maximum number of seconds to spend. Defaults to None, for no limit.
+
+    Returns:
+        A tuple of the improved :obj:`list` of address indexes, and a RouteReport object.
+
+    """
+    started = time.perf_counter()
+    # Work on the distances between the route's own stops, numbered by their position in stops, so that the distance
+    # table only needs to provide rows for stops on the route.
+    stops, path = numpy.unique(numpy.array([start_index] + list(route) + [helper.HUB_INDEX], dtype=numpy.intp),
+                               return_inverse=True)
+    path = path.astype(numpy.intp)
+    distances = helper.distance_table.get_submatrix(stops)
+    miles_before = get_path_length(path, distances)
+    if deadlines is None:
+        deadlines = {}
+    stop_deadlines = numpy.array([deadlines.get(int(s), numpy.inf) for s in stops], dtype=numpy.float64)
+
+    def get_deadlines(candidate):
+        return stop_deadlines[candidate[1:-1]]
+
+    lateness = get_lateness(path, distances, departure, speed, get_deadlines(path))
+    if time_budget is None:
+        time_budget = float('inf')
+    iterations = 0
+    moves = 0
+    improved = True
+    while improved and moves < move_budget and time.perf_counter() - started < time_budget:
+        improved = False
+        for candidate in iterate_moves(path, distances):
+            moves += 1
+            candidate_lateness = get_lateness(candidate, distances, departure, speed, get_deadlines(candidate))
+            if candidate_lateness <= lateness:
+                path = candidate
+                lateness = candidate_lateness
+                iterations += 1
+                improved = True
+                break
+            if moves >= move_budget or time.perf_counter() - started >= time_budget:
+                break
+
+    route = [int(s) for s in stops[path[1:-1]]]
+    report = RouteReport(miles_before, get_path_length(path, distances), time.perf_counter() - started, iterations,
+                         moves)
+    return route, report
+
+
+def iterate_moves(path, distances, tolerance=1e-9):
+    """Yield paths produced by improving 2-opt and Or-opt moves, best move first for each position of the path.
+
+    The first and last entries of the path (the start and the hub) never move.
+    """
+    n = len(path)
+    # 2-opt: reverse path[i + 1:j + 1], replacing edges (a, b) and (c, d) with (a, c) and (b, d).
+    for i in range(n - 3):
+        a, b = path[i], path[i + 1]
+        c, d = path[i + 2:n - 1], path[i + 3:n]
+        deltas = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+        for k in numpy.argsort(deltas, kind='stable'):
+            if deltas[k] >= -tolerance:
+                break
+            j = i + 2 + int(k)
+            yield numpy.concatenate((path[:i + 1], path[i + 1:j + 1][::-1], path[j + 1:]))
+
+    # Or-opt: move a segment of one to three stops, in either direction, between two other neighboring entries.
+    for length in (1, 2, 3):
+        for i in range(1, n - length):
+            segment = path[i:i + length]
+            rest = numpy.concatenate((path[:i], path[i + length:]))
+            removed = distances[path[i - 1], segment[0]] + distances[segment[-1], path[i + length]] \
+                - distances[path[i - 1], path[i + length]]
+            before, after = rest[:-1], rest[1:]
+            for oriented in (segment, segment[::-1]):
+                deltas = distances[before, oriented[0]] + distances[oriented[-1], after] \
+                    - distances[before, after] - removed
+                for k in numpy.argsort(deltas, kind='stable'):
+                    if deltas[k] >= -tolerance:
+                        break
+                    yield numpy.concatenate((rest[:k + 1], oriented, rest[k + 1:]))
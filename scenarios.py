@@ -0,0 +1,167 @@
+import concurrent.futures
+import csv
+import datetime
+import itertools
+import os
+import sys
+from multiprocessing import shared_memory
+import numpy
+import helper
+import routing
+from distance_matrix import DistanceMatrix
+from package import parse_time
+from pending_stops import InfeasiblePlanError
+from simulation import plan_day
+from truck import Truck
+
+
+# Parameters of a scenario, and the values used when a grid does not list them.
+DEFAULT_PARAMETERS = {
+    'num_trucks': 2,
+    'capacity': 16,
+    'speed': 18.0,
+    'start_time': '8:00 AM',                   # Time that every truck is at the hub and ready to load
+    'route_move_budget': routing.MOVE_BUDGET,  # Moves evaluated to improve each route, or None for nearest-stop
+    'deadline_routing': False,                 # Whether to route by deadline slack, giving up once a deadline is missed
+}
+
+RESULT_COLUMNS = list(DEFAULT_PARAMETERS) + ['total_miles', 'deadline_misses', 'finish_time', 'error']
+
+# Package rows and the shared memory block of distances, set in each worker process by start_worker.
+worker_package_rows = None
+worker_shared_memory = None
+
+
+def build_grid(grid):
+    """Return every combination of parameter values in a grid.
+
+    Args:
+        grid (:obj:`dict` of :obj:`str` to :obj:`list`): Values to try, keyed by parameter name.
+
+    Returns:
+        A :obj:`list` of :obj:`dict` scenarios, with DEFAULT_PARAMETERS for any parameter not in the grid.
+
+    """
+    for name in grid:
+        if name not in DEFAULT_PARAMETERS:
+            raise ValueError(f'Unknown scenario parameter: {name}')
+    names = list(grid)
+    return [dict(DEFAULT_PARAMETERS, **dict(zip(names, values))) for values in itertools.product(*grid.values())]
+
+
+def start_worker(shared_memory_name, size, locations, package_rows):
+    """Attach a worker process to the shared distance matrix, and save location and package data.
+
+    Args:
+        shared_memory_name (str): The name of the shared memory block holding the distance matrix.
+        size (int): The number of locations, so the block holds size by size float64 values.
+        locations (:obj:`list` of :obj:`list` of :obj:`str`): The location name and address of each location.
+        package_rows (:obj:`list` of :obj:`list` of :obj:`str`): Rows of package data.
+
+    """
+    global worker_package_rows, worker_shared_memory
+    worker_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    distances = numpy.ndarray((size, size), dtype=numpy.float64, buffer=worker_shared_memory.buf)
+    distances.flags.writeable = False
+    helper.reset_tables()
+    helper.context.distance_table = DistanceMatrix(distances)
+    helper.full_address_table.extend(list(location) for location in locations)
+    helper.build_address_index()
+    worker_package_rows = package_rows
+
+
+def run_scenario(parameters):
+    """Run a full delivery simulation for one scenario.
+
+    Args:
+        parameters (:obj:`dict`): The scenario, with a value for each key of DEFAULT_PARAMETERS.
+
+    Returns:
+        A :obj:`dict` of the parameters, total miles, number of packages delivered after their deadline, the time the
+        last truck returned to the hub, and an error message if no plan could be made. With deadline routing, a
+        scenario is given up, with only an error message, as soon as a deadline can no longer be met.
+
+    """
+    result = dict(parameters, total_miles=None, deadline_misses=None, finish_time=None, error='')
+    helper.reset_packages()
+    helper.register_package_rows(worker_package_rows)
+    start_time = datetime.timedelta(seconds=parse_time(parameters['start_time']))
+    trucks = [Truck(f'Truck {i}', start_time, parameters['capacity'], parameters['speed'])
+              for i in range(1, parameters['num_trucks'] + 1)]
+    try:
+        simulation = plan_day(trucks, parameters['route_move_budget'], parameters['deadline_routing'])
+    except ValueError as error:
+        result['error'] = str(error)
+        return result
+    try:
+        simulation.run()
+    except InfeasiblePlanError as error:
+        result['error'] = f'Infeasible at {simulation.time}: {error}'
+        return result
+
+    result['total_miles'] = round(simulation.get_total_distance(), 1)
+    result['deadline_misses'] = count_deadline_misses()
+    result['finish_time'] = str(max(truck.get_time_on_clock() for truck in trucks))
+    return result
+
+
+def count_deadline_misses():
+    """Return the number of packages in package_hash_table delivered after their deadline, or not delivered."""
+    deadline_misses = 0
+    for package_id, package in helper.package_hash_table.items():
+        delivered = package.get_time_delivered_seconds()
+        if delivered is None or delivered > parse_time(package.get_deadline()):
+            deadline_misses += 1
+    return deadline_misses
+
+
+def run_sweep(grid, distance_file=helper.DISTANCE_FILE, package_file=helper.PACKAGE_FILE, max_workers=None):
+    """Run every scenario of a parameter grid in a pool of worker processes.
+
+    The distance matrix is copied once to a shared memory block that all workers map, rather than being pickled to
+    each worker. Location and package data, which are small, are sent once per worker.
+
+    Args:
+        grid (:obj:`dict` of :obj:`str` to :obj:`list`): Values to try, keyed by parameter name.
+        distance_file (:obj:`str`, optional): The path of the distance table CSV file.
+        package_file (:obj:`str`, optional): The path of the package CSV file.
+        max_workers (:obj:`int`, optional): The number of worker processes. Defaults to None, to use every core.
+
+    Returns:
+        A :obj:`list` of result :obj:`dict` objects, in the order of the grid's scenarios.
+
+    """
+    helper.reset_tables()
+    helper.import_location_distance_data(distance_file)
+    locations = [address[:2] for address in helper.full_address_table]
+    package_rows = list(helper.read_package_rows(package_file))
+    distances = helper.distance_table.distances
+
+    block = shared_memory.SharedMemory(create=True, size=max(distances.nbytes, 1))
+    try:
+        numpy.ndarray(distances.shape, dtype=numpy.float64, buffer=block.buf)[:] = distances
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=start_worker,
+                                                    initargs=(block.name, len(distances), locations,
+                                                              package_rows)) as executor:
+            scenarios = build_grid(grid)
+            chunk_size = max(1, len(scenarios) // ((max_workers or os.cpu_count() or 1) * 4))
+            return list(executor.map(run_scenario, scenarios, chunksize=chunk_size))
+    finally:
+        block.close()
+        block.unlink()
+
+
+def write_results(results, file=sys.stdout):
+    """Write scenario results as CSV rows, with a header row."""
+    writer = csv.DictWriter(file, fieldnames=RESULT_COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(results)
+
+
+if __name__ == '__main__':
+    write_results(run_sweep({
+        'num_trucks': [1, 2, 3],
+        'speed': [18.0, 25.0],
+        'start_time': ['8:00 AM', '8:30 AM', '9:05 AM'],
+        'deadline_routing': [False, True],
+    }))
@@ -0,0 +1,359 @@
+import collections
+import heapq
+import itertools
+import helper
+import routing
+from load_planner import TRUCK_PATTERN, LoadPlanner
+
+
+# Kinds of events. Events at the same time are handled in this order, so that package data is updated, packages are
+# ready, and trucks have delivered and returned before any truck departs.
+UPDATE = 0         # Package data changes, such as a corrected address
+PACKAGE_READY = 1  # Delayed packages arrive at the hub
+ARRIVAL = 2        # A truck arrives at a stop and delivers its packages
+HUB_ARRIVAL = 3    # A truck returns to the hub
+DEPARTURE = 4      # A truck loads a trip of packages and leaves the hub
+
+
+class Simulation:
+    """A class used to run a discrete-event simulation of trucks delivering packages from the hub.
+
+    Events are saved to a heap ordered by time, so any number of trucks share a single clock and are simulated in one
+    time-ordered pass. Each truck runs its queued trips in order: it departs once it is at the hub and every package
+    of its next trip is ready, travels to the nearest stop until it holds no packages, then returns to the hub. If a
+    route move budget is given, each trip's route is instead planned at departure and improved with 2-opt and Or-opt
+    moves before the truck follows it.
+
+    With deadline routing, each hop goes to the nearest stop unless that would make a stop with a deadline late, in
+    which case the stop with the least slack is visited first. Hops are only taken once a look-ahead through the
+    remaining stops in order of deadline meets every deadline. Before each hop of a planned route, the arrival times of
+    the rest of the route are checked, and a route that would make a stop late is dropped for deadline routing.
+    InfeasiblePlanError is raised as soon as a stop cannot be reached in time even by going straight to it, or no hop
+    passes the look-ahead, so that a plan that misses a deadline is given up without simulating the rest of the day.
+    The look-ahead is a heuristic, so a plan that some other order of stops could complete may be given up.
+
+    Package data can be changed part way through the day with schedule_address_change, schedule_delay, and
+    schedule_new_package. Deliveries made before a change are kept, and only trucks holding a changed package plan
+    their remaining route again, from the next stop they reach.
+
+    Attributes:
+        trucks (:obj:`list` of :obj:`Truck`): The trucks in the fleet.
+        events (:obj:`list` of :obj:`tuple`): A heap of (time, kind, sequence, truck, data) events.
+        trips (:obj:`dict` of :obj:`str` to :obj:`deque`): Queued trips keyed by truck name. Each trip is a tuple of
+            package ids and the earliest departure time (or None).
+        not_ready (:obj:`dict` of :obj:`str` to :obj:`time`): Times that packages will be ready, keyed by package id.
+        waiting (:obj:`list` of :obj:`Truck`): Trucks at the hub waiting for packages of their next trip.
+        time (time): The time of the most recently handled event.
+        events_handled (int): The number of events handled so far.
+        started (bool): Whether the first trips of all trucks have been scheduled.
+        route_move_budget (int): Candidate moves evaluated to improve each planned route, or None to use nearest-stop
+            routing.
+        route_time_budget (float): Seconds that improving each planned route may take, or None for no limit.
+        routes (:obj:`dict` of :obj:`str` to :obj:`deque`): Remaining planned stops keyed by truck name.
+        route_reports (:obj:`list` of :obj:`RouteReport`): Reports of each improved route.
+        idle (:obj:`list` of :obj:`Truck`): Trucks at the hub with no trips left, which depart again if a trip is added.
+        replan (:obj:`set` of :obj:`str`): Names of trucks whose remaining route is planned again at their next stop.
+        deadline_routing (bool): Whether hops favor stops running out of slack, and unreachable deadlines stop the run.
+
+    """
+
+    def __init__(self, trucks, route_move_budget=None, deadline_routing=False, route_time_budget=None):
+        """Construct a Simulation object.
+
+        Args:
+            trucks (:obj:`list` of :obj:`Truck`): The trucks in the fleet, each starting at the hub on its own clock.
+            route_move_budget (:obj:`int`, optional): Candidate moves evaluated to improve each planned route.
+                Defaults to None, to route each hop to the nearest stop.
+            deadline_routing (:obj:`bool`, optional): Whether to route hops by deadline slack, and raise
+                InfeasiblePlanError once a deadline cannot be met. Defaults to False.
+            route_time_budget (:obj:`float`, optional): Seconds that improving each planned route may take, which
+                makes routes depend on the speed of the machine. Defaults to None, for no limit.
+
+        """
+        self.trucks = list(trucks)
+        self.events = []
+        self.sequence = itertools.count()  # Keeps events at the same time in the order they were scheduled
+        self.trips = {truck.get_name(): collections.deque() for truck in self.trucks}
+        self.not_ready = {}
+        self.waiting = []
+        self.time = None
+        self.events_handled = 0
+        self.started = False
+        self.route_move_budget = route_move_budget
+        self.route_time_budget = route_time_budget
+        self.routes = {truck.get_name(): collections.deque() for truck in self.trucks}
+        self.route_reports = []
+        self.idle = []
+        self.replan = set()
+        self.deadline_routing = deadline_routing
+
+
+    def schedule(self, time, kind, truck=None, data=None):
+        """Add an event to the queue."""
+        heapq.heappush(self.events, (time, kind, next(self.sequence), truck, data))
+
+
+    def schedule_package_ready(self, time, package_ids):
+        """Hold packages at the hub until a given time, such as the arrival of a delayed flight."""
+        for package_id in package_ids:
+            self.not_ready[package_id] = time
+        self.schedule(time, PACKAGE_READY, data=list(package_ids))
+
+
+    def add_trip(self, truck, package_ids, earliest_departure=None):
+        """Queue a trip of packages for a truck.
+
+        Args:
+            truck (Truck): The truck to deliver the packages.
+            package_ids (:obj:`list` of :obj:`str`): Ids of the packages to load.
+            earliest_departure (:obj:`time`, optional): A time before which the truck must not depart. Defaults to
+                None, so that the truck departs as soon as it and the packages are ready.
+
+        """
+        self.trips[truck.get_name()].append((list(package_ids), earliest_departure))
+        if truck in self.idle:  # A truck that finished its trips departs again
+            self.idle.remove(truck)
+            self.start_next_trip(truck)
+
+
+    def schedule_address_change(self, time, package_id, street, city, zip_code):
+        """Change the address of a package at a time, such as when a wrong address is corrected.
+
+        The address the package had before the change is kept for status queries. If the package is on a truck, the
+        truck plans its remaining route again from the next stop it reaches.
+
+        Args:
+            time (time): The time of the change.
+            package_id (str): The id of the package.
+            street (str): The new street address.
+            city (str): The new city.
+            zip_code (str): The new zip code.
+
+        """
+        self.schedule(time, UPDATE, data=(self.apply_address_change, (package_id, street, city, zip_code)))
+
+
+    def schedule_delay(self, time, package_ids, ready_time):
+        """Learn at a time that packages not yet loaded will not be ready until a later ready_time."""
+        self.schedule(time, UPDATE, data=(self.apply_delay, (list(package_ids), ready_time)))
+
+
+    def schedule_new_package(self, time, package_data, truck=None):
+        """Add a package at a time, given a row of package data in the format of the package file.
+
+        The package is added to the first queued trip with room, or to a new trip of the truck with the fewest trips
+        queued. A truck named in a 'Can only be on truck' note, or the given truck, is used instead if there is one.
+        """
+        self.schedule(time, UPDATE, data=(self.apply_new_package, (list(package_data), truck)))
+
+
+    def apply_address_change(self, package_id, street, city, zip_code):
+        package = helper.get_package(package_id)
+        if package is not None and package.get_time_delivered_seconds() is not None:
+            raise ValueError(f'Package {package_id} was delivered before its address was changed.')
+        truck = self.get_holding_truck(package)
+        if truck is None:
+            helper.change_package_address(package_id, street, city, zip_code, self.time)
+            return
+        truck.get_pending_stops().remove(package)
+        helper.change_package_address(package_id, street, city, zip_code, self.time)
+        truck.get_pending_stops().add(package)
+        self.replan.add(truck.get_name())
+
+
+    def apply_delay(self, package_ids, ready_time):
+        for package_id in package_ids:
+            package = helper.get_package(package_id)
+            if package is None or package.get_time_loaded_seconds() is not None:
+                raise ValueError(f'Package {package_id} cannot be delayed, as it is not waiting at the hub.')
+        self.schedule_package_ready(ready_time, package_ids)
+
+
+    def apply_new_package(self, package_data, truck=None):
+        package = helper.register_package(package_data)
+        if package.get_address_index() < 0:
+            raise ValueError(f'Package {package.get_package_id()} has an address that does not match any location.')
+        match = TRUCK_PATTERN.search(package.get_special())
+        if truck is None and match:
+            truck_number = int(match.group(1))
+            if not 1 <= truck_number <= len(self.trucks):
+                raise ValueError(f'Package {package.get_package_id()} can only be on truck {truck_number}, but the '
+                                 f'fleet has {len(self.trucks)} truck{"s" if len(self.trucks) != 1 else ""}.')
+            truck = self.trucks[truck_number - 1]
+        candidates = [truck] if truck is not None else self.trucks
+        for candidate in candidates:
+            for package_ids, earliest_departure in self.trips[candidate.get_name()]:
+                if len(package_ids) < candidate.get_capacity():
+                    package_ids.append(package.get_package_id())
+                    return
+        truck = min(candidates, key=lambda t: (len(self.trips[t.get_name()]), t.get_time_on_clock()))
+        self.add_trip(truck, [package.get_package_id()])
+
+
+    def get_holding_truck(self, package):
+        """Return the truck holding a package, or None if the package is not on a truck."""
+        if package is None or package.get_time_loaded_seconds() is None:
+            return None
+        for truck in self.trucks:
+            if truck.get_name() == package.get_assigned_truck():
+                return truck
+        return None
+
+
+    def run(self, until=None):
+        """Handle events in time order.
+
+        Args:
+            until (:obj:`time`, optional): Stop before the first event after this time, so that the simulation can be
+                resumed later. Defaults to None, to run until no events remain.
+
+        Returns:
+            The number of events handled.
+
+        Raises:
+            InfeasiblePlanError: With deadline routing, once a held package can no longer be delivered by its deadline.
+                The simulation cannot be resumed afterward.
+
+        """
+        if not self.started:
+            self.started = True
+            for truck in self.trucks:
+                self.start_next_trip(truck)
+
+        handled_before = self.events_handled
+        events = self.events
+        while events:
+            if until is not None and events[0][0] > until:
+                break
+            time, kind, sequence, truck, data = heapq.heappop(events)
+            self.time = time
+            self.events_handled += 1
+            if kind == ARRIVAL:
+                helper.travel_to_stop(truck, data[0], data[1])
+                if truck.get_name() in self.replan:
+                    self.replan.discard(truck.get_name())
+                    self.routes[truck.get_name()].clear()
+                    if self.route_move_budget is not None and len(truck.get_pending_stops()) > 0:
+                        self.plan_route(truck)
+                self.start_next_hop(truck)
+            elif kind == DEPARTURE:
+                package_ids, earliest_departure = data
+                if any(package_id in self.not_ready for package_id in package_ids):
+                    # A package of the trip was delayed after the departure was scheduled.
+                    self.trips[truck.get_name()].appendleft(data)
+                    self.waiting.append(truck)
+                    continue
+                truck.set_time_on_clock(time)
+                helper.load_packages(truck, package_ids)
+                if self.route_move_budget is not None:
+                    self.plan_route(truck)
+                self.start_next_hop(truck)
+            elif kind == HUB_ARRIVAL:
+                helper.travel_to_hub(truck)
+                self.start_next_trip(truck)
+            elif kind == PACKAGE_READY:
+                self.release_packages(time, data)
+            elif kind == UPDATE:
+                update, arguments = data
+                update(*arguments)
+        return self.events_handled - handled_before
+
+
+    def plan_route(self, truck):
+        """Plan and improve the route of a truck that has just loaded its packages."""
+        route = routing.plan_route(truck)
+        route, report = routing.improve_route(route, truck.get_location_index(),
+                                              truck.get_time_on_clock().total_seconds(), truck.get_speed(),
+                                              routing.get_stop_deadlines(truck), self.route_move_budget,
+                                              self.route_time_budget)
+        self.routes[truck.get_name()].extend(route)
+        self.route_reports.append(report)
+
+
+    def start_next_hop(self, truck):
+        """Schedule a truck's arrival at its next planned or nearest stop, or at the hub once it holds no packages."""
+        route = self.routes[truck.get_name()]
+        while route and route[0] not in truck.get_pending_stops().stops:
+            route.popleft()  # Skip stops whose packages were delivered along with an earlier stop
+        if self.deadline_routing and route and helper.check_deadlines(truck, route) is not None:
+            route.clear()  # Route the remaining hops by deadline slack instead of making a stop late
+        if route:
+            location_index = route.popleft()
+            distance = helper.distance_table.get_distance(truck.get_location_index(), location_index)
+            self.schedule(truck.get_time_on_clock() + truck.get_travel_time(distance), ARRIVAL, truck,
+                          (distance, [location_index]))
+        elif len(truck.get_pending_stops()) > 0:
+            if self.deadline_routing:
+                distance, location_indexes = helper.find_deadline_stop(truck)
+            else:
+                distance, location_indexes = helper.find_nearest_stop(truck)
+            self.schedule(truck.get_time_on_clock() + truck.get_travel_time(distance), ARRIVAL, truck,
+                          (distance, location_indexes))
+        else:
+            distance = helper.get_distance_to_hub(truck)
+            self.schedule(truck.get_time_on_clock() + truck.get_travel_time(distance), HUB_ARRIVAL, truck)
+
+
+    def start_next_trip(self, truck):
+        """Schedule a truck's next departure, or wait at the hub until the packages of its next trip are ready."""
+        trips = self.trips[truck.get_name()]
+        if not trips:
+            self.idle.append(truck)
+            return
+        package_ids, earliest_departure = trips[0]
+        if any(package_id in self.not_ready for package_id in package_ids):
+            self.waiting.append(truck)
+            return
+
+        trip = trips.popleft()
+        departure_time = truck.get_time_on_clock()
+        if self.time is not None and self.time > departure_time:
+            departure_time = self.time  # A waiting truck departs when its last package is ready
+        if earliest_departure is not None and earliest_departure > departure_time:
+            departure_time = earliest_departure
+        self.schedule(departure_time, DEPARTURE, truck, trip)
+
+
+    def release_packages(self, time, package_ids):
+        """Mark packages as ready, and retry departures of trucks waiting for them."""
+        for package_id in package_ids:
+            if self.not_ready.get(package_id) == time:
+                del self.not_ready[package_id]
+        waiting = self.waiting
+        self.waiting = []
+        for truck in waiting:
+            self.start_next_trip(truck)
+
+
+    def get_total_distance(self):
+        return sum(truck.get_distance_traveled() for truck in self.trucks)
+
+
+def plan_day(trucks, route_move_budget=None, deadline_routing=False):
+    """Plan the loads of a fleet and queue the day's deliveries to a new Simulation object.
+
+    Delayed packages, and packages with a wrong address until it is corrected at helper.ADDRESS_FIX_TIME, are held at
+    the hub until they are ready. A correction from helper.ADDRESS_CORRECTIONS is only scheduled for a package whose
+    special note says its address is wrong, and only if the corrected address is a known location.
+
+    Args:
+        trucks (:obj:`list` of :obj:`Truck`): The trucks in the fleet, each waiting at the hub.
+        route_move_budget (:obj:`int`, optional): Candidate moves evaluated to improve each planned route. Defaults to
+            None, to route each hop to the nearest stop.
+        deadline_routing (:obj:`bool`, optional): Whether to route hops by deadline slack. Defaults to False.
+
+    Returns:
+        The Simulation object, ready to run.
+
+    Raises:
+        ValueError: If the packages cannot be planned for the fleet.
+
+    """
+    simulation = Simulation(trucks, route_move_budget, deadline_routing)
+    planner = LoadPlanner(trucks)
+    planner.schedule(simulation)
+    for package_id in planner.get_pending_addresses():
+        correction = helper.ADDRESS_CORRECTIONS.get(package_id)
+        if correction is not None and (correction[0], correction[2]) in helper.address_index_table:
+            simulation.schedule_address_change(helper.ADDRESS_FIX_TIME, package_id, *correction)
+    return simulation
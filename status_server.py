@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import collections
+import json
+import urllib.parse
+import helper
+import main
+from package import END_OF_DAY, parse_time
+from status_timeline import STATUS_NAMES, AT_HUB, EN_ROUTE, DELIVERED
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+CACHE_SIZE = 256          # Status responses kept, keyed by query time, before the least recently used is evicted
+MAX_REQUEST_BYTES = 8192  # Longest request line and headers accepted
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+class StatusServer:
+    """A class used to serve package statuses and truck mileage over HTTP as JSON, once deliveries are simulated.
+
+    All connections are handled by one asyncio event loop. Responses are built without awaiting, so a query never
+    sees helper.status_timeline part way through another query. Endpoints are:
+
+        GET /packages/<id>[?time=HH:MM]  One package, found with helper.get_package.
+        GET /status[?time=HH:MM]         Counts and records of every package, cached by query time.
+        GET /trucks                      Miles traveled, and the clock and location of each truck.
+
+    Times are parsed like deadlines, so '10:30', '2:15 PM', and 'EOD' are accepted. Without a time, the status at the
+    end of the day is given.
+
+    Attributes:
+        trucks (:obj:`list` of :obj:`Truck`): The trucks, once every delivery is simulated.
+        cache_size (int): The number of status responses kept in cache.
+        cache (:obj:`OrderedDict` of :obj:`int` to :obj:`bytes`): Encoded status responses, keyed by query time in
+            seconds, from least to most recently used.
+        cache_hits (int): The number of status queries answered from cache.
+        cache_misses (int): The number of status queries that built a response.
+        server (:obj:`asyncio.Server`): The listening server, once started.
+
+    """
+
+    def __init__(self, trucks, cache_size=CACHE_SIZE):
+        """Construct a StatusServer object.
+
+        Args:
+            trucks (:obj:`list` of :obj:`Truck`): The trucks, once every delivery is simulated.
+            cache_size (:obj:`int`, optional): The number of status responses kept in cache. Defaults to CACHE_SIZE.
+
+        """
+        self.trucks = trucks
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.server = None
+
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening for connections, and return the port, which is chosen by the system if port is 0."""
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_REQUEST_BYTES)
+        return self.server.sockets[0].getsockname()[1]
+
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+    async def handle_connection(self, reader, writer):
+        """Answer requests on a connection until the client closes it or asks for it to be closed."""
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    keep_alive = True
+                    while True:
+                        header = await reader.readline()
+                        if header in (b'\r\n', b'\n', b''):
+                            break
+                        if header.lower().startswith(b'connection:') and b'close' in header.lower():
+                            keep_alive = False
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(self.format_response(400, {'error': 'Request too long'}, keep_alive=False))
+                    break
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    status, body, keep_alive = 400, {'error': 'Malformed request line'}, False
+                elif parts[0] != 'GET':
+                    status, body = 405, {'error': f'Method not allowed: {parts[0]}'}
+                else:
+                    status, body = self.route(parts[1])
+                if parts[2:] == ['HTTP/1.0']:
+                    keep_alive = False
+                writer.write(self.format_response(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    @staticmethod
+    def format_response(status, body, keep_alive=True):
+        """Return the bytes of an HTTP response. The body is a JSON-serializable object, or bytes already encoded."""
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        head = (f'HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        return head.encode('latin-1') + body
+
+
+    def route(self, target):
+        """Return the HTTP status and body of a request target, such as '/status?time=10:30'."""
+        url = urllib.parse.urlsplit(target)
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            time = parse_time(query['time'][0]) if 'time' in query else END_OF_DAY
+        except ValueError:
+            return 400, {'error': f'Invalid time: {query["time"][0]}'}
+
+        path = url.path.rstrip('/')
+        if path == '/status':
+            return 200, self.get_status_body(time)
+        if path == '/trucks':
+            return 200, self.get_trucks_body()
+        if path.startswith('/packages/'):
+            body = self.get_package_body(urllib.parse.unquote(path[len('/packages/'):]), time)
+            if body is None:
+                return 404, {'error': 'Unknown package id'}
+            return 200, body
+        return 404, {'error': f'Unknown path: {url.path}'}
+
+
+    def get_status_body(self, time):
+        """Return the encoded status of every package at a time, from cache if it was built recently."""
+        body = self.cache.get(time)
+        if body is not None:
+            self.cache.move_to_end(time)
+            self.cache_hits += 1
+            return body
+
+        self.cache_misses += 1
+        timeline = helper.status_timeline
+        at_hub, en_route, delivered = timeline.counts_at(time)
+        lines = ''.join(timeline.iter_records(time, 'jsonl')).rstrip('\n').replace('\n', ',')
+        body = (f'{{"counts": {{"at the hub": {at_hub}, "en route": {en_route}, "delivered": {delivered}}}, '
+                f'"packages": [{lines}]}}').encode('utf-8')
+        self.cache[time] = body
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return body
+
+
+    @staticmethod
+    def get_package_body(package_id, time):
+        """Return the data of one package and its status at a time, or None if there is no package with that id.
+
+        The address is the one the package had at the query time. Load and delivery times after the query time are
+        not given, as they have not happened yet.
+        """
+        package = helper.get_package(package_id)
+        if package is None:
+            return None
+        time_loaded = package.get_time_loaded_seconds()
+        time_delivered = package.get_time_delivered_seconds()
+        status = AT_HUB
+        if time_delivered is not None and time_delivered <= time:
+            status = DELIVERED
+        elif time_loaded is not None and time_loaded <= time:
+            status = EN_ROUTE
+        address = helper.full_address_table[helper.get_address_index(package, time)]
+        return {
+            'package_id': package.get_package_id(),
+            'address': address[1], 'city': address[2], 'state': address[3], 'zip_code': address[4],
+            'deadline': package.get_deadline(),
+            'mass': package.get_mass(),
+            'special': package.get_special(),
+            'status': STATUS_NAMES[status],
+            'truck': package.get_assigned_truck() if status != AT_HUB else '',
+            'time_loaded': str(package.get_time_loaded()) if status != AT_HUB else None,
+            'time_delivered': str(package.get_time_delivered()) if status == DELIVERED else None,
+        }
+
+
+    def get_trucks_body(self):
+        """Return the miles traveled, clock, and location of each truck, and the total miles of all trucks."""
+        trucks = [{'name': truck.get_name(), 'miles': round(truck.get_distance_traveled(), 1),
+                   'time_on_clock': str(truck.get_time_on_clock()), 'location_index': truck.get_location_index()}
+                  for truck in self.trucks]
+        return {'trucks': trucks, 'total_miles': round(sum(truck['miles'] for truck in trucks), 1)}
+
+
+async def fetch(path, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Request a path from a status server, and return the HTTP status and decoded JSON body.
+
+    Args:
+        path (str): The request target, such as '/packages/9?time=10:30'.
+        host (:obj:`str`, optional): The server's host. Defaults to DEFAULT_HOST.
+        port (:obj:`int`, optional): The server's port. Defaults to DEFAULT_PORT.
+
+    Returns:
+        A tuple of the HTTP status code and the response body decoded from JSON.
+
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        content_length = 0
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = header.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                content_length = int(value)
+        body = await reader.readexactly(content_length)
+    finally:
+        writer.close()
+    return status, json.loads(body)
+
+
+def request(path, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Request a path from a status server outside an event loop, such as from a script or the Python prompt."""
+    return asyncio.run(fetch(path, host, port))
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=CACHE_SIZE, **simulation_files):
+    """Simulate the day's deliveries once, then serve statuses until the process is stopped."""
+    server = StatusServer(main.run_simulation(**simulation_files), cache_size)
+    port = await server.start(host, port)
+    print(f'Serving package status on http://{host}:{port}')
+    async with server.server:
+        await server.server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve WGUPS package statuses over HTTP as JSON.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on, or 0 for any free port')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE, help='status responses kept in cache')
+    parser.add_argument('--distance-file', default=helper.DISTANCE_FILE, help='path of the distance table CSV file')
+    parser.add_argument('--package-file', default=helper.PACKAGE_FILE, help='path of the package CSV file')
+    parser.add_argument('--cache-file', default=main.CACHE_FILE, help="path of the parsed table cache, or ''")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.cache_size, distance_file=args.distance_file,
+                          package_file=args.package_file, cache_file=args.cache_file))
+    except KeyboardInterrupt:
+        print('\nServer stopped')
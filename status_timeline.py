@@ -0,0 +1,258 @@
+import bisect
+import csv
+import io
+import json
+from package import seconds_to_time
+
+
+AT_HUB = 0
+EN_ROUTE = 1
+DELIVERED = 2
+
+NEVER = float('inf')  # Load or delivery time saved for packages that were never loaded or delivered
+
+# Names of each status, and the columns of records written by iter_records.
+STATUS_NAMES = ('at the hub', 'en route', 'delivered')
+RECORD_COLUMNS = ['time', 'package_id', 'address', 'city', 'zip_code', 'deadline', 'mass', 'status', 'truck',
+                  'time_delivered']
+RECORD_FORMATS = ('csv', 'jsonl')
+
+
+class StatusTimeline:
+    """A class used to answer status queries at any time of day, once a simulation has finished.
+
+    Loads and deliveries of every package are saved to one list of events sorted by time. The status of every package
+    is kept for the time of the last query, so a new query only applies the events between the two times, found with
+    a binary search. Each query returns its own copy of the statuses, so results of earlier queries are never changed.
+    Counts of packages by status are found with binary searches alone.
+
+    Attributes:
+        package_ids (:obj:`list` of :obj:`str`): Package ids, in the order that rows are output.
+        event_times (:obj:`list` of :obj:`int`): Sorted times, in seconds, of all loads and deliveries.
+        events (:obj:`list` of :obj:`tuple`): (position, status) pairs for each event time, where position indexes
+            package_ids and status is the status of the package from that time on.
+        load_times (:obj:`list` of :obj:`float`): Sorted load times of all packages, in seconds.
+        delivery_times (:obj:`list` of :obj:`float`): Sorted delivery times of all packages, in seconds.
+        statuses (:obj:`list` of :obj:`int`): The status of each package as of the last query.
+        cursor (int): The number of events applied to statuses.
+        rows (:obj:`list` of :obj:`tuple`): Output lines of each package for each status.
+        fields (:obj:`list` of :obj:`tuple`): Record fields of each package that do not depend on the query time.
+        records (:obj:`dict` of :obj:`str` to :obj:`list`): Encoded records of each package for each status, keyed by
+            format, which are built on first use.
+        change_times (:obj:`dict` of :obj:`int` to :obj:`list`): Times, in seconds, that the address of a package was
+            changed, keyed by position. Only packages whose address was changed are listed.
+        previous_rows (:obj:`dict` of :obj:`int` to :obj:`list`): Output lines of a package for each status, for the
+            address it had before each change time, keyed by position.
+        previous_fields (:obj:`dict` of :obj:`int` to :obj:`list`): Record fields of a package for the address it had
+            before each change time, keyed by position.
+        previous_records (:obj:`dict` of :obj:`str` to :obj:`dict`): Encoded records for previous_fields, keyed by
+            format and then by position.
+
+    """
+
+    def __init__(self, packages, address_table, address_history=None):
+        """Construct a StatusTimeline object.
+
+        Args:
+            packages (:obj:`iterable` of :obj:`Package`): The packages, after all deliveries are simulated.
+            address_table (:obj:`list` of :obj:`list`): The full address table, indexed by address index.
+            address_history (:obj:`dict`, optional): Lists of (seconds, previous address index) tuples, in time order,
+                keyed by the id of each package whose address was changed. Defaults to None.
+
+        """
+        packages = sorted(packages, key=lambda p: int(p.get_package_id()))
+        self.package_ids = [p.get_package_id() for p in packages]
+        timed_events = []
+        self.load_times = []
+        self.delivery_times = []
+        self.rows = []
+        self.fields = []
+        self.records = {}
+        self.change_times = {}
+        self.previous_rows = {}
+        self.previous_fields = {}
+        self.previous_records = {}
+        address_history = address_history or {}
+        for position, package in enumerate(packages):
+            time_loaded = package.get_time_loaded_seconds()
+            time_delivered = package.get_time_delivered_seconds()
+            time_loaded = NEVER if time_loaded is None else time_loaded
+            time_delivered = NEVER if time_delivered is None else time_delivered
+            timed_events.append((time_loaded, position, EN_ROUTE))
+            timed_events.append((time_delivered, position, DELIVERED))
+            self.load_times.append(time_loaded)
+            self.delivery_times.append(time_delivered)
+            self.rows.append(self.format_rows(package, address_table))
+            self.fields.append(self.format_fields(package, address_table))
+            history = address_history.get(package.get_package_id())
+            if history:
+                self.change_times[position] = [change_time for change_time, address_index in history]
+                self.previous_rows[position] = [self.format_rows(package, address_table, address_index)
+                                                for change_time, address_index in history]
+                self.previous_fields[position] = [self.format_fields(package, address_table, address_index)
+                                                  for change_time, address_index in history]
+        timed_events.sort()
+        self.event_times = [event[0] for event in timed_events]
+        self.events = [(event[1], event[2]) for event in timed_events]
+        self.load_times.sort()
+        self.delivery_times.sort()
+        self.statuses = [AT_HUB] * len(packages)
+        self.cursor = 0
+
+
+    @staticmethod
+    def format_rows(package, address_table, address_index=None):
+        """Return the output line of a package for each status, as a tuple indexed by status.
+
+        The package's current address is used unless another address_index is given.
+        """
+        if address_index is None:
+            address_index = package.get_address_index()
+        address = address_table[address_index][1:5]
+        prefix = (f'{package.get_package_id()}, {address[0]}, {address[1]}, {address[3]},'
+                  f' {package.get_deadline()}, {package.get_mass()}, ')
+        truck = package.get_assigned_truck()
+        delivered = f'{package.get_status()} by {truck}, {seconds_to_time(package.get_time_delivered_seconds())}'
+        return prefix + 'at the hub\n', prefix + f'en route - on {truck}\n', prefix + delivered + '\n'
+
+
+    @staticmethod
+    def format_fields(package, address_table, address_index=None):
+        """Return the record fields of a package from package_id to status, followed by its truck and delivery time."""
+        if address_index is None:
+            address_index = package.get_address_index()
+        address = address_table[address_index][1:5]
+        time_delivered = package.get_time_delivered_seconds()
+        return ([package.get_package_id(), address[0], address[1], address[3], package.get_deadline(),
+                 package.get_mass()], package.get_assigned_truck() or '',
+                '' if time_delivered is None else str(seconds_to_time(time_delivered)))
+
+
+    def get_records(self, record_format):
+        """Return the encoded record of each package for each status, without the leading time field.
+
+        CSV records start with the field separator and JSON records with the separator after the time key, so that a
+        query only needs to join each record to its time.
+        """
+        records = self.records.get(record_format)
+        if records is not None:
+            return records
+        if record_format not in RECORD_FORMATS:
+            raise ValueError(f'Unknown record format: {record_format}')
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+
+        def encode(fields, truck, time_delivered):
+            encoded = []
+            for status, status_name in enumerate(STATUS_NAMES):
+                values = fields + [status_name, truck if status != AT_HUB else '',
+                                   time_delivered if status == DELIVERED else '']
+                if record_format == 'csv':
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerow([''] + values)
+                    encoded.append(buffer.getvalue())
+                else:
+                    record = json.dumps(dict(zip(RECORD_COLUMNS[1:], values)))
+                    encoded.append(', ' + record[1:] + '\n')
+            return tuple(encoded)
+
+        records = [encode(*fields) for fields in self.fields]
+        self.records[record_format] = records
+        self.previous_records[record_format] = {position: [encode(*fields) for fields in previous]
+                                                for position, previous in self.previous_fields.items()}
+        return records
+
+
+    def get_versions(self, time):
+        """Return the number of address changes made by a time, keyed by the position of each package changed later.
+
+        The number indexes previous_rows, previous_fields, and previous_records of the package.
+        """
+        versions = {}
+        for position, change_times in self.change_times.items():
+            version = bisect.bisect_right(change_times, time)
+            if version < len(change_times):
+                versions[position] = version
+        return versions
+
+
+    def join_lines(self, time, lines, previous_lines, prefix, batch_size):
+        """Return an iterator of the line of every package for its status at a time, joined into strings of batch_size
+        lines.
+
+        Statuses are found before the iterator is returned, so iterators for different times can be read in any order.
+        """
+        statuses = self.status_at(time)
+        versions = self.get_versions(time)
+
+        def iter_joined():
+            for start in range(0, len(lines), batch_size):
+                end = min(start + batch_size, len(lines))
+                batch = [prefix + lines[i][statuses[i]] for i in range(start, end)]
+                for position, version in versions.items():  # Packages with an address changed after the time
+                    if start <= position < end:
+                        batch[position - start] = prefix + previous_lines[position][version][statuses[position]]
+                yield ''.join(batch)
+
+        return iter_joined()
+
+
+    def __len__(self):
+        return len(self.package_ids)
+
+
+    def status_at(self, time):
+        """Return the status of every package at a time.
+
+        Only the loads and deliveries between the previous query and this one are applied to the saved statuses, which
+        are then copied, so a query costs O(log n + changed packages) plus an O(n) copy.
+
+        Args:
+            time (int): The time of the query, in seconds after midnight.
+
+        Returns:
+            A new :obj:`list` of statuses (AT_HUB, EN_ROUTE, or DELIVERED) in the order of package_ids, which later
+            queries do not change.
+
+        """
+        target = bisect.bisect_right(self.event_times, time)
+        statuses = self.statuses
+        events = self.events
+        for i in range(self.cursor, target):             # Move forward in time
+            position, status = events[i]
+            statuses[position] = status
+        for i in range(self.cursor - 1, target - 1, -1):  # Move backward in time
+            position, status = events[i]
+            statuses[position] = status - 1
+        self.cursor = target
+        return list(statuses)
+
+
+    def counts_at(self, time):
+        """Return the number of packages at the hub, en route, and delivered at a time, in O(log n)."""
+        loaded = bisect.bisect_right(self.load_times, time)
+        delivered = bisect.bisect_right(self.delivery_times, time)
+        return len(self.package_ids) - loaded, loaded - delivered, delivered
+
+
+    def iter_batches(self, time, batch_size=1024):
+        """Yield output lines for the status of every package at a time, joined into strings of batch_size lines."""
+        return self.join_lines(time, self.rows, self.previous_rows, '', batch_size)
+
+
+    def iter_records(self, time, record_format='csv', batch_size=1024):
+        """Yield CSV rows or JSON lines for the status of every package at a time, joined into strings of batch_size.
+
+        Args:
+            time (int): The time of the query, in seconds after midnight.
+            record_format (:obj:`str`, optional): 'csv' or 'jsonl'. Defaults to 'csv'. CSV rows have no header; the
+                columns are RECORD_COLUMNS.
+            batch_size (:obj:`int`, optional): The number of records in each string. Defaults to 1024.
+
+        """
+        records = self.get_records(record_format)
+        time_text = f'{time // 3600}:{time // 60 % 60:02d}:{time % 60:02d}'  # Shows 'EOD' as 24:00:00
+        prefix = time_text if record_format == 'csv' else '{"time": "' + time_text + '"'
+        return self.join_lines(time, records, self.previous_records[record_format], prefix, batch_size)
@@ -0,0 +1,159 @@
+import argparse
+import csv
+import gzip
+import numpy
+
+
+HUB_ADDRESS = '4001 South 700 East'
+HUB_ZIP_CODE = '84107'
+CITIES = ['Salt Lake City', 'West Valley City', 'Murray', 'Holladay', 'Millcreek']
+
+# Deadlines and the share of packages given each one.
+DEADLINES = (('EOD', 0.70), ('10:30 AM', 0.25), ('9:00 AM', 0.05))
+
+# Special notes and the share of packages given each one. Other packages have no note.
+DELAYED_NOTE = 'Delayed on flight---will not arrive to depot until 9:05 am'
+TRUCK_NOTE = 'Can only be on truck 2'
+WRONG_ADDRESS_NOTE = 'Wrong address listed'
+GROUP_NOTE = 'Must be delivered with {}'
+SPECIAL_NOTES = ((DELAYED_NOTE, 0.03), (TRUCK_NOTE, 0.02), (WRONG_ADDRESS_NOTE, 0.001), (GROUP_NOTE, 0.01))
+GROUP_BLOCK = 4  # Packages are only delivered with others in the same block of ids, which keeps groups small
+
+
+def open_output_file(file_name):
+    """Open a file for writing as text, compressing it if the file name ends in '.gz'."""
+    if file_name.endswith('.gz'):
+        return gzip.open(file_name, mode='wt', encoding='utf-8', newline='')
+    return open(file_name, mode='w', encoding='utf-8', newline='')
+
+
+def get_street(location_index):
+    """Return the street address and zip code of a synthetic location."""
+    if location_index == 0:
+        return HUB_ADDRESS, HUB_ZIP_CODE
+    return f'{location_index} Synthetic Ave', f'{84000 + location_index % 1000:05d}'
+
+
+def write_distance_file(file_name, num_locations, seed=0, area=20.0, detour=1.3):
+    """Write a distance table in the WGUPS format, for locations scattered at random.
+
+    Distances are straight-line distances between random points, multiplied by a detour factor and rounded to a tenth
+    of a mile. Rows are computed and written one at a time, so memory use does not grow with the number of locations.
+
+    Args:
+        file_name (str): The path of the file. Files ending in '.gz' are compressed.
+        num_locations (int): The number of locations, including the hub.
+        seed (:obj:`int`, optional): The seed for random numbers. Defaults to 0.
+        area (:obj:`float`, optional): The width and height, in miles, of the square locations are placed in.
+        detour (:obj:`float`, optional): The ratio of road distance to straight-line distance.
+
+    """
+    random = numpy.random.default_rng(seed)
+    points = random.uniform(0.0, area, size=(num_locations, 2))
+    with open_output_file(file_name) as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(['', 'WGUPS Distance Table'])
+        writer.writerow(['', '', 'Synthetic Routing Data'])
+        writer.writerow([])
+        for i in range(num_locations):
+            street, zip_code = get_street(i)
+            address = f'{street} ({zip_code})' + (' HUB' if i == 0 else '')
+            distances = numpy.round(numpy.hypot(*(points[:i + 1] - points[i]).T) * detour, 1)
+            row = [f'Location {i}', address]
+            row.extend('0' if d == 0 else f'{d:g}' for d in distances)
+            writer.writerow(row)
+
+
+def write_road_network(edge_file, location_file, num_locations, grid_size=None, seed=0, block=0.25):
+    """Write a road network as an edge list, and a location file placing each location at a node of the network.
+
+    Nodes are laid out on a square grid of streets, with each segment's length varying randomly around the length of a
+    block, and locations are placed at distinct random nodes.
+
+    Args:
+        edge_file (str): The path of the edge list. Files ending in '.gz' are compressed.
+        location_file (str): The path of the location file. Files ending in '.gz' are compressed.
+        num_locations (int): The number of locations, including the hub.
+        grid_size (:obj:`int`, optional): The number of nodes along each side of the grid. Defaults to None, for
+            about four nodes per location.
+        seed (:obj:`int`, optional): The seed for random numbers. Defaults to 0.
+        block (:obj:`float`, optional): The mean length of a segment, in miles. Defaults to 0.25.
+
+    """
+    random = numpy.random.default_rng(seed + 2)
+    grid_size = grid_size or max(2, int(numpy.ceil(numpy.sqrt(num_locations * 4))))
+    with open_output_file(edge_file) as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(['from', 'to', 'miles'])
+        for row in range(grid_size):
+            lengths = numpy.round(random.uniform(0.5, 1.5, size=(2, grid_size)) * block, 3)
+            for column in range(grid_size):
+                node = row * grid_size + column
+                if column + 1 < grid_size:
+                    writer.writerow([node, node + 1, f'{lengths[0, column]:g}'])
+                if row + 1 < grid_size:
+                    writer.writerow([node, node + grid_size, f'{lengths[1, column]:g}'])
+
+    nodes = random.choice(grid_size * grid_size, size=num_locations, replace=False)
+    with open_output_file(location_file) as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(['name', 'address', 'node'])
+        for i in range(num_locations):
+            street, zip_code = get_street(i)
+            writer.writerow([f'Location {i}', f'{street} ({zip_code})' + (' HUB' if i == 0 else ''), int(nodes[i])])
+
+
+def write_package_file(file_name, num_packages, num_locations, seed=0):
+    """Write a package file in the WGUPS format, with deadlines and special notes in realistic shares.
+
+    Args:
+        file_name (str): The path of the file. Files ending in '.gz' are compressed.
+        num_packages (int): The number of packages.
+        num_locations (int): The number of locations in the matching distance table, including the hub.
+        seed (:obj:`int`, optional): The seed for random numbers. Defaults to 0.
+
+    """
+    random = numpy.random.default_rng(seed + 1)
+    address_indexes = random.integers(1, num_locations, size=num_packages)
+    deadlines = random.choice([d[0] for d in DEADLINES], size=num_packages, p=[d[1] for d in DEADLINES])
+    masses = random.integers(1, 90, size=num_packages)
+    note_draws = random.random(size=num_packages)
+    thresholds = numpy.cumsum([note[1] for note in SPECIAL_NOTES])
+
+    with open_output_file(file_name) as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(['WGUPS Package File'])
+        writer.writerow([])
+        writer.writerow(['Package\nID', 'Address', 'City ', 'State', 'Zip', 'Delivery\nDeadline', 'Mass\nKILO',
+                         'Special Notes'])
+        for i in range(num_packages):
+            package_id = i + 1
+            street, zip_code = get_street(int(address_indexes[i]))
+            note = ''
+            note_index = int(numpy.searchsorted(thresholds, note_draws[i], side='right'))
+            if note_index < len(SPECIAL_NOTES):
+                note = SPECIAL_NOTES[note_index][0]
+                if note == GROUP_NOTE:
+                    block_start = package_id - (package_id - 1) % GROUP_BLOCK
+                    others = [str(j) for j in range(block_start, min(block_start + GROUP_BLOCK, num_packages + 1))
+                              if j != package_id]
+                    note = GROUP_NOTE.format(', '.join(others)) if others else ''
+            writer.writerow([package_id, street, CITIES[int(address_indexes[i]) % len(CITIES)], 'UT', zip_code,
+                             deadlines[i], int(masses[i]), note])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic distance and package files in the WGUPS format.')
+    parser.add_argument('--locations', type=int, default=1000, help='number of locations, including the hub')
+    parser.add_argument('--packages', type=int, default=10000, help='number of packages')
+    parser.add_argument('--seed', type=int, default=0, help='seed for random numbers')
+    parser.add_argument('--distance-file', default='synthetic_distances.csv', help='path of the distance table')
+    parser.add_argument('--package-file', default='synthetic_packages.csv', help='path of the package file')
+    parser.add_argument('--road-network', nargs=2, metavar=('EDGE_FILE', 'LOCATION_FILE'),
+                        help='write a sparse road network and its locations instead of a distance table')
+    args = parser.parse_args()
+    if args.road_network:
+        write_road_network(args.road_network[0], args.road_network[1], args.locations, seed=args.seed)
+    else:
+        write_distance_file(args.distance_file, args.locations, args.seed)
+    write_package_file(args.package_file, args.packages, args.locations, args.seed)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import struct
+import numpy
+from distance_matrix import DistanceMatrix
+
+
+MAGIC = b'WGUPSTC1'             # Identifies a cache file, and the version of its format
+PREFIX = struct.Struct('<8sQ')  # The magic bytes and the length of the header, in bytes
+ALIGNMENT = 64                  # The distance data starts at a multiple of this many bytes, for memory mapping
+
+
+def get_source_keys(file_names):
+    """Return the size, modification time, and SHA-256 hash of each source file, used to check that a cache matches.
+
+    Args:
+        file_names (:obj:`list` of :obj:`str`): Paths of the source files.
+
+    Returns:
+        A :obj:`list` of [path, size, mtime in nanoseconds, hash] lists.
+
+    """
+    keys = []
+    for file_name in file_names:
+        status = os.stat(file_name)
+        digest = hashlib.sha256()
+        with open(file_name, mode='rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        keys.append([os.path.abspath(file_name), status.st_size, status.st_mtime_ns, digest.hexdigest()])
+    return keys
+
+
+def save_cache(cache_file, file_names, locations, package_rows, distance_table):
+    """Write parsed tables to a binary cache file.
+
+    The file holds the magic bytes and header length, a JSON header with the source keys, locations, and package rows,
+    then the distance matrix as a raw buffer of little-endian float64 values, aligned so that it can be memory-mapped.
+    The file is written to a temporary path and renamed, so a partly written cache is never read.
+
+    Args:
+        cache_file (str): The path of the cache file.
+        file_names (:obj:`list` of :obj:`str`): Paths of the source files the tables were parsed from.
+        locations (:obj:`list` of :obj:`list` of :obj:`str`): The location name and address of each location.
+        package_rows (:obj:`list` of :obj:`list` of :obj:`str`): Rows of package data.
+        distance_table (DistanceMatrix): The distances between locations.
+
+    Returns:
+        None.
+
+    """
+    header = json.dumps({'sources': get_source_keys(file_names), 'locations': locations,
+                         'packages': package_rows, 'size': len(distance_table)},
+                        separators=(',', ':')).encode('utf-8')
+    data_offset = -(-(PREFIX.size + len(header)) // ALIGNMENT) * ALIGNMENT
+    temporary_file = cache_file + '.tmp'
+    with open(temporary_file, mode='wb') as file:
+        file.write(PREFIX.pack(MAGIC, len(header)))
+        file.write(header)
+        file.write(b'\0' * (data_offset - PREFIX.size - len(header)))
+        file.write(numpy.ascontiguousarray(distance_table.distances, dtype='<f8').tobytes())
+    os.replace(temporary_file, cache_file)
+
+
+def load_cache(cache_file, file_names):
+    """Read parsed tables from a binary cache file, if it exists and matches the source files.
+
+    Args:
+        cache_file (str): The path of the cache file.
+        file_names (:obj:`list` of :obj:`str`): Paths of the source files the tables should be parsed from.
+
+    Returns:
+        A tuple of the locations, the package rows, and a DistanceMatrix object backed by a read-only memory map of
+        the cache file, or None if the cache is missing, damaged, or out of date.
+
+    """
+    try:
+        return read_cache(cache_file, file_names)
+    except (OSError, KeyError, IndexError, TypeError, ValueError, struct.error):
+        return None
+
+
+def read_cache(cache_file, file_names):
+    """Read parsed tables from a binary cache file, raising an exception if its header is damaged."""
+    with open(cache_file, mode='rb') as file:
+        magic, header_length = PREFIX.unpack(file.read(PREFIX.size))
+        if magic != MAGIC:
+            return None
+        header = json.loads(file.read(header_length).decode('utf-8'))
+
+    # Compare sizes and modification times before hashing, so an out of date cache is rejected without reading files.
+    sources = header['sources']
+    if len(sources) != len(file_names):
+        return None
+    for source, file_name in zip(sources, file_names):
+        status = os.stat(file_name)
+        if source[0] != os.path.abspath(file_name) or source[1:3] != [status.st_size, status.st_mtime_ns]:
+            return None
+    if get_source_keys(file_names) != sources:
+        return None
+
+    size = header['size']
+    data_offset = -(-(PREFIX.size + header_length) // ALIGNMENT) * ALIGNMENT
+    if os.path.getsize(cache_file) != data_offset + size * size * 8:
+        return None
+    distances = numpy.memmap(cache_file, dtype='<f8', mode='r', offset=data_offset, shape=(int(size), int(size)))
+    return header['locations'], header['packages'], DistanceMatrix(distances)
@@ -0,0 +1,41 @@
+import os
+import pytest
+import helper
+import main
+from delivery_context import DeliveryContext
+
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def distance_file():
+    return os.path.join(REPOSITORY_DIRECTORY, helper.DISTANCE_FILE)
+
+
+@pytest.fixture
+def package_file():
+    return os.path.join(REPOSITORY_DIRECTORY, helper.PACKAGE_FILE)
+
+
+@pytest.fixture
+def context():
+    """Give each test an empty DeliveryContext, and restore the previous context afterward."""
+    previous_context = helper.use_context(DeliveryContext())
+    try:
+        yield helper.context
+    finally:
+        helper.use_context(previous_context)
+
+
+@pytest.fixture
+def wgups_tables(context, distance_file, package_file):
+    """Import the WGUPS locations, distances, and packages, without simulating deliveries."""
+    helper.load_tables(distance_file, package_file)
+    return context
+
+
+@pytest.fixture
+def wgups_trucks(context, distance_file, package_file):
+    """Simulate the WGUPS day as main.py does, and return the trucks."""
+    return main.run_simulation(distance_file, package_file, cache_file='')
@@ -0,0 +1,26 @@
+import csv
+import gzip
+import io
+import batch
+import helper
+
+
+def test_run_batch_streams_several_days(context, distance_file, package_file, tmp_path):
+    rows = open(package_file).read()
+    manifest_directory = tmp_path / 'manifests'
+    manifest_directory.mkdir()
+    (manifest_directory / 'day1.csv').write_text(rows)
+    with gzip.open(manifest_directory / 'day2.csv.gz', 'wt') as file:
+        file.write(rows.replace('84103,EOD,2,Wrong address listed', '84103,EOD,2,'))
+    (manifest_directory / 'day3.csv').write_text(rows.replace('1,195 W Oakland Ave,', '1,1 Nowhere Rd,'))
+    (manifest_directory / 'notes.txt').write_text('Not a manifest')
+
+    output = io.StringIO()
+    assert batch.run_batch([(distance_file, str(manifest_directory))], output) == 3
+    results = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert [result['manifest'] for result in results] == ['day1.csv', 'day2.csv.gz', 'day3.csv']
+    assert all(result['packages'] == '40' and result['error'] == '' for result in results)
+    assert results[0]['total_miles'] == '92.7'
+    assert results[0]['deadline_misses'] == '0'
+    assert [result['unmatched_addresses'] for result in results] == ['0', '0', '1']
+    assert helper.context is context
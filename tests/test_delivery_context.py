@@ -0,0 +1,16 @@
+import helper
+
+
+def test_reset_packages_clears_address_data(wgups_tables, tmp_path):
+    address_index = helper.get_package('1').get_address_index()
+    package_file = tmp_path / 'packages.csv'
+    package_file.write_text('WGUPS Package File,,,,,,,\n'
+                            ',,,,,,,\n'
+                            'Package ID,Address,City,State,Zip,Delivery Deadline,Mass KILO,Special Notes\n'
+                            '1,195 W Oakland Ave,South Salt Lake,Utah,84115,EOD,5,\n')
+    helper.reset_packages()
+    assert helper.full_address_table[address_index][2:] == []
+
+    helper.register_packages(str(package_file))
+    assert helper.full_address_table[address_index][1:] == ['195 W Oakland Ave', 'South Salt Lake', 'Utah', '84115',
+                                                            ['1']]
@@ -0,0 +1,16 @@
+import numpy
+import pytest
+import export
+
+
+def test_export_to_numpy(wgups_trucks, tmp_path):
+    file_name = export.export_deliveries(str(tmp_path / 'log.npy'))
+    rows = numpy.load(file_name)
+    assert rows['package_id'].tolist() == list(range(1, 41))
+    assert rows['on_time'].all()
+
+
+def test_unknown_suffix_is_rejected(wgups_trucks, tmp_path):
+    with pytest.raises(ValueError, match=r'\.parquet, \.arrow, \.feather, \.npy'):
+        export.export_deliveries(str(tmp_path / 'log.csv'))
+    assert not list(tmp_path.iterdir())
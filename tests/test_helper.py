@@ -0,0 +1,32 @@
+import gzip
+import shutil
+import helper
+
+
+def compress(file_name, compressed_file):
+    with open(file_name, 'rb') as source, gzip.open(compressed_file, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    return str(compressed_file)
+
+
+def test_read_package_rows_keeps_quoted_commas(tmp_path):
+    package_file = tmp_path / 'packages.csv'
+    package_file.write_text('Package ID,Address,City,State,Zip,Delivery Deadline,Mass KILO,Special Notes\n'
+                            '1,"195 W Oakland Ave, Unit 2",Salt Lake City,UT,84115,10:30 AM,21,"Fragile, keep dry"\n'
+                            '2,2530 S 500 E,Salt Lake City,UT,84106,EOD,44\n')
+    assert list(helper.read_package_rows(str(package_file))) == [
+        ['1', '195 W Oakland Ave, Unit 2', 'Salt Lake City', 'UT', '84115', '10:30 AM', '21', 'Fragile, keep dry'],
+        ['2', '2530 S 500 E', 'Salt Lake City', 'UT', '84106', 'EOD', '44', ''],
+    ]
+
+
+def test_gzip_files_are_read_like_plain_files(context, distance_file, package_file, tmp_path):
+    helper.load_tables(distance_file, package_file)
+    distance = helper.distance_table.get_distance(0, 5)
+    num_packages = helper.num_packages
+
+    helper.reset_tables()
+    helper.load_tables(compress(distance_file, tmp_path / 'distances.csv.gz'),
+                       compress(package_file, tmp_path / 'packages.csv.gz'))
+    assert helper.distance_table.get_distance(0, 5) == distance
+    assert helper.num_packages == num_packages
@@ -0,0 +1,26 @@
+import helper
+import instrumentation
+import main
+import routing
+from truck import Truck
+
+
+def get_functions():
+    return ([getattr(helper, name) for name in instrumentation.HELPER_FUNCTIONS] +
+            [getattr(routing, name) for name in instrumentation.ROUTING_FUNCTIONS] +
+            [getattr(Truck, name) for name in instrumentation.TRUCK_METHODS])
+
+
+def test_disable_restores_the_original_functions(context, distance_file, package_file):
+    original_functions = get_functions()
+    instrumentation.enable(summary=False)
+    try:
+        assert helper.travel_to_stop is not original_functions[instrumentation.HELPER_FUNCTIONS.index('travel_to_stop')]
+        main.run_simulation(distance_file, package_file, cache_file='')
+        assert instrumentation.call_counts['Truck.deliver_package'] == 40
+        assert instrumentation.call_counts['routing.improve_route'] > 0
+        assert sum(metrics['hops'] for metrics in instrumentation.route_metrics.values()) > 0
+    finally:
+        instrumentation.disable()
+    assert not instrumentation.enabled
+    assert all(function is original for function, original in zip(get_functions(), original_functions))
@@ -0,0 +1,99 @@
+import datetime
+import pytest
+import helper
+import synthetic_data
+from load_planner import LoadPlanner
+from package import parse_time
+from simulation import plan_day
+from truck import Truck
+
+
+def get_trip_of(plan):
+    return {package_id: (truck, package_ids, ready_time)
+            for truck, package_ids, ready_time in plan for package_id in package_ids}
+
+
+def test_every_package_is_planned_once(wgups_tables):
+    trucks = [Truck('Truck One'), Truck('Truck Two')]
+    plan = LoadPlanner(trucks).plan()
+    package_ids = [package_id for truck, package_ids, ready_time in plan for package_id in package_ids]
+    assert sorted(package_ids, key=int) == [str(i) for i in range(1, 41)]
+    assert all(len(package_ids) <= truck.get_capacity() for truck, package_ids, ready_time in plan)
+
+
+def test_truck_constraints(wgups_tables):
+    trucks = [Truck('Truck One'), Truck('Truck Two')]
+    trip_of = get_trip_of(LoadPlanner(trucks).plan())
+    for package_id in ('3', '18', '36', '38'):  # 'Can only be on truck 2'
+        assert trip_of[package_id][0] is trucks[1]
+
+
+def test_packages_delivered_together_share_a_trip(wgups_tables):
+    trucks = [Truck('Truck One'), Truck('Truck Two')]
+    trip_of = get_trip_of(LoadPlanner(trucks).plan())
+    trip = trip_of['13'][1]
+    assert all(package_id in trip for package_id in ('14', '15', '16', '19', '20'))
+
+
+def test_delayed_and_wrong_address_packages_wait(wgups_tables):
+    trucks = [Truck('Truck One'), Truck('Truck Two')]
+    trip_of = get_trip_of(LoadPlanner(trucks).plan())
+    for package_id in ('6', '25', '28', '32'):  # Delayed until 9:05 am
+        assert trip_of[package_id][2] >= datetime.timedelta(hours=9, minutes=5)
+    assert trip_of['9'][2] >= helper.ADDRESS_FIX_TIME
+
+
+def test_required_truck_outside_fleet_is_rejected(wgups_tables):
+    with pytest.raises(ValueError, match='Package 3 can only be on truck 2, but the fleet has 1 truck'):
+        LoadPlanner([Truck('Truck One')])
+
+
+@pytest.mark.parametrize('text, seconds', [
+    ('9:05 am', 9 * 3600 + 5 * 60),
+    ('10:30 AM', 10 * 3600 + 30 * 60),
+    ('12:00 PM', 12 * 3600),
+    ('12:15 a.m.', 15 * 60),
+    ('2:15 PM', 14 * 3600 + 15 * 60),
+    ('14:15', 14 * 3600 + 15 * 60),
+    ('EOD', 24 * 3600),
+])
+def test_parse_time(text, seconds):
+    assert parse_time(text) == seconds
+
+
+@pytest.mark.parametrize('text', ['soon', '24:00', '10:60', '13:00 PM', '0:30 AM', '10:30 XM'])
+def test_parse_time_rejects_invalid_times(text):
+    with pytest.raises(ValueError):
+        parse_time(text)
+
+
+def test_trips_are_filled_when_deadlines_cannot_all_be_met(context, tmp_path):
+    synthetic_data.write_distance_file(str(tmp_path / 'distances.csv'), 100)
+    synthetic_data.write_package_file(str(tmp_path / 'packages.csv'), 300, 100)
+    helper.load_tables(str(tmp_path / 'distances.csv'), str(tmp_path / 'packages.csv'))
+    trucks = [Truck('Truck One'), Truck('Truck Two')]
+    plan = LoadPlanner(trucks).plan()
+    assert len(plan) <= -(-300 // trucks[0].get_capacity()) + len(trucks)
+
+
+def test_extra_trucks_share_the_work(wgups_tables):
+    two_trucks = [Truck('Truck One'), Truck('Truck Two')]
+    three_trucks = two_trucks[:1] + [Truck('Truck Two'), Truck('Truck Three')]
+    two_truck_plan = LoadPlanner(two_trucks).plan()
+    three_truck_plan = LoadPlanner(three_trucks).plan()
+    assert any(truck is three_trucks[2] for truck, package_ids, ready_time in three_truck_plan)
+    assert [package_ids for truck, package_ids, ready_time in three_truck_plan] != \
+        [package_ids for truck, package_ids, ready_time in two_truck_plan]
+
+
+def test_packages_with_unmatched_addresses_stay_at_the_hub(context, distance_file, package_file, tmp_path, capsys):
+    rows = open(package_file).read().replace('1,195 W Oakland Ave,', '1,1 Nowhere Rd,')
+    unmatched_file = tmp_path / 'packages.csv'
+    unmatched_file.write_text(rows)
+    helper.load_tables(distance_file, str(unmatched_file))
+    assert 'Package 1 has an address that does not match any location' in capsys.readouterr().err
+
+    simulation = plan_day([Truck('Truck One'), Truck('Truck Two')])
+    simulation.run()
+    assert helper.get_package('1').get_time_delivered_seconds() is None
+    assert helper.get_package('2').get_time_delivered_seconds() is not None
@@ -0,0 +1,94 @@
+import os
+import shlex
+import subprocess
+import sys
+import pytest
+import helper
+import main
+
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_read_query_times_sorts_seconds():
+    assert main.read_query_times(['2:15 PM', '10:30', 'EOD']) == [10 * 3600 + 30 * 60, 14 * 3600 + 15 * 60,
+                                                                24 * 3600]
+
+
+def test_read_query_times_from_file(tmp_path):
+    times_file = tmp_path / 'times.txt'
+    times_file.write_text('# Morning\n9:00 AM\n\n10:20  # Address fixed\n')
+    assert main.read_query_times(['8:00'], str(times_file)) == [8 * 3600, 9 * 3600, 10 * 3600 + 20 * 60]
+
+
+@pytest.mark.parametrize('text', ['noon', '10', '10:3x', '24:30', '10:75', '13:00 PM'])
+def test_read_query_times_rejects_invalid_times(text):
+    with pytest.raises(ValueError, match='Invalid query time'):
+        main.read_query_times([text])
+
+
+def test_parse_arguments():
+    parser, args = main.parse_arguments(['--time', '10:30', '--time', 'EOD', '--format', 'jsonl'])
+    assert args.times == ['10:30', 'EOD']
+    assert args.format == 'jsonl'
+
+
+def test_write_query_results(wgups_trucks, capsys):
+    main.write_query_results([9 * 3600], 'csv')
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == ','.join(main.RECORD_COLUMNS)
+    assert len(lines) == 41
+    assert all(line.startswith('9:00:00,') for line in lines[1:])
+
+
+def test_run_simulation_resets_phase_timings(context, distance_file, package_file, capsys):
+    helper.phase_timings['previous run'] = 1.0
+    main.run_simulation(distance_file, package_file, cache_file='')
+    assert 'previous run' not in helper.phase_timings
+    assert 'register packages' in helper.phase_timings
+    helper.print_phase_timings()
+    assert 'register packages' in capsys.readouterr().err
+
+
+def run_main(*arguments, shell_suffix=''):
+    command = ' '.join(shlex.quote(part) for part in [sys.executable, 'main.py', '--cache-file', ''] + list(arguments))
+    return subprocess.run(command + shell_suffix, shell=True, cwd=REPOSITORY_DIRECTORY, capture_output=True,
+                          text=True)
+
+
+def test_out_of_range_query_time_exits_with_usage_error():
+    result = run_main('--time', '25:00')
+    assert result.returncode == 2
+    assert 'Invalid query time' in result.stderr
+
+
+def test_closed_output_pipe_is_not_reported(tmp_path):
+    times_file = tmp_path / 'times.txt'  # Enough output to fill the pipe after head exits
+    times_file.write_text(''.join(f'{hour}:{minute:02d}\n' for hour in range(8, 18) for minute in range(60)))
+    result = run_main('--times-file', str(times_file), shell_suffix=' | head -n 1')
+    assert result.stdout.startswith('time,package_id')
+    assert 'Traceback' not in result.stderr
+
+
+def test_unknown_export_format_exits_with_usage_error():
+    result = run_main('--export', 'log.csv')
+    assert result.returncode == 2
+    assert 'unsupported format' in result.stderr
+
+
+def test_run_simulation_can_be_called_again(context, distance_file, package_file):
+    first_trucks = main.run_simulation(distance_file, package_file, cache_file='')
+    first_miles = sum(truck.get_distance_traveled() for truck in first_trucks)
+    trucks = main.run_simulation(distance_file, package_file, cache_file='')
+    assert len(helper.full_address_table) == len(helper.address_index_table)
+    assert sum(truck.get_distance_traveled() for truck in trucks) == first_miles
+
+
+def test_run_simulation_reports_route_improvement(context, distance_file, package_file, capsys):
+    route_reports = []
+    main.run_simulation(distance_file, package_file, cache_file='', route_reports=route_reports)
+    assert route_reports
+    miles_saved = sum(report.get_miles_saved() for report in route_reports)
+    assert miles_saved >= 0
+    main.print_route_summary(route_reports)
+    assert f'{miles_saved:.1f} miles saved over {len(route_reports)} routes' in capsys.readouterr().err
@@ -0,0 +1,57 @@
+from package_store import PackageStore
+
+
+def test_insert_and_get():
+    store = PackageStore()
+    store.insert('1', 'first')
+    store.insert('2', 'second')
+    assert len(store) == 2
+    assert store.get('1') == 'first'
+    assert store.get('3') is None
+    assert '2' in store
+
+
+def test_insert_replaces_existing_key():
+    store = PackageStore()
+    store.insert('1', 'first')
+    store.insert('1', 'replaced')
+    assert len(store) == 1
+    assert store.get('1') == 'replaced'
+
+
+def test_delete_and_reinsert():
+    store = PackageStore()
+    for i in range(20):
+        store.insert(str(i), i)
+    assert store.delete('7')
+    assert not store.delete('7')
+    assert store.get('7') is None
+    assert '7' not in store
+    assert len(store) == 19
+    # Keys probed past the deleted slot are still found.
+    assert all(store.get(str(i)) == i for i in range(20) if i != 7)
+
+    store.insert('7', 'again')
+    assert store.get('7') == 'again'
+    assert len(store) == 20
+    assert sorted(store, key=int) == [str(i) for i in range(20)]
+
+
+def test_grows_and_keeps_keys():
+    store = PackageStore()
+    for i in range(1000):
+        store.insert(str(i), i)
+    assert len(store) == 1000
+    assert store.get_num_slots() * PackageStore.MAX_LOAD_FACTOR >= 1000
+    assert all(store.get(str(i)) == i for i in range(1000))
+
+
+def test_reset_keeps_slots():
+    store = PackageStore()
+    for i in range(100):
+        store.insert(str(i), i)
+    num_slots = store.get_num_slots()
+    store.reset()
+    assert len(store) == 0
+    assert store.get('1') is None
+    assert store.get_num_slots() == num_slots
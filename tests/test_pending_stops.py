@@ -0,0 +1,75 @@
+import numpy
+import pytest
+import benchmark
+from distance_matrix import DistanceMatrix
+from package import Package
+from pending_stops import InfeasiblePlanError, PendingStops
+
+
+def make_table(num_locations=40):
+    """Return a DistanceMatrix of locations along a line, one mile apart."""
+    positions = numpy.arange(num_locations, dtype=numpy.float64)
+    table = DistanceMatrix(numpy.abs(positions[:, None] - positions[None, :]))
+    table.list_candidates()
+    return table
+
+
+def test_find_nearest_reports_full_scans():
+    table = make_table()
+    stops = PendingStops()
+    for address_index in range(5, 40):  # Enough stops pending for candidates to be checked
+        stops.add(Package(str(address_index), address_index, 'EOD', '1', ''))
+    assert stops.find_nearest(table, 0) == (5.0, [5])
+    assert stops.stops_scanned == 0
+
+    for address_index in range(5, 38):
+        stops.remove(stops.get_packages(address_index)[0])
+    assert stops.find_nearest(table, 0) == (38.0, [38])
+    assert stops.stops_scanned == 2
+
+
+def test_benchmark_searches_agree():
+    results = benchmark.benchmark_nearest_stops(num_locations=300, num_stops=100)
+    assert set(results) == {'full scan', 'candidates'}
+
+
+def test_deadlines_are_parsed_only_when_needed():
+    stops = PendingStops()
+    package = Package('1', 5, 'Noon', '1', '')
+    stops.add(package)
+    stops.remove(package)
+    stops.add(package)
+    with pytest.raises(ValueError):
+        stops.get_deadlines()
+
+
+def test_find_urgent_gives_up_once_deadlines_cannot_all_be_met():
+    table = make_table()
+    stops = PendingStops()
+    stops.add(Package('1', 30, '8:10 AM', '1', ''))  # 10 miles one way from location 20
+    stops.add(Package('2', 15, '8:10 AM', '1', ''))  # 5 miles the other way
+    # Each stop can be reached by itself in time at a mile a minute, but not both.
+    with pytest.raises(InfeasiblePlanError):
+        stops.find_urgent(table, 20, 8 * 60, 1.0)
+
+
+def test_find_urgent_visits_the_nearest_stop_while_deadlines_can_be_met():
+    table = make_table()
+    stops = PendingStops()
+    stops.add(Package('1', 30, '8:20 AM', '1', ''))
+    stops.add(Package('2', 18, 'EOD', '1', ''))
+    assert stops.find_urgent(table, 20, 8 * 60, 1.0) == (2.0, [18])
+    stops.add(Package('3', 35, '8:17 AM', '1', ''))
+    assert stops.find_urgent(table, 20, 8 * 60, 1.0) == (15.0, [35])
+
+
+def test_check_deadlines_follows_the_planned_route():
+    table = make_table()
+    stops = PendingStops()
+    stops.add(Package('1', 19, '8:21 AM', '1', ''))
+    stops.add(Package('2', 0, '8:20 AM', '1', ''))
+    # Going to the earlier deadline first reaches stop 19 at 8:39, but the route 19, 0 meets both deadlines.
+    assert stops.check_deadlines(table, 20, 8 * 60, 1.0, [19, 0]) is None
+    assert stops.check_deadlines(table, 20, 8 * 60, 1.0, [0, 19]) == (19, 8 * 60 + 21, 8 * 60 + 39)
+    with pytest.raises(InfeasiblePlanError, match='cannot be reached'):
+        stops.check_deadlines(table, 20, 8 * 60 + 1, 1.0, [19, 0])
@@ -0,0 +1,26 @@
+import pytest
+import helper
+import road_network
+
+
+def write_network(tmp_path, edges):
+    edge_file = tmp_path / 'edges.csv'
+    edge_file.write_text('start,end,miles\n' + ''.join(f'{a},{b},{miles}\n' for a, b, miles in edges))
+    location_file = tmp_path / 'locations.csv'
+    location_file.write_text('name,address,node\n'
+                             'Hub,1 Main St (84101) HUB,a\n'
+                             'North,2 Main St (84102),b\n'
+                             'East,3 Main St (84103),c\n')
+    return str(edge_file), str(location_file)
+
+
+def test_shortest_road_distances(context, tmp_path):
+    road_network.import_road_network(*write_network(tmp_path, [('a', 'b', 1.5), ('b', 'c', 2.0), ('a', 'c', 4.0)]))
+    assert helper.distance_table.get_distance(helper.HUB_INDEX, 2) == 3.5
+    assert helper.distance_table.get_distance(2, 1) == 2.0
+
+
+def test_unreachable_locations_are_rejected(context, tmp_path):
+    with pytest.raises(ValueError, match='cannot be reached from the hub by road: East'):
+        road_network.import_road_network(*write_network(tmp_path, [('a', 'b', 1.5), ('c', 'd', 2.0)]))
+    assert len(helper.full_address_table) == 0
@@ -0,0 +1,26 @@
+import helper
+import routing
+from load_planner import LoadPlanner
+from simulation import Simulation
+from truck import Truck
+
+
+def test_improve_route_stops_at_the_move_budget(wgups_tables):
+    route = list(range(1, 21))  # Stops in index order, which is far from the shortest route
+    improved, report = routing.improve_route(route, helper.HUB_INDEX, 8 * 3600, 18.0, move_budget=5)
+    assert report.moves == 5
+    assert sorted(improved) == route
+    assert report.miles_after < report.miles_before
+
+
+def test_improved_routes_are_reproducible(wgups_tables, package_file):
+    results = []
+    for run in range(2):
+        helper.reset_packages()
+        helper.register_packages(package_file)
+        trucks = [Truck('Truck One'), Truck('Truck Two')]
+        simulation = Simulation(trucks, routing.MOVE_BUDGET)
+        LoadPlanner(trucks).schedule(simulation)
+        simulation.run()
+        results.append([(report.miles_after, report.moves) for report in simulation.route_reports])
+    assert results[0] == results[1]
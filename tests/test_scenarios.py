@@ -0,0 +1,11 @@
+import scenarios
+
+
+def test_scenarios_match_main_and_use_every_truck(wgups_trucks, distance_file, package_file):
+    main_miles = round(sum(truck.get_distance_traveled() for truck in wgups_trucks), 1)
+    results = scenarios.run_sweep({'num_trucks': [2, 3]}, distance_file, package_file, max_workers=1)
+    two_trucks, three_trucks = sorted(results, key=lambda result: result['num_trucks'])
+    assert two_trucks['error'] == three_trucks['error'] == ''
+    assert two_trucks['total_miles'] == main_miles
+    assert (three_trucks['total_miles'], three_trucks['finish_time']) != \
+        (two_trucks['total_miles'], two_trucks['finish_time'])
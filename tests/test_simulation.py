@@ -0,0 +1,99 @@
+import datetime
+import pytest
+import helper
+from load_planner import LoadPlanner
+import simulation as simulation_module
+from simulation import Simulation
+from truck import Truck
+
+
+def at(hours, minutes=0):
+    return datetime.timedelta(hours=hours, minutes=minutes)
+
+
+def plan_day(route_move_budget=None):
+    trucks = [Truck('Truck One'), Truck('Truck Two')]
+    simulation = Simulation(trucks, route_move_budget)
+    LoadPlanner(trucks).schedule(simulation)
+    return trucks, simulation
+
+
+def test_every_package_is_delivered(wgups_tables):
+    trucks, simulation = plan_day()
+    simulation.run()
+    assert all(package.get_time_delivered_seconds() is not None
+               for package_id, package in helper.package_hash_table.items())
+    assert all(truck.get_location_index() == helper.HUB_INDEX for truck in trucks)
+
+
+def test_address_change(wgups_tables):
+    trucks, simulation = plan_day()
+    old_index = helper.get_package('9').get_address_index()
+    simulation.schedule_address_change(helper.ADDRESS_FIX_TIME, '9', '410 S State St', 'Salt Lake City', '84111')
+    simulation.run()
+
+    package = helper.get_package('9')
+    new_index = helper.address_index_table[('410 S State St', '84111')]
+    assert package.get_address_index() == new_index != old_index
+    assert package.get_time_delivered() > helper.ADDRESS_FIX_TIME
+    fix_seconds = round(helper.ADDRESS_FIX_TIME.total_seconds())
+    assert helper.get_address_index(package, fix_seconds - 1) == old_index
+    assert helper.get_address_index(package, fix_seconds) == new_index
+
+
+def test_new_package(wgups_tables):
+    trucks, simulation = plan_day()
+    simulation.schedule_new_package(at(11), ['41', '1060 Dalton Ave S', 'Salt Lake City', 'UT', '84104', 'EOD', '3',
+                                             ''])
+    simulation.run(until=at(10, 59))
+    assert helper.get_package('41') is None
+    simulation.run()
+
+    package = helper.get_package('41')
+    assert package is not None
+    assert package.get_time_loaded() >= at(11)
+    assert package.get_time_delivered() is not None
+
+
+def test_delay(wgups_tables):
+    trucks, simulation = plan_day()
+    simulation.schedule_delay(at(8), ['2'], at(12))
+    simulation.run()
+
+    package = helper.get_package('2')
+    assert package.get_time_loaded() >= at(12)
+    assert package.get_time_delivered() is not None
+
+
+def test_delayed_departure_keeps_its_earliest_departure(wgups_tables):
+    truck = Truck('Truck One')
+    simulation = Simulation([truck])
+    simulation.add_trip(truck, ['1', '2'], earliest_departure=at(9))
+    simulation.schedule_delay(at(8, 30), ['2'], at(10))
+    simulation.run(until=at(9, 30))
+    assert list(simulation.trips['Truck One']) == [(['1', '2'], at(9))]
+    simulation.run()
+    assert helper.get_package('2').get_time_loaded() >= at(10)
+
+
+@pytest.mark.parametrize('truck_number', ['0', '3'])
+def test_new_package_for_truck_outside_fleet_is_rejected(wgups_tables, truck_number):
+    trucks, simulation = plan_day()
+    simulation.schedule_new_package(at(11), ['41', '1060 Dalton Ave S', 'Salt Lake City', 'UT', '84104', 'EOD', '3',
+                                             f'Can only be on truck {truck_number}'])
+    with pytest.raises(ValueError, match=f'Package 41 can only be on truck {truck_number}'):
+        simulation.run()
+
+
+def test_address_is_only_corrected_for_packages_noted_as_wrong(context, distance_file, package_file, tmp_path):
+    rows = open(package_file).read().replace('84103,EOD,2,Wrong address listed', '84103,EOD,2,')
+    corrected_file = tmp_path / 'packages.csv'
+    corrected_file.write_text(rows)
+    helper.load_tables(distance_file, str(corrected_file))
+    old_index = helper.get_package('9').get_address_index()
+
+    simulation = simulation_module.plan_day([Truck('Truck One'), Truck('Truck Two')])
+    simulation.run()
+    package = helper.get_package('9')
+    assert package.get_address_index() == old_index
+    assert package.get_time_delivered_seconds() is not None
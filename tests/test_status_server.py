@@ -0,0 +1,57 @@
+import asyncio
+import json
+from status_server import StatusServer, fetch
+
+
+def test_status(wgups_trucks):
+    server = StatusServer(wgups_trucks)
+    status, body = server.route('/status?time=10:00')
+    assert status == 200
+    body = json.loads(body)
+    assert len(body['packages']) == 40
+    assert sum(body['counts'].values()) == 40
+
+    # A second query for the same time is answered from cache.
+    assert server.route('/status?time=10:00') == (status, server.cache[10 * 3600])
+    assert server.cache_hits == 1
+
+
+def test_package(wgups_trucks):
+    server = StatusServer(wgups_trucks)
+    status, body = server.route('/packages/9?time=10:00')
+    assert status == 200
+    assert body['address'] == '300 State St'
+    assert body['time_delivered'] is None
+    status, body = server.route('/packages/9')
+    assert status == 200
+    assert body['address'] == '410 S State St'
+    assert body['status'] == 'delivered'
+
+
+def test_trucks(wgups_trucks):
+    status, body = StatusServer(wgups_trucks).route('/trucks')
+    assert status == 200
+    assert [truck['name'] for truck in body['trucks']] == ['Truck One', 'Truck Two']
+    assert body['total_miles'] == round(sum(truck['miles'] for truck in body['trucks']), 1)
+
+
+def test_errors(wgups_trucks):
+    server = StatusServer(wgups_trucks)
+    assert server.route('/status?time=later')[0] == 400
+    assert server.route('/packages/99')[0] == 404
+    assert server.route('/unknown')[0] == 404
+
+
+def test_http(wgups_trucks):
+    async def run():
+        server = StatusServer(wgups_trucks)
+        port = await server.start(port=0)
+        try:
+            return [await fetch(path, port=port) for path in ('/packages/1', '/status?time=25:99x', '/packages/0')]
+        finally:
+            await server.close()
+
+    (ok, package), (bad_request, error), (not_found, missing) = asyncio.run(run())
+    assert (ok, package['package_id']) == (200, '1')
+    assert bad_request == 400 and 'error' in error
+    assert not_found == 404 and 'error' in missing
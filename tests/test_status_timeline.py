@@ -0,0 +1,63 @@
+import csv
+import io
+import helper
+from status_timeline import RECORD_COLUMNS
+
+
+def get_records(time):
+    lines = ''.join(helper.status_timeline.iter_records(time, 'csv'))
+    return {row['package_id']: row for row in csv.DictReader(io.StringIO(lines), fieldnames=RECORD_COLUMNS)}
+
+
+def test_statuses_over_the_day(wgups_trucks):
+    before_departure = get_records(7 * 3600)
+    assert len(before_departure) == 40
+    assert all(row['status'] == 'at the hub' and row['truck'] == '' for row in before_departure.values())
+    assert all(row['status'] == 'delivered' for row in get_records(24 * 3600).values())
+
+    package = helper.get_package('1')
+    loaded = package.get_time_loaded_seconds()
+    delivered = package.get_time_delivered_seconds()
+    assert get_records(loaded)['1']['status'] == 'en route'
+    assert get_records(delivered - 1)['1']['status'] == 'en route'
+    assert get_records(delivered)['1']['status'] == 'delivered'
+    assert get_records(delivered)['1']['truck'] == package.get_assigned_truck()
+
+
+def test_interleaved_queries(wgups_trucks):
+    timeline = helper.status_timeline
+    morning = timeline.iter_batches(7 * 3600, batch_size=10)
+    evening = timeline.iter_batches(24 * 3600, batch_size=10)
+    early_statuses = timeline.status_at(7 * 3600)
+    timeline.status_at(24 * 3600)
+    lines = [next(morning), next(evening)] + list(morning) + list(evening)
+    assert early_statuses == [0] * 40
+    assert sum(line.count('at the hub') for line in lines) == 40
+    assert sum(line.count('delivered') for line in lines) == 40
+
+
+def test_counts(wgups_trucks):
+    timeline = helper.status_timeline
+    assert timeline.counts_at(7 * 3600) == (40, 0, 0)
+    assert timeline.counts_at(24 * 3600) == (0, 0, 40)
+    for time in range(8 * 3600, 14 * 3600, 900):
+        records = get_records(time).values()
+        counts = tuple(sum(row['status'] == status for row in records)
+                       for status in ('at the hub', 'en route', 'delivered'))
+        assert timeline.counts_at(time) == counts
+
+
+def test_address_before_and_after_change(wgups_trucks):
+    fix_seconds = round(helper.ADDRESS_FIX_TIME.total_seconds())
+    assert get_records(fix_seconds - 60)['9']['address'] == '300 State St'
+    assert get_records(fix_seconds)['9']['address'] == '410 S State St'
+    assert get_records(fix_seconds - 60)['9']['zip_code'] == '84103'
+    # Queries out of time order give the same records.
+    assert get_records(fix_seconds - 60)['9']['address'] == '300 State St'
+
+
+def test_print_status_all_packages(wgups_trucks, capsys):
+    helper.print_status_all_packages(helper.ADDRESS_FIX_TIME)
+    lines = capsys.readouterr().out.splitlines()
+    assert any(line.startswith('9, 410 S State St') for line in lines)
+    assert sum(line[:1].isdigit() for line in lines) == 40
@@ -0,0 +1,20 @@
+import pytest
+import helper
+import synthetic_data
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.csv.gz'])
+def test_generated_files_parse_back(context, tmp_path, suffix):
+    distance_file = str(tmp_path / f'distances{suffix}')
+    package_file = str(tmp_path / f'packages{suffix}')
+    synthetic_data.write_distance_file(distance_file, 50)
+    synthetic_data.write_package_file(package_file, 200, 50)
+    helper.load_tables(distance_file, package_file)
+
+    assert len(helper.distance_table) == len(helper.full_address_table) == 50
+    assert helper.full_address_table[helper.HUB_INDEX][1].endswith('HUB')
+    assert helper.distance_table.get_distance(3, 7) == helper.distance_table.get_distance(7, 3) > 0
+    assert helper.num_packages == 200
+    assert not helper.unmatched_addresses
+    notes = [helper.get_package(str(i)).get_special() for i in range(1, 201)]
+    assert any(note == synthetic_data.DELAYED_NOTE for note in notes)
@@ -0,0 +1,52 @@
+import json
+import os
+import shutil
+import pytest
+import benchmark
+import helper
+import main
+import table_cache
+
+
+@pytest.fixture
+def source_files(tmp_path, distance_file, package_file):
+    """Copy the WGUPS CSV files to a temporary directory, so caches are written next to them."""
+    return shutil.copy(distance_file, tmp_path), shutil.copy(package_file, tmp_path)
+
+
+def test_cache_is_reused(context, source_files, tmp_path):
+    cache_file = str(tmp_path / 'tables.cache')
+    assert not helper.load_tables(*source_files, cache_file)
+    helper.reset_tables()
+    assert helper.load_tables(*source_files, cache_file)
+    assert len(helper.package_hash_table) == 40
+
+
+def test_cache_with_missing_header_keys_is_ignored(context, source_files, tmp_path):
+    cache_file = str(tmp_path / 'tables.cache')
+    header = json.dumps({'locations': []}).encode('utf-8')
+    with open(cache_file, mode='wb') as file:
+        file.write(table_cache.PREFIX.pack(table_cache.MAGIC, len(header)) + header)
+    assert table_cache.load_cache(cache_file, list(source_files)) is None
+    assert not helper.load_tables(*source_files, cache_file)
+    assert len(helper.package_hash_table) == 40
+
+
+def test_cache_that_cannot_be_saved_is_skipped(context, source_files, tmp_path, capsys):
+    cache_file = str(tmp_path / 'missing directory' / 'tables.cache')
+    assert not helper.load_tables(*source_files, cache_file)
+    assert len(helper.package_hash_table) == 40
+    assert 'Could not save table cache' in capsys.readouterr().err
+
+
+def test_default_cache_is_next_to_the_distance_file(context, source_files, tmp_path, monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(source_files[0])))
+    main.run_simulation(*source_files)
+    assert os.path.exists(tmp_path / main.CACHE_FILE)
+    assert not os.path.exists(main.CACHE_FILE)
+
+
+def test_benchmark_startup_times_both_sources(context, distance_file, package_file):
+    results = benchmark.benchmark_startup(1, distance_file=distance_file, package_file=package_file)
+    assert set(results) == {'csv', 'cache'}
+    assert helper.num_packages == 40
@@ -1,5 +1,6 @@
 import datetime
 from helper import HUB_INDEX
+from pending_stops import PendingStops
 
 
 class Truck:
@@ -9,6 +10,7 @@ class Truck:
         name (str): The name of the truck.
         location_index (int): An index to retrieve information on the current location from tables in helper.py.
         packages_held (obj:`list` of :obj:`Package`): A list of currently held packages.
+        pending_stops (PendingStops): The currently held packages, grouped by the stop they are intended for.
         distance_traveled (float): The total number of units (miles) traveled.
         time_on_clock (time): The current time, which is checked or updated at each stop.
         capacity (int): The max number of packages that can be held at one time.
@@ -16,21 +18,27 @@ class Truck:
 
     """
 
-    def __init__(self, name, time_on_clock=datetime.timedelta(hours=8, minutes=0)):
+    __slots__ = ('name', 'location_index', 'packages_held', 'pending_stops', 'distance_traveled', 'time_on_clock',
+                 'capacity', 'speed')
+
+    def __init__(self, name, time_on_clock=datetime.timedelta(hours=8, minutes=0), capacity=16, speed=18.0):
         """Construct a Truck object.
 
         Args:
             name (str): The name of the truck.
             time_on_clock (:obj:`time`, optional): The current time. Defaults to 8:00 a.m.
+            capacity (:obj:`int`, optional): The max number of packages that can be held at one time. Defaults to 16.
+            speed (:obj:`float`, optional): The average speed, in mph. Defaults to 18.0.
 
         """
         self.name = name
         self.location_index = HUB_INDEX
         self.packages_held = []
+        self.pending_stops = PendingStops()
         self.distance_traveled = 0.0
         self.time_on_clock = time_on_clock
-        self.capacity = 16
-        self.speed = 18.0
+        self.capacity = capacity
+        self.speed = speed
 
 
     def get_name(self):
@@ -45,6 +53,9 @@ class Truck:
     def get_packages_held(self):
         return self.packages_held
 
+    def get_pending_stops(self):
+        return self.pending_stops
+
     def get_distance_traveled(self):
         return self.distance_traveled
 
@@ -74,6 +85,7 @@ class Truck:
         package.set_time_loaded(self.time_on_clock)
         package.set_assigned_truck(self.name)
         self.packages_held.append(package)
+        self.pending_stops.add(package)
 
 
     def deliver_package(self, package):
@@ -88,7 +100,9 @@ class Truck:
         """
         package.set_status('delivered')
         package.set_time_delivered(self.time_on_clock)
+        package.set_truck_miles_delivered(self.distance_traveled)
         self.packages_held.remove(package)
+        self.pending_stops.remove(package)
 
 
     def update_distance_traveled(self, distance_traveled):
@@ -102,5 +116,10 @@ class Truck:
 
         """
         self.distance_traveled += distance_traveled
-        hours = distance_traveled / self.speed  # Fractional hour quantity
-        self.time_on_clock += datetime.timedelta(hours=hours)
+        self.time_on_clock += self.get_travel_time(distance_traveled)
+
+
+    def get_travel_time(self, distance):
+        """Return the time needed to travel a distance, in miles, as a timedelta."""
+        hours = distance / self.speed  # Fractional hour quantity
+        return datetime.timedelta(hours=hours)